@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Compares evaluating filters job by job against the vectorized FilterFrame
+
+Usage: python benchmarks/bench_filter_frame.py [--jobs N]
+"""
+import argparse
+import random
+import time
+
+from obr.core.queries import (
+    FilterFrame,
+    build_filter_query,
+    compile_queries,
+    query_flat_jobs,
+)
+
+
+def create_docs(n_jobs: int) -> dict:
+    random.seed(0)
+    return {
+        f"{i:032x}": {
+            "state": {"global": random.choice(["completed", "failure", "ready"])},
+            "solver": random.choice(["pisoFoam", "icoFoam"]),
+            "numberOfSubdomains": random.choice([1, 2, 4, 8, 16, 32]),
+            "parent": {"nCells": random.randint(10**4, 10**7)},
+        }
+        for i in range(n_jobs)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=100000)
+    args = parser.parse_args()
+
+    docs = create_docs(args.jobs)
+    filters = ["solver==pisoFoam", "numberOfSubdomains>=8", "global==completed"]
+    queries = build_filter_query(filters)
+    plan = compile_queries(queries)
+
+    start = time.perf_counter()
+    row_wise = [r.id for r in query_flat_jobs(docs, queries, False, True, False)]
+    print(f"jobs: {args.jobs}")
+    print(f"row wise:          {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    frame = FilterFrame(docs, plan)
+    print(f"frame build:       {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    vectorized = frame.select(plan)
+    print(f"frame select:      {time.perf_counter() - start:.3f}s")
+    assert row_wise == vectorized
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Compares forking md5sum per file with the in-process hashing service on a
+synthetic case tree
+
+Usage: python benchmarks/bench_hashing.py [--files N] [--workers N] [--fork-sample N]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from pathlib import Path
+
+from obr.core.hashing import clear_hash_cache, md5sum, md5sums
+
+FOLDERS = ["system", "system/include", "constant", "constant/polyMesh", "0"]
+
+
+def create_tree(root: Path, files: int) -> list[Path]:
+    """Creates files of 1 to 64 KiB distributed over typical case folders"""
+    paths = []
+    for folder in FOLDERS:
+        (root / folder).mkdir(parents=True)
+    for i in range(files):
+        path = root / FOLDERS[i % len(FOLDERS)] / f"dict{i}"
+        size = 1024 * (1 + (i * 7919) % 64)
+        path.write_bytes(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--fork-sample",
+        type=int,
+        default=1000,
+        help="number of files hashed by forking md5sum, the time is extrapolated",
+    )
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    paths = create_tree(tmp, args.files)
+    size = sum(path.stat().st_size for path in paths)
+    print(f"files: {len(paths)}, {size / 2**20:.1f} MiB")
+
+    sample = paths[: args.fork_sample]
+    if shutil.which("md5sum") and sample:
+        duration = timed(
+            lambda: [
+                subprocess.check_output(["md5sum", str(path)], text=True)
+                for path in sample
+            ]
+        )
+        duration *= len(paths) / len(sample)
+        print(f"fork md5sum:           {duration:7.3f}s (extrapolated)")
+
+    clear_hash_cache()
+    duration = timed(lambda: [md5sum(path) for path in paths])
+    print(f"hashlib serial:        {duration:7.3f}s")
+
+    clear_hash_cache()
+    duration = timed(lambda: md5sums(paths, workers=args.workers))
+    print(f"hashlib {args.workers:2d} threads:    {duration:7.3f}s")
+
+    duration = timed(lambda: md5sums(paths, workers=args.workers))
+    print(f"unchanged (stat only): {duration:7.3f}s")
+
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Compares loading merged job documents via the persistent job index against
+reading every statepoint and job document of the workspace
+
+Usage: python benchmarks/bench_job_index.py [--jobs N]
+"""
+import argparse
+import tempfile
+import time
+
+import signac
+
+from obr.core.queries import (
+    Query,
+    flatten_jobs,
+    query_flat_jobs,
+    query_to_dict,
+    scan_jobs,
+)
+
+
+def create_workspace(path: str, n_jobs: int) -> signac.Project:
+    project = signac.init_project(path=path)
+    with signac.buffered():
+        for i in range(n_jobs):
+            job = project.open_job({
+                "solver": "pisoFoam",
+                "numberOfSubdomains": 2 ** (i % 8),
+                "parent": {"solver": "pisoFoam", "parent": {"nCells": i}},
+            })
+            job.init()
+            job.doc["state"] = {"global": "completed", "latestTime": 0.5}
+            job.doc["history"] = [
+                {"cmd": "blockMesh", "state": "success", "log": "x" * 500}
+                for _ in range(20)
+            ]
+            job.doc["cache"] = {"md5sum": {f"system/f{j}": "0" * 32 for j in range(20)}}
+    return project
+
+
+def query_all_keys(project, queries):
+    """Evaluates queries on fully loaded documents, ie. without projection"""
+    return query_flat_jobs(flatten_jobs(project), queries, False, True, False)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = create_workspace(tmp, args.jobs)
+        print(f"jobs: {args.jobs}")
+        print(f"full scan:         {timed(scan_jobs, project):.3f}s")
+        print(f"index cold build:  {timed(flatten_jobs, project):.3f}s")
+        print(f"index warm:        {timed(flatten_jobs, project):.3f}s")
+        queries = [Query(key="solver"), Query(key="state.global")]
+        print(f"query all keys:    {timed(query_all_keys, project, queries):.3f}s")
+        print(f"query projected:   {timed(query_to_dict, project, queries):.3f}s")
+        next(iter(project)).doc["state"] = {"global": "failure"}
+        print(f"index one changed: {timed(flatten_jobs, project):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
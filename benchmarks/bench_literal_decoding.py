@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Compares decoding dictionary values via eval with the literal decoder used by File.get
+
+Usage: python benchmarks/bench_literal_decoding.py [--repeat N]
+"""
+import argparse
+import time
+
+from obr.OpenFOAM.literals import decode_literal
+
+VALUES = [
+    "pisoFoam",
+    "latestTime",
+    "10",
+    "0.005",
+    "1e-05",
+    "binary",
+    "(1 0 0)",
+    "((0 1) (2 3))",
+    "uniform (0 0 0)",
+    "true",
+]
+
+
+def eval_value(value: str):
+    """The previous implementation of File.get"""
+    try:
+        return eval(value)
+    except:  # noqa: E722
+        return value
+
+
+def timed(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for value in VALUES:
+            func(value)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    calls = args.repeat * len(VALUES)
+    print(f"decoded values: {calls}")
+    for name, func in [
+        ("eval", eval_value),
+        ("decoder", decode_literal.__wrapped__),
+        ("memoized decoder", decode_literal),
+    ]:
+        duration = timed(func, args.repeat)
+        print(f"{name:17s} {duration:7.3f}s {1e6 * duration / calls:6.2f} us/value")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Compares disk footprint and parse throughput of plain and compressed solver logs
+
+Usage: python benchmarks/bench_log_compression.py [--steps N]
+"""
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from pathlib import Path
+
+from obr.core.logs import COMPRESSION_SUFFIXES, compress_log, open_log
+
+TIME_STEP = """Courant Number mean: 0.{step:06d} max: 0.8{step:05d}
+Time = {time:.4f}
+
+DILUPBiCGStab:  Solving for Ux, Initial residual = 1.{step:04d}e-05, Final residual = 3.{step:04d}e-08, No Iterations 2
+DILUPBiCGStab:  Solving for Uy, Initial residual = 2.{step:04d}e-05, Final residual = 5.{step:04d}e-08, No Iterations 2
+GAMG:  Solving for p, Initial residual = 4.{step:04d}e-04, Final residual = 8.{step:04d}e-07, No Iterations 12
+time step continuity errors : sum local = 1.{step:04d}e-09, global = -2.{step:04d}e-19, cumulative = 3.{step:04d}e-17
+ExecutionTime = {exec_time:.2f} s  ClockTime = {clock_time} s
+
+"""
+
+TIME_REGEX = re.compile(r"^Time = ([0-9.e+-]+)")
+EXEC_REGEX = re.compile(r"^ExecutionTime = ([0-9.e+-]+) s")
+
+
+def create_log(path: Path, steps: int):
+    with open(path, "w") as fh:
+        for step in range(steps):
+            fh.write(
+                TIME_STEP.format(
+                    step=step,
+                    time=step * 1e-4,
+                    exec_time=step * 0.0123,
+                    clock_time=step // 80,
+                )
+            )
+        fh.write("End\n\nFinalising parallel run\n")
+
+
+def parse_log(path: Path) -> tuple[int, float]:
+    """Minimal parser extracting the number of time steps and the final execution time"""
+    steps = 0
+    exec_time = 0.0
+    with open_log(path) as fh:
+        for line in fh:
+            if TIME_REGEX.match(line):
+                steps += 1
+            elif m := EXEC_REGEX.match(line):
+                exec_time = float(m.group(1))
+    return steps, exec_time
+
+
+def available_codecs() -> list[str]:
+    codecs = ["gzip"]
+    try:
+        import zstandard  # noqa: F401
+
+        codecs.append("zstd")
+    except ImportError:
+        print("zstandard is not installed, skipping zstd")
+    return codecs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=100000)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    plain = tmp / "pisoFoam_2024-01-01_00:00:00.log"
+    create_log(plain, args.steps)
+    plain_size = plain.stat().st_size
+
+    start = time.perf_counter()
+    expected = parse_log(plain)
+    duration = time.perf_counter() - start
+    print(f"time steps: {args.steps}")
+    print(
+        f"plain: {plain_size / 2**20:8.1f} MiB        parse"
+        f" {plain_size / 2**20 / duration:7.1f} MiB/s"
+    )
+
+    for codec in available_codecs():
+        source = tmp / f"{codec}_{plain.name}"
+        shutil.copy(plain, source)
+        start = time.perf_counter()
+        compressed = compress_log(source, codec)
+        compress_time = time.perf_counter() - start
+        size = compressed.stat().st_size
+
+        start = time.perf_counter()
+        assert parse_log(compressed) == expected
+        duration = time.perf_counter() - start
+        print(
+            f"{codec:5s}: {size / 2**20:8.1f} MiB ({plain_size / size:5.1f}x) parse"
+            f" {plain_size / 2**20 / duration:7.1f} MiB/s, compress"
+            f" {compress_time:.2f}s"
+        )
+        assert COMPRESSION_SUFFIXES[codec] == compressed.suffix
+
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
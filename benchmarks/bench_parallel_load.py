@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Compares reading job documents sequentially against reading them with a
+bounded thread pool, for the full scan and for building the job index
+
+On a local disk the files are served from the page cache and the reads are
+bound by the GIL. Use --latency to emulate the per file latency of a parallel
+file system, which is where concurrent reads pay off.
+
+Usage: python benchmarks/bench_parallel_load.py [--jobs N] [--workers N]
+                                                [--latency SECONDS]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import signac
+
+import obr.core.job_index as job_index
+from obr.core.queries import flatten_jobs, scan_jobs
+
+
+def create_workspace(path: str, n_jobs: int) -> signac.Project:
+    project = signac.init_project(path=path)
+    with signac.buffered():
+        for i in range(n_jobs):
+            job = project.open_job({
+                "solver": "pisoFoam",
+                "numberOfSubdomains": 2 ** (i % 8),
+                "parent": {"nCells": i},
+            })
+            job.init()
+            job.doc["state"] = {"global": "completed", "latestTime": 0.5}
+            job.doc["history"] = [
+                {"cmd": "blockMesh", "state": "success"} for _ in range(5)
+            ]
+    return project
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def cold_index(project: signac.Project) -> float:
+    shutil.rmtree(os.path.join(project.path, ".obr"), ignore_errors=True)
+    return timed(flatten_jobs, project)
+
+
+def emulate_latency(latency: float):
+    """Delays every read of a statepoint or job document by latency seconds"""
+    read_job_files = job_index.read_job_files
+
+    def delayed_read(job_path: str) -> tuple[dict, dict]:
+        time.sleep(latency)
+        return read_job_files(job_path)
+
+    job_index.read_job_files = delayed_read
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = create_workspace(tmp, args.jobs)
+        print(f"jobs: {args.jobs}")
+        if args.latency:
+            emulate_latency(args.latency)
+            print(f"emulated latency per job: {args.latency * 1e3:.2f}ms")
+        for workers in (1, args.workers):
+            os.environ["OBR_LOAD_WORKERS"] = str(workers)
+            print(f"workers: {workers}")
+            print(f"  full scan:        {timed(scan_jobs, project):.3f}s")
+            print(f"  index cold build: {cold_index(project):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
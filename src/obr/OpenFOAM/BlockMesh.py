@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 from ..core.core import modifies_file
+from ..core.hashing import md5sum
 from typing import TYPE_CHECKING, Any, Optional
 from subprocess import check_output
 import sys
@@ -103,15 +104,15 @@ class BlockMesh(_Base):
         fn = self.blockMeshDict
         if not fn:
             return None
-        return check_output(["md5sum", str(fn)], text=True)
+        return md5sum(fn)
 
     def refineMesh(self, args: dict):
         """ """
         modifies_file(self.polyMesh)
         if args.get("adapt_timestep", True):
-            modifies_file(self.controlDict.path)
             deltaT = float(self.controlDict.get("deltaT"))
-            self.controlDict.set({"deltaT": deltaT / 2.0})
+            with self.edit() as session:
+                session.set(self.controlDict, {"deltaT": deltaT / 2.0})
         self._exec_operation(["refineMesh", "-overwrite"])
 
     def modifyBlockMesh(self, args: dict):
@@ -133,8 +134,8 @@ class BlockMesh(_Base):
         modifies_file(self.polyMesh)
         controlDictArgs = args.pop("controlDict", False)
         if controlDictArgs:
-            modifies_file(self.controlDict.path)
-            self.controlDict.set(controlDictArgs)
+            with self.edit() as session:
+                session.set(self.controlDict, controlDictArgs)
         if args.get("modifyBlock"):
             self.modifyBlockMesh(args)
         self._exec_operation(["blockMesh"])
@@ -2,10 +2,15 @@
 import os
 import re
 import logging
-
-from typing import Union, Generator, Tuple, Any
+import shutil
+import weakref
+import threading
+
+from copy import deepcopy
+from contextlib import contextmanager
+from functools import cached_property
+from typing import Union, Generator, Tuple, Any, Iterable, Iterator, Optional
 from pathlib import Path
-from subprocess import check_output
 from signac.job import Job
 from datetime import datetime
 from Owls.parser.FoamDict import FileParser
@@ -15,12 +20,26 @@ from ..core.core import (
     logged_execute,
     logged_func,
     modifies_file,
+    record_touched,
     path_to_key,
     TemporaryFolder,
     DelinkFolder,
     find_time_folder,
+    buffered_doc,
+)
+from ..core.hashing import invalidate_hash, md5sum, md5sums, stat_signature
+from ..core.history import job_history
+from ..core.logs import (
+    clear_superseded_pending_log,
+    index_latest_log,
+    indexed_latest_log,
+    is_log_file,
+    log_codec,
+    pending_log,
+    plain_log,
 )
 from .BlockMesh import BlockMesh, calculate_simple_partition
+from .literals import decode_value
 
 logger = logging.getLogger("OBR")
 
@@ -31,6 +50,85 @@ OF_HEADER_REGEX = r"""(/\*--------------------------------\*- C\+\+ -\*---------
 (\||)\s*\\\\  /    A nd           \| (Web:|Version:|Website)\s*[\d\w\W]*\s*(\||)
 (\||)\s*\\\\/     M anipulation  \|(\s*\||)
 \\\*---------------------------------------------------------------------------\*/)"""
+OF_HEADER_PATTERN = re.compile(OF_HEADER_REGEX)
+
+# the header is searched in the first lines of this many bytes of a file
+HEADER_READ_BYTES = 4096
+HEADER_LINES = 7
+
+# maps absolute paths to the stat signature of the file and whether it has an
+# OpenFOAM header
+_header_cache: dict[str, tuple[tuple[int, int, int, int], bool]] = {}
+
+
+def has_openfoam_header(path: Union[str, Path]) -> bool:
+    """Checks whether a file starts with an OpenFOAM header
+
+    Only the first HEADER_READ_BYTES are read and the result is cached until
+    the `stat_signature` of the file changes.
+    """
+    key = os.path.abspath(path)
+    try:
+        signature = stat_signature(os.stat(key))
+    except FileNotFoundError:
+        return False
+    cached = _header_cache.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    with open(key, "rb") as fh:
+        head = fh.read(HEADER_READ_BYTES)
+    verdict = False
+    # reject binary and other files on their first bytes
+    if head.startswith(b"/*"):
+        try:
+            lines = head.split(b"\n", HEADER_LINES)[:HEADER_LINES]
+            header = b"\n".join(lines).decode().replace("\r", "")
+            verdict = OF_HEADER_PATTERN.match(header) is not None
+        except UnicodeDecodeError:
+            pass
+    _header_cache[key] = (signature, verdict)
+    return verdict
+
+
+# maps resolved file paths to the size and modification time of the file and
+# the parsed state of a FileParser, such that files which are symlinked by many
+# jobs are only parsed once per process
+_parse_cache: dict[str, tuple[tuple[int, int], dict]] = {}
+_parse_cache_lock = threading.Lock()
+
+# attributes owned by File handles, all other attributes belong to the parser
+HANDLE_ATTRIBUTES = {
+    "_file",
+    "_folder",
+    "_md5sum",
+    "decoded_",
+    "init_state_",
+    "job",
+    "missing",
+    "parse_key_",
+}
+
+
+def same_value(a: Any, b: Any) -> bool:
+    """Compares two attribute values, values which can not be compared are
+    considered different"""
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+def invalidate_parse_cache(path: Union[str, Path]):
+    """Removes the parsed state of the file at path from the parse cache"""
+    with _parse_cache_lock:
+        _parse_cache.pop(os.path.realpath(path), None)
+
+
+def clear_parse_cache():
+    """Removes all parsed states from the parse cache"""
+    with _parse_cache_lock:
+        _parse_cache.clear()
 
 
 class File(FileParser):
@@ -46,30 +144,103 @@ class File(FileParser):
             return
         super().__init__(**kwargs, skip_update=True)
         self._md5sum = None
+        # the state of the parser before parsing, attributes which differ
+        # after parsing form the parsed state
+        state = self.parser_state()
+        try:
+            self.init_state_ = (state, deepcopy(state))
+        except TypeError:
+            self.init_state_ = (state, None)
+
+    def parser_state(self) -> dict:
+        """Returns all attributes of the underlying parser"""
+        return {k: v for k, v in vars(self).items() if k not in HANDLE_ATTRIBUTES}
+
+    def parsed_state(self) -> dict:
+        """Returns the attributes the parser added or changed since the handle
+        was created
+
+        The parsed state is derived from the parser object instead of a list
+        of known attributes, such that no state of a parser is missed and no
+        state of another file is shared.
+        """
+        initial, snapshot = self.__dict__.get("init_state_", ({}, None))
+
+        def changed(k: str, v: Any) -> bool:
+            if k not in initial:
+                return True
+            if snapshot is None:
+                return v is not initial[k]
+            return not same_value(v, snapshot[k])
+
+        return {k: v for k, v in self.parser_state().items() if changed(k, v)}
 
     def get(self, name: str):
-        """Get a value from an OpenFOAM dictionary file"""
-        # TODO replace with a safer option
-        # also consider moving that to Owls
+        """Get a value from an OpenFOAM dictionary file
+
+        Scalars, vectors, lists and words are decoded via `decode_value`,
+        decoded values are memoized until the file changes.
+        """
         self.update()
+        version = self.__dict__.get("parse_key_")
+        if version is None:
+            return decode_value(super().get(name))
+        decoded = self.__dict__.get("decoded_")
+        if decoded is None or decoded[0] != version:
+            decoded = self.decoded_ = (version, {})
+        if name in decoded[1]:
+            return decoded[1][name]
+        value = decode_value(super().get(name))
+        if isinstance(value, (int, float, str, tuple)):
+            # only immutable values can be handed out repeatedly
+            decoded[1][name] = value
+        return value
+
+    def update(self):
+        """Parses the file unless it did not change since it was parsed
+
+        The parsed state is looked up in a process wide cache keyed by the
+        resolved path of the file and validated by its size and modification
+        time.
+        """
         try:
-            return eval(super().get(name))
-        except:
-            return super().get(name)
+            real_path = os.path.realpath(self.path)
+            st = os.stat(real_path)
+        except FileNotFoundError:
+            return super().update()
+        signature = (st.st_size, st.st_mtime_ns)
+        key = (real_path, signature)
+        if self.__dict__.get("parse_key_") == key:
+            return
+
+        cached = _parse_cache.get(real_path)
+        if cached and cached[0] == signature:
+            # handles must not share mutable parsed state
+            self.__dict__.update(deepcopy(cached[1]))
+        else:
+            super().update()
+            try:
+                state = deepcopy(self.parsed_state())
+            except TypeError:
+                # the parsed state can not be shared
+                state = None
+            if state is not None:
+                with _parse_cache_lock:
+                    _parse_cache[real_path] = (signature, state)
+        self.parse_key_ = key
 
     def md5sum(self, refresh=False) -> str:
         """Compute a files md5sum"""
         if not self.path.exists():
             raise FileNotFoundError(self.path)
         if not self._md5sum or refresh:
-            self._md5sum = check_output(["md5sum", str(self.path)], text=True)
+            self._md5sum = md5sum(self.path, refresh=refresh)
         return self._md5sum
 
     def is_modified(self) -> bool:
         if not self._md5sum:
             return False
-        current_md5sum = check_output(["md5sum", str(self.path)], text=True)
-        return self._md5sum != current_md5sum
+        return self._md5sum != md5sum(self.path)
 
     # @decorator_modifies_file
     def set(self, args: dict):
@@ -92,43 +263,131 @@ class File(FileParser):
         else:
             self.set_key_value_pairs(args_copy)
 
+        invalidate_parse_cache(self.path)
+        invalidate_hash(self.path)
+        self.parse_key_ = None
         self.update()
         self.md5sum(refresh=True)
 
 
+class EditSession:
+    """Collects changes of several dictionary files of a case and writes them
+    when the session is committed
+
+    Every file is parsed once, the changes are applied to a temporary copy
+    which replaces the file, hence readers never see partially written files
+    and symlinks to a parent case are replaced instead of written through.
+    All changes are recorded in a single history record and the md5sums of
+    the written files are computed in one pass.
+    """
+
+    def __init__(self, case: "OpenFOAMCase"):
+        self.case = case
+        self.changes: dict[Path, dict] = {}
+
+    def set(self, file: Union[str, Path, File], args: dict):
+        """Adds changes of the file, a File handle or a path relative to the
+        case folder"""
+        path = file.path if isinstance(file, File) else self.case.path / file
+        self.changes.setdefault(Path(os.path.abspath(path)), {}).update(args)
+
+    def _write(self, path: Path, args: dict):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        shutil.copy(path, tmp)
+        try:
+            handle = File(folder=tmp.parent, file=tmp.name, job=None)
+            handle.update()
+            handle.set_key_value_pairs(args)
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+            invalidate_parse_cache(tmp)
+        invalidate_parse_cache(path)
+        invalidate_hash(path)
+        record_touched(path)
+
+    def commit(self):
+        """Writes all collected changes"""
+        if not self.changes:
+            return
+        changes, self.changes = self.changes, {}
+
+        def edit_dictionaries(files: dict):
+            for path, args in changes.items():
+                self._write(path, args)
+
+        files = {os.path.relpath(p, self.case.path): a for p, a in changes.items()}
+        if self.case.job:
+            logged_func(edit_dictionaries, self.case.job.doc, files=files)
+        else:
+            edit_dictionaries(files)
+
+        digests = md5sums(changes)
+        handles = [*self.case.__dict__.values(), *self.case.file_dict.values()]
+        for handle in handles:
+            if isinstance(handle, File):
+                digest = digests.get(Path(os.path.abspath(handle.path)))
+                if digest:
+                    handle._md5sum = digest
+
+
 class OpenFOAMCase(BlockMesh):
-    """A class for simple access to typical OpenFOAM files"""
+    """A class for simple access to typical OpenFOAM files
+
+    File handles and the config file tree are created on first access, use
+    `get_case` to reuse the case object of a job within a process.
+    """
 
     latest_log_path_: Path = Path()
 
     def __init__(self, path, job):
         self.path_ = Path(path)
         self.job: Job = job
-
-        # Non-optional files system folder files
-        self.controlDict = File(folder=self.system_folder, file="controlDict", job=job)
-        self.fvSolution = File(folder=self.system_folder, file="fvSolution", job=job)
-        self.fvSchemes = File(folder=self.system_folder, file="fvSchemes", job=job)
-
-        self.transportProperties = File(
-            folder=self.constant_folder, file="transportProperties", job=job
+        self.file_dict: dict[str, File] = dict()
+        self.file_tree_scanned_ = False
+
+    def rebind(self, job: Job):
+        """Lets the case and its file handles refer to job, for example if the
+        case is reused with another Job instance of the same job"""
+        self.job = job
+        for handle in [*self.__dict__.values(), *self.file_dict.values()]:
+            if isinstance(handle, File):
+                handle.job = job
+
+    # Non-optional files system folder files
+    @cached_property
+    def controlDict(self) -> File:
+        return File(folder=self.system_folder, file="controlDict", job=self.job)
+
+    @cached_property
+    def fvSolution(self) -> File:
+        return File(folder=self.system_folder, file="fvSolution", job=self.job)
+
+    @cached_property
+    def fvSchemes(self) -> File:
+        return File(folder=self.system_folder, file="fvSchemes", job=self.job)
+
+    @cached_property
+    def transportProperties(self) -> File:
+        return File(
+            folder=self.constant_folder, file="transportProperties", job=self.job
         )
 
-        # optional but commonly used files
-        self.decomposeParDict = False
-        if Path(self.system_folder / "decomposeParDict").exists():
-            self.decomposeParDict = File(
-                folder=self.system_folder, file="decomposeParDict", job=job
-            )
-
-        self.turbulenceProperties = False
-        if Path(self.constant_folder / "turbulenceProperties").exists():
-            self.turbulenceProperties = File(
-                folder=self.constant_folder, file="turbulenceProperties", job=job
-            )
+    # optional but commonly used files
+    @cached_property
+    def decomposeParDict(self) -> Union[File, bool]:
+        if not Path(self.system_folder / "decomposeParDict").exists():
+            return False
+        return File(folder=self.system_folder, file="decomposeParDict", job=self.job)
 
-        self.file_dict: dict[str, File] = dict()
-        self.config_file_tree
+    @cached_property
+    def turbulenceProperties(self) -> Union[File, bool]:
+        if not Path(self.constant_folder / "turbulenceProperties").exists():
+            return False
+        return File(
+            folder=self.constant_folder, file="turbulenceProperties", job=self.job
+        )
 
     @property
     def path(self) -> Path:
@@ -191,11 +450,15 @@ class OpenFOAMCase(BlockMesh):
             # const_polymesh and system_include can be None
             return
         if folder.is_dir():
-            for f_path in folder.iterdir():
-                if f_path.is_file() and not f_path.is_symlink():
+            # scandir provides the file type without additional stat calls
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    f_path = folder / entry.name
                     if self.has_openfoam_header(f_path):
                         rel_path = str(f_path.relative_to(self.path))
-                        file_obj = File(folder=folder, file=f_path.name, job=self.job)
+                        file_obj = File(folder=folder, file=entry.name, job=self.job)
                         yield file_obj, rel_path
 
     @property
@@ -219,9 +482,19 @@ class OpenFOAMCase(BlockMesh):
     def latest_log(self) -> LogFile:
         """Returns handle to the latest log"""
         log = self.latest_solver_log_path
-        if not log.exists():
+        if not log or not log.exists():
             raise ValueError("No Logfile found")
-        self.latest_log_handle_ = LogFile(log, matcher=[])
+        if not log_codec(log):
+            self.latest_log_handle_ = LogFile(log, matcher=[])
+            return self.latest_log_handle_
+        # compressed logs are parsed from a temporary plain copy which lives
+        # as long as the handle. Since compressed logs do not change anymore
+        # the handle is reused instead of decompressing the log again
+        if getattr(self, "latest_compressed_log_", None) != log:
+            plain = plain_log(log)
+            self.latest_log_handle_ = LogFile(plain, matcher=[])
+            weakref.finalize(self.latest_log_handle_, os.remove, plain)
+            self.latest_compressed_log_ = log
         return self.latest_log_handle_
 
     @property
@@ -239,15 +512,24 @@ class OpenFOAMCase(BlockMesh):
         solver = self.solver
         root, _, files = next(os.walk(self.path))
         log_files = [
-            Path(root) / f for f in files if f.endswith(".log") and f.startswith(solver)
+            Path(root) / f for f in files if is_log_file(f) and f.startswith(solver)
         ]
         log_files.sort()
         return log_files
 
     def fetch_latest_log(self) -> None:
+        """Looks up the latest solver log in the job cache and only scans the
+        case folder if no existing log is indexed"""
+        solver = self.solver
+        if log := indexed_latest_log(self.job.doc, solver):
+            self.latest_log_path_ = log
+            return
         log_files = self.fetch_logs()
+        if pending_log(self.job.doc):
+            clear_superseded_pending_log(self.job.doc, job_history(self.job))
         if log_files:
             self.latest_log_path_ = log_files[-1]
+            index_latest_log(self.job.doc, solver, self.latest_log_path_)
         else:
             self.latest_log_path_ = None
 
@@ -264,18 +546,16 @@ class OpenFOAMCase(BlockMesh):
         # take very long
         # for file, rel_path in self.config_files_in_folder(self.const_polyMesh_folder):
         #     self.file_dict[rel_path] = file
+        self.file_tree_scanned_ = True
         return list(self.file_dict.keys())
 
     def get(self, key: str) -> Union[File, None]:
+        if not self.file_tree_scanned_:
+            self.config_file_tree
         return self.file_dict.get(key, None)
 
     def has_openfoam_header(self, path: Path) -> bool:
-        with path.open() as f:
-            try:
-                header = "".join(f.readlines()[:7])
-                return re.match(OF_HEADER_REGEX, header) is not None
-            except UnicodeDecodeError:
-                return False
+        return has_openfoam_header(path)
 
     def _exec_operation(self, operation) -> Path:
         return logged_execute(operation, self.path, self.job.doc)
@@ -343,16 +623,24 @@ class OpenFOAMCase(BlockMesh):
                 if not coeffs:
                     coeffs = calculate_simple_partition(numberSubDomains, [1, 1, 1])
 
-            self.decomposeParDict.set({
+            decomposeParDictArgs = {
                 "method": method,
                 "numberOfSubdomains": numberSubDomains,
                 "simpleCoeffs": {"n": coeffs},
-            })
+            }
         else:
-            self.decomposeParDict.set({
+            decomposeParDictArgs = {
                 "method": method,
                 "numberOfSubdomains": numberSubDomains,
-            })
+            }
+
+        # decomposePar does not read the fvSolution, hence both dictionaries
+        # are written at once before decomposing
+        with self.edit() as session:
+            session.set(self.decomposeParDict, decomposeParDictArgs)
+            fvSolutionArgs = args.get("fvSolution", {})
+            if fvSolutionArgs:
+                session.set(self.fvSolution, fvSolutionArgs)
 
         log = self._exec_operation(["decomposePar", "-force"])
 
@@ -361,10 +649,6 @@ class OpenFOAMCase(BlockMesh):
         if tmp_constant_folder:
             tmp_constant_folder.tear_down()
 
-        fvSolutionArgs = args.get("fvSolution", {})
-        if fvSolutionArgs:
-            self.fvSolution.set(fvSolutionArgs)
-
         if not find_time_folder(self.path / "processor0"):
             logger.warning(
                 f"Decomposing case {self.job.id}. No time in processor folder found."
@@ -372,12 +656,23 @@ class OpenFOAMCase(BlockMesh):
             )
         return log
 
+    @contextmanager
+    def edit(self) -> Iterator[EditSession]:
+        """Opens an `EditSession` which is committed when leaving the context
+        without an exception, eg.
+
+        with case.edit() as session:
+            session.set(case.controlDict, {"endTime": 10})
+            session.set("system/fvSolution", {"solvers": {...}})
+        """
+        session = EditSession(self)
+        yield session
+        session.commit()
+
     def setKeyValuePair(self, args: dict):
         path = Path(args.pop("file"))
-        file_handle = File(
-            folder=self.path_ / path.parents[0], file=path.parts[-1], job=self.job
-        )
-        file_handle.set_key_value_pairs(args)
+        with self.edit() as session:
+            session.set(path, args)
 
     def run(self, args: dict):
         solver = self.controlDict.get("application")
@@ -387,24 +682,37 @@ class OpenFOAMCase(BlockMesh):
         """Checks if a file has been modified by comparing the current md5sum with
         the previously saved one inside `self.job.dict`.
         """
-        if "md5sum" not in self.job.doc["cache"]:
-            return False  # no md5sum has been calculated for this file
-        current_md5sum, last_modified = self.job.doc["cache"]["md5sum"].get(file)
-        if os.path.getmtime(self.path / file) == last_modified:
-            # if modification dates dont differ, the md5sums wont, either
-            return False
-        md5sum = check_output(["md5sum", file], text=True)
-        return current_md5sum != md5sum
+        return file in self._modified_files([file])
+
+    def _modified_files(self, files: list[str]) -> list[str]:
+        """Returns the files whose md5sum differs from the one stored in the job
+        document, files are hashed concurrently"""
+        stored = self.job.doc.get("cache", {}).get("md5sum")
+        if not stored:
+            return []  # no md5sums have been calculated yet
+        candidates = {}
+        for file in files:
+            entry = stored.get(path_to_key(file))
+            if not entry:
+                continue
+            last_md5sum, last_modified = entry
+            path = self.path / file
+            if os.path.getmtime(path) == last_modified:
+                # if modification dates dont differ, the md5sums wont, either
+                continue
+            candidates[path] = (file, last_md5sum)
+        current = md5sums(candidates)
+        return [
+            file
+            for path, (file, last_md5sum) in candidates.items()
+            if current.get(path) != last_md5sum
+        ]
 
     def is_tree_modified(self) -> list[str]:
         """Iterates all files inside the case tree and returns a list of files that
         were modified, based on their md5sum.
         """
-        m_files = []
-        for file in self.config_file_tree:
-            if self.is_file_modified(file):
-                m_files.append(file)
-        return m_files
+        return self._modified_files(self.config_file_tree)
 
     def process_latest_time_stats(self) -> bool:
         """This function parses the latest time step log and stores the results in
@@ -412,6 +720,14 @@ class OpenFOAMCase(BlockMesh):
 
         Return: A boolean indication whether processing was successful
         """
+        with buffered_doc(self.job):
+            processed = self._process_latest_time_stats()
+            if self.latest_log_path_:
+                # keep size and modification time of the indexed log up to date
+                index_latest_log(self.job.doc, self.solver, self.latest_log_path_)
+            return processed
+
+    def _process_latest_time_stats(self) -> bool:
         if not self.latest_log:
             return False
 
@@ -462,23 +778,74 @@ class OpenFOAMCase(BlockMesh):
         for log in self.fetch_logs():
             log = self._exec_operation(["rm", str(log)])
 
-    def perform_post_md5sum_calculations(self):
+    def touched_config_files(self, touched: Iterable[str]) -> Optional[list[str]]:
+        """Returns the config files of the case tree which are affected by the
+        touched files and folders
+
+        Returns: None if a touched folder contains config folders and the
+        complete case tree needs to be considered
+        """
+        case_path = Path(os.path.abspath(self.path))
+        config_folders = [
+            Path(os.path.abspath(folder))
+            for folder in [
+                self.system_folder,
+                self.constant_folder,
+                self.system_include_folder,
+            ]
+        ]
+        files = []
+        for path in map(Path, touched):
+            if path.is_dir():
+                if any(path == f or path in f.parents for f in config_folders):
+                    return None
+                continue
+            if path.parent in config_folders:
+                files.append(str(path.relative_to(case_path)))
+        return files
+
+    def perform_post_md5sum_calculations(self, touched: Optional[Iterable[str]] = None):
         """
         calculates md5sums for all case files. Primarily called from `dispatch_post_hooks`
+
+        If the paths touched by the operation are known, only the md5sums of the
+        touched config files are updated and all other md5sums are kept.
         """
-        for case_path in self.config_file_tree:
-            case_file = Path(self.job.path) / "case" / case_path
-            md5sum = check_output(["md5sum", case_file], text=True)
+        stored = self.job.doc["cache"].get("md5sum")
+        case_paths = None
+        if touched is not None and stored:
+            case_paths = self.touched_config_files(touched)
+        if case_paths is None:
+            case_paths = self.config_file_tree
+            removed = []
+        else:
+            removed = [
+                case_path
+                for case_path in case_paths
+                if (self.path / case_path).is_symlink()
+                or not (self.path / case_path).is_file()
+                or not self.has_openfoam_header(self.path / case_path)
+            ]
+            case_paths = [p for p in case_paths if p not in removed]
+
+        case_files = {self.path / case_path: case_path for case_path in case_paths}
+        case_md5sums = md5sums(case_files)
+        with buffered_doc(self.job):
             if "md5sum" not in self.job.doc["cache"]:
                 self.job.doc["cache"]["md5sum"] = dict()
-            signac_friendly_path = path_to_key(
-                str(case_path)
-            )  # signac does not allow . inside paths or job.doc keys
-            last_modified = os.path.getmtime(case_file)
-            self.job.doc["cache"]["md5sum"][signac_friendly_path] = (
-                md5sum.split()[0],
-                last_modified,
-            )
+            for case_path in removed:
+                self.job.doc["cache"]["md5sum"].pop(path_to_key(case_path), None)
+            for case_file, case_path in case_files.items():
+                if case_file not in case_md5sums:
+                    continue
+                signac_friendly_path = path_to_key(
+                    str(case_path)
+                )  # signac does not allow . inside paths or job.doc keys
+                last_modified = os.path.getmtime(case_file)
+                self.job.doc["cache"]["md5sum"][signac_friendly_path] = (
+                    case_md5sums[case_file],
+                    last_modified,
+                )
 
     def was_successful(self) -> bool:
         """Returns True, if both its label and the last OBR operation returned successful, False otherwise."""
@@ -496,6 +863,8 @@ class OpenFOAMCase(BlockMesh):
                 if k == "md5sum":
                     continue
 
+                if not isinstance(v, list) or not v:
+                    continue
                 last_of_obr_op = v[-1]
                 if not (time := last_of_obr_op.get("timestamp", None)):
                     continue
@@ -511,3 +880,47 @@ class OpenFOAMCase(BlockMesh):
                     last_op_state = last_of_obr_op["state"]
         label_state = self.job.doc["state"]
         return last_op_state == label_state == "success"
+
+
+# case objects constructed by this process, keyed by the absolute case path
+_case_registry: dict[str, tuple[tuple, OpenFOAMCase]] = {}
+_case_registry_lock = threading.Lock()
+
+
+def case_signature(path: Path) -> tuple:
+    """Returns the modification times of the case, system and constant folder,
+    which change whenever files are added, removed or replaced"""
+    signature = []
+    for folder in [path, path / "system", path / "constant"]:
+        try:
+            signature.append(os.stat(folder).st_mtime_ns)
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def get_case(path: Union[str, Path], job: Job) -> OpenFOAMCase:
+    """Returns the case object of the case at path
+
+    The case object is reused within a process as long as the case folder
+    signature does not change, such that file handles and the config file tree
+    are only built once per operation.
+    """
+    key = os.path.abspath(path)
+    signature = case_signature(Path(key))
+    with _case_registry_lock:
+        entry = _case_registry.get(key)
+        if entry and entry[0] == signature:
+            case = entry[1]
+            if case.job is not job:
+                case.rebind(job)
+            return case
+        case = OpenFOAMCase(path, job)
+        _case_registry[key] = (signature, case)
+        return case
+
+
+def clear_case_registry():
+    """Removes all cached case objects"""
+    with _case_registry_lock:
+        _case_registry.clear()
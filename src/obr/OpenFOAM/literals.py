@@ -0,0 +1,68 @@
+import re
+
+from functools import lru_cache
+from typing import Any, Union
+
+INT_REGEX = re.compile(r"[+-]?\d+")
+FLOAT_REGEX = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+TOKEN_REGEX = re.compile(r"[()]|[^\s()]+")
+
+FoamValue = Union[int, float, str, tuple]
+
+
+def decode_token(token: str) -> Union[int, float, str]:
+    """Decodes a single scalar or word"""
+    if INT_REGEX.fullmatch(token):
+        return int(token)
+    if FLOAT_REGEX.fullmatch(token):
+        return float(token)
+    return token
+
+
+@lru_cache(maxsize=4096)
+def decode_literal(value: str) -> FoamValue:
+    """Decodes an OpenFOAM scalar, vector, list or word value
+
+    Scalars are returned as int or float, vectors and lists like (1 0 0) or
+    ((0 1) (2 3)) as tuples and words as str. Everything else, for example
+    uniform (0 0 0), is returned unchanged.
+    """
+    tokens = TOKEN_REGEX.findall(value)
+    if not tokens:
+        return value
+    if len(tokens) == 1:
+        return decode_token(tokens[0])
+    if tokens[0] != "(":
+        return value
+
+    stack: list[list] = []
+    result: Any = None
+    for i, token in enumerate(tokens):
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            if not stack:
+                return value
+            items = tuple(stack.pop())
+            if stack:
+                stack[-1].append(items)
+            elif i == len(tokens) - 1:
+                result = items
+            else:
+                # trailing tokens after the outermost list
+                return value
+        elif stack:
+            stack[-1].append(decode_token(token))
+        else:
+            return value
+    if stack or result is None:
+        return value
+    return result
+
+
+def decode_value(value: Any) -> Any:
+    """Decodes values returned by the dictionary parser, non string values are
+    returned unchanged"""
+    if isinstance(value, str):
+        return decode_literal(value)
+    return value
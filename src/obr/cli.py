@@ -24,7 +24,6 @@ import shutil
 import functools
 
 from pathlib import Path
-from subprocess import check_output
 
 from git.repo import Repo
 from git.util import Actor
@@ -42,6 +41,13 @@ from .cli_util import (
     copy_to_archive,
 )
 from .core.core import map_view_folder_to_job_id, profile_call
+from .core.hashing import md5sum
+from .core.history import compact_history
+from .core.job_index import parallel_map, workspace_job_paths
+from .core.logs import is_log_file
+from .core.merge import merge_jobs
+from .core.queries import Query, load_jobs
+from .core.resources import aggregate_resources
 from .core.logger_setup import logger, setup_logging
 
 
@@ -60,12 +66,23 @@ def common_params(func):
             "solver==pisoFoam"
         ),
     )
+    @click.option(
+        "--load_workers",
+        type=int,
+        required=False,
+        help=(
+            "Number of threads reading job documents concurrently. Defaults to"
+            " OBR_LOAD_WORKERS or 8."
+        ),
+    )
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         if kwargs.get("debug"):
             logger = logging.getLogger("OBR")
             logger.setLevel(logging.DEBUG)
             logger.info("Setting output level to debug")
+        if kwargs.get("load_workers"):
+            os.environ["OBR_LOAD_WORKERS"] = str(kwargs["load_workers"])
         return func(*args, **kwargs)
 
     return wrapper
@@ -330,11 +347,21 @@ def status(ctx: click.Context, **kwargs):
         logger.warning(f"No jobs can be displayed for summarize depth {sum}")
         return
 
+    # evaluate the labels of all jobs concurrently since each label reads the
+    # job document
+    grouped = [job for _, jobs in sorted(grouped_jobs.items()) for job in jobs]
+    is_finished = dict(
+        zip(
+            [job.id for job in grouped],
+            parallel_map(lambda job: "finished" in project.labels(job), grouped),
+        )
+    )
+
     max_view_len = len(max(grouped_jobs.keys(), key=lambda k: len(k)))
     for view, jobs in sorted(grouped_jobs.items()):
         finished = unfinished = 0
         for job in jobs:
-            if "finished" in project.labels(job):
+            if is_finished[job.id]:
                 finished += 1
             else:
                 unfinished += 1
@@ -361,7 +388,10 @@ def status(ctx: click.Context, **kwargs):
     "--export_to",
     required=False,
     multiple=False,
-    help="Write results to a json file.",
+    help=(
+        "Write results to a json file. Results are streamed to the file, use a"
+        " .ndjson suffix to write one json object per job and line."
+    ),
 )
 @click.option(
     "--validate_against",
@@ -662,11 +692,14 @@ def archive(ctx: click.Context, **kwargs):
             if not signac_job_document.exists():
                 continue
 
-            md5sum = check_output(
-                ["md5sum", str(signac_job_document)], text=True
-            ).split()[0]
+            # fold pending history records into the job document, the
+            # journal is not archived
+            if not dry_run:
+                compact_history(job.doc)
+            doc_md5sum = md5sum(signac_job_document)
             target_file = (
-                target_folder / f"workspace/{job.id}/signac_job_document_{md5sum}.json"
+                target_folder
+                / f"workspace/{job.id}/signac_job_document_{doc_md5sum}.json"
             )
             if dry_run:
                 logger.info(f"Would copy {signac_job_document} to {target_file}.")
@@ -694,7 +727,7 @@ def archive(ctx: click.Context, **kwargs):
                 src_file = Path(root) / file
                 if src_file.is_relative_to(current_path):
                     src_file = src_file.relative_to(current_path)
-                if file.endswith("log"):
+                if is_log_file(file):
                     target_file = (
                         target_folder / f"workspace/{job.id}/{campaign}/{tags}/{file}"
                     )
@@ -749,6 +782,83 @@ def archive(ctx: click.Context, **kwargs):
                 logger.error(e)
 
 
+@cli.command()
+@common_params
+@click.pass_context
+def stats(ctx: click.Context, **kwargs):
+    """Aggregates wall time, cpu time and peak memory of the executed operations
+    per operation"""
+    _, jobs = cli_cmd_setup(kwargs)
+    docs, _ = load_jobs(jobs, [Query(key="history")])
+    operations = aggregate_resources(
+        (job_id, doc.get("history")) for job_id, doc in docs.items()
+    )
+    if not operations:
+        logger.warning("No history records with resource usage found")
+        return
+
+    total = sum(op.wall_time for op in operations)
+    width = max(len(op.cmd) for op in operations)
+    logger.info(
+        f"{'operation':{width}} | calls |  jobs | wall [s] |  share | mean [s] |"
+        " max [s] |  cpu [s] | max rss [MiB]"
+    )
+    for op in operations:
+        share = op.wall_time / total * 100 if total else 0.0
+        logger.info(
+            f"{op.cmd:{width}} | {op.calls:5d} | {len(op.jobs):5d} |"
+            f" {op.wall_time:8.1f} | {share:5.1f}% | {op.mean_wall_time:8.2f} |"
+            f" {op.max_wall_time:7.1f} | {op.cpu_time:8.1f} |"
+            f" {'<=' if op.max_rss_bounded else '':>2}{op.max_rss / 1024:11.1f}"
+        )
+    if any(op.max_rss_bounded for op in operations):
+        logger.info(
+            "<= the peak memory of the command did not exceed the memory it"
+            " shared with OBR when started, its own peak is at most this value"
+        )
+
+
+@cli.command()
+@common_params
+@click.option(
+    "-w",
+    "--workspace",
+    required=False,
+    help=(
+        "Merge all jobs of a workspace folder, e.g. of an archive repository, instead"
+        " of the jobs of the current project."
+    ),
+)
+@click.option(
+    "-j",
+    "--processes",
+    type=int,
+    required=False,
+    help="Number of worker processes. Defaults to the number of cpus.",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    help="Merge jobs even if their fragments did not change since the last merge.",
+)
+@click.pass_context
+def merge(ctx: click.Context, **kwargs):
+    """Merges signac_job_document_<hash>.json fragments into the job documents"""
+    if workspace := kwargs.get("workspace"):
+        log_folder = Path(workspace).absolute().parent
+        (log_folder / ".obr").mkdir(exist_ok=True)
+        setup_logging(str(log_folder))
+        paths = [path for _, path in workspace_job_paths(workspace)]
+    else:
+        _, jobs = cli_cmd_setup(kwargs)
+        paths = [job.path for job in jobs]
+
+    merged = merge_jobs(
+        paths, force=kwargs.get("force", False), processes=kwargs.get("processes")
+    )
+    logger.info(f"Merged job documents of {len(merged)} of {len(paths)} jobs")
+
+
 def main():
     cli(obj={})
 
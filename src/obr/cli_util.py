@@ -2,7 +2,6 @@ import json
 import logging
 import os
 import sys
-from copy import deepcopy
 from pathlib import Path
 from subprocess import check_output
 from typing import Optional, Union, Any
@@ -17,6 +16,44 @@ from .signac_wrapper.operations import OpenFOAMProject
 logger = logging.getLogger("OBR")
 
 
+class ResultWriter:
+    """Streams query results to a json file while they are produced
+
+    Files ending in .ndjson or .jsonl get one json object per job and line,
+    otherwise a single json object mapping job ids to results is written.
+    """
+
+    def __init__(self, json_file: Optional[str]):
+        self.json_file = json_file
+        self.ndjson = bool(json_file) and json_file.endswith((".ndjson", ".jsonl"))
+        self.outfile = None
+        self.count = 0
+
+    def __enter__(self) -> "ResultWriter":
+        if self.json_file:
+            self.outfile = open(self.json_file, "w")
+            if not self.ndjson:
+                self.outfile.write("{")
+        return self
+
+    def write(self, job_id: str, result: dict):
+        if not self.outfile:
+            return
+        if self.ndjson:
+            self.outfile.write(json.dumps({job_id: result}) + "\n")
+        else:
+            sep = ", " if self.count else ""
+            self.outfile.write(f"{sep}{json.dumps(job_id)}: {json.dumps(result)}")
+        self.count += 1
+
+    def __exit__(self, *args):
+        if not self.outfile:
+            return
+        if not self.ndjson:
+            self.outfile.write("}")
+        self.outfile.close()
+
+
 def query_impl(
     project: OpenFOAMProject,
     input_queries: tuple[str],
@@ -30,18 +67,19 @@ def query_impl(
         return
     queries: list[Query] = build_filter_query(input_queries)
     jobs = project.filter_jobs(filters=list(filters))
-    query_results = project.query(jobs=jobs, query=queries)
-    if not quiet:
-        for job_id, query_res in deepcopy(query_results).items():
-            out_str = f"{job_id}:"
-            for k, v in query_res.items():
-                out_str += f" {k}: {v}"
-            logger.info(out_str)
-
-    if json_file:
-        with open(json_file, "w") as outfile:
-            # json_data refers to the above JSON
-            json.dump(query_results, outfile)
+    # results are only kept in memory if they are needed for validation
+    query_results: dict[str, dict] = {}
+    with ResultWriter(json_file) as writer:
+        for job_id, query_res in project.iter_query(jobs=jobs, query=queries):
+            if not quiet:
+                out_str = f"{job_id}:"
+                for k, v in query_res.items():
+                    out_str += f" {k}: {v}"
+                logger.info(out_str)
+            writer.write(job_id, query_res)
+            if validation_file:
+                query_results[job_id] = query_res
+
     if validation_file:
         with open(validation_file, "r") as infile:
             # json_data refers to the above JSON
@@ -3,16 +3,33 @@ import os
 import subprocess
 import re
 import logging
-import json
 import shutil
+import time
+import uuid
+import fcntl
+import shlex
 
 from pathlib import Path
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from subprocess import check_output
-from typing import Union, Generator
+from typing import Union, Generator, Iterator, Optional
 from datetime import datetime
 from signac.job import Job
 from copy import deepcopy
 
+from .history import append_history, compact_if_needed, is_buffered, job_history
+from .logs import (
+    clear_superseded_pending_log,
+    compress_log,
+    existing_log,
+    index_latest_log,
+    indexed_latest_log,
+    is_log_file,
+)
+from .merge import merge_job_path
+from .resources import ResourceTimer, rusage_resources, spawn_rss
+
 logger = logging.getLogger("OBR")
 
 # these are to be replaced with each other
@@ -46,74 +63,195 @@ def key_to_path(sign_path: Union[str, Path]) -> str:
     return str(sign_path).replace(SIGNAC_PATH_TOKEN, PATH_TOKEN)
 
 
-def logged_execute(cmd, path, doc) -> Path:
-    """execute cmd and logs success
+LOG_INLINE_LIMIT = 1000
+LOG_TAIL_BYTES = 4096
+LOG_TAIL_LINES = 10
 
-    If cmd is a string, it will be interpreted as shell cmd
-    otherwise a callable function is expected
 
-    Returns:
-        path to log file
+@dataclass
+class StreamedOutput:
+    """Summary of the output of a command streamed by `stream_output`
+
+    Attributes:
+        returncode: exit code of the command
+        log: the complete output if it was not written to a log file
+        tail: the last LOG_TAIL_LINES lines of the output
+        written: whether the output was written to the log file
+        resources: wall time, cpu times and peak memory of the command
     """
 
-    d = doc["history"]
-    cmd_str = " ".join(cmd)
-    cmd_str = path_to_key(cmd_str).split()  # replace dots in cmd_str with _dot_'s
-    if len(cmd_str) > 1:
-        flags = cmd_str[1:]
-    else:
-        flags = []
-    cmd_str = cmd_str[0]
-    try:
-        ret = check_output(cmd, cwd=path, stderr=subprocess.STDOUT).decode("utf-8")
-        log = ret
-        state = "success"
-    except subprocess.SubprocessError as e:
-        log = e.output.decode("utf-8")
-        logging.error("SubprocessError:" + __file__ + __name__ + str(e) + log)
-        state = "failure"
-    except FileNotFoundError as e:
-        logging.error(__file__ + __name__ + str(e))
-        log = cmd + " not found"
-        state = "failure"
-    except Exception as e:
-        logging.error(__file__ + __name__ + str(e))
-        logging.error("General Exception" + __file__ + __name__ + str(e) + e.output)
-        log = ret
-        state = "failure"
+    returncode: int
+    log: str
+    tail: str
+    written: bool
+    resources: dict = field(default_factory=dict)
 
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
-    log_path = None
 
-    # Only write log files above a certain size
-    # otherwise the log is stored directly in the job doc
-    if log and len(log) > 1000:
-        # the cmd_str might contain / for example if
-        # shell scripts are called. Hence we sanitize
-        # the script name
-        cmd_str_san = key_to_path(cmd_str.split("/")[-1])
-        fn = f"{cmd_str_san}_{timestamp}.log"
-        with open(path / fn, "w") as fh:
-            fh.write(log)
-        log = fn
-        log_path = path / fn
-
-    d.append({
+class OutputSink:
+    """Receives the output of a command in chunks and writes it to log_file
+
+    The log file is only created once the output exceeds LOG_INLINE_LIMIT
+    bytes. Apart from the short head of the output only a tail ring buffer of
+    LOG_TAIL_BYTES is kept in memory.
+    """
+
+    def __init__(self, log_file: Path):
+        self.log_file = log_file
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+        self.fh = None
+
+    def write(self, chunk: bytes):
+        self.total += len(chunk)
+        self.tail += chunk
+        del self.tail[:-LOG_TAIL_BYTES]
+        if self.fh is None:
+            self.head += chunk
+            if len(self.head) <= LOG_INLINE_LIMIT:
+                return
+            self.fh = open(self.log_file, "wb")
+            chunk = bytes(self.head)
+        self.fh.write(chunk)
+        self.fh.flush()
+
+    def close(self, returncode: int, resources: dict) -> StreamedOutput:
+        written = self.fh is not None
+        if written:
+            self.fh.close()
+        tail_lines = self.tail.decode("utf-8", errors="replace").splitlines()
+        if self.total > LOG_TAIL_BYTES:
+            # the first line was cut by the ring buffer
+            tail_lines = tail_lines[1:]
+        return StreamedOutput(
+            returncode=returncode,
+            log="" if written else self.head.decode("utf-8", errors="replace"),
+            tail="\n".join(tail_lines[-LOG_TAIL_LINES:]),
+            written=written,
+            resources=resources,
+        )
+
+
+def stream_output(cmd: list[str], cwd: Path, log_file: Path) -> StreamedOutput:
+    """Runs cmd and streams its stdout and stderr to log_file via an
+    `OutputSink`
+
+    The child is reaped via os.wait4 to obtain its resource usage. The peak
+    memory of the child includes the memory it shared with OBR before
+    executing cmd, hence the `spawn_rss` is stored as lower bound.
+    """
+    sink = OutputSink(log_file)
+    start = time.perf_counter()
+    with subprocess.Popen(
+        cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    ) as proc:
+        # Popen returns once cmd is executed, the peak memory of OBR at this
+        # point is at least the memory the child inherited
+        rss_floor = spawn_rss()
+        try:
+            while chunk := proc.stdout.read1(65536):
+                sink.write(chunk)
+        except BaseException:
+            if sink.fh is not None:
+                sink.fh.close()
+            raise
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall_time = time.perf_counter() - start
+        returncode = proc.returncode = os.waitstatus_to_exitcode(status)
+    return sink.close(returncode, rusage_resources(wall_time, usage, rss_floor))
+
+
+def split_cmd(cmd: list[str]) -> tuple[str, list[str]]:
+    """Splits a command into the command and its flags as stored in the history,
+    dots are replaced by _dot_'s"""
+    cmd_str = path_to_key(" ".join(cmd)).split()
+    return cmd_str[0], cmd_str[1:]
+
+
+def log_file_name(path: Path, cmd_str: str, timestamp: str) -> str:
+    """Returns the name of the log file of a command which does not exist yet"""
+    # the cmd_str might contain / for example if
+    # shell scripts are called. Hence we sanitize
+    # the script name
+    cmd_str_san = key_to_path(cmd_str.split("/")[-1])
+    fn = f"{cmd_str_san}_{timestamp}.log"
+    n = 1
+    while (path / fn).exists():
+        fn = f"{cmd_str_san}_{timestamp}_{n}.log"
+        n += 1
+    return fn
+
+
+def record_execution(
+    doc,
+    path: Path,
+    cmd_str: str,
+    flags: list[str],
+    output: StreamedOutput,
+    log_fn: str,
+    timestamp: str,
+) -> Union[Path, None]:
+    """Appends the history record of an executed shell command
+
+    Returns:
+        path to log file if the output was written to a log file
+    """
+    state = "success" if output.returncode == 0 else "failure"
+    if state == "failure":
+        logging.error(
+            f"SubprocessError: {cmd_str} returned {output.returncode}\n" + output.tail
+        )
+    record = {
         "cmd": cmd_str,
         "type": "shell",
-        "log": log,
+        "log": output.log,
         "state": state,
         "flags": flags,
         "timestamp": timestamp,
         "user": os.environ.get("USER"),
         "hostname": os.environ.get("HOST"),
-    })
-
-    doc["history"] = d
+        "resources": output.resources,
+    }
+    log_path = None
+    if output.written:
+        log_path = compress_log(path / log_fn)
+        record["log"] = log_path.name
+        record["tail"] = output.tail
 
+    append_history(doc, record)
     return log_path
 
 
+def logged_execute(cmd, path, doc) -> Path:
+    """execute cmd and logs success
+
+    If cmd is a string, it will be interpreted as shell cmd
+    otherwise a callable function is expected
+
+    The output is streamed to a log file as soon as it exceeds
+    LOG_INLINE_LIMIT characters, such that memory stays bounded and running
+    commands can be followed via tail -f. Shorter outputs are stored directly
+    in the job document. Log files are compressed once the command finished
+    if OBR_LOG_COMPRESSION is set.
+
+    Returns:
+        path to log file
+    """
+    cmd_str, flags = split_cmd(cmd)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
+    fn = log_file_name(path, cmd_str, timestamp)
+
+    with record_touched_config_files(path):
+        try:
+            output = stream_output(cmd, path, path / fn)
+        except FileNotFoundError as e:
+            logging.error(__file__ + __name__ + str(e))
+            output = StreamedOutput(-1, cmd_str + " not found", "", False)
+    record_touched(path / fn)
+
+    return record_execution(doc, path, cmd_str, flags, output, fn, timestamp)
+
+
 def logged_func(func, doc, **kwargs):
     """execute cmd and logs success
 
@@ -123,12 +261,15 @@ def logged_func(func, doc, **kwargs):
     from datetime import datetime
 
     cmd_str = func.__name__
-    try:
-        func(**kwargs)
-        state = "success"
-    except Exception as e:
-        logging.error("Failure" + __file__ + __name__ + func.__name__ + kwargs + str(e))
-        state = "failure"
+    with ResourceTimer() as timer:
+        try:
+            func(**kwargs)
+            state = "success"
+        except Exception as e:
+            logging.error(
+                "Failure" + __file__ + __name__ + func.__name__ + str(kwargs) + str(e)
+            )
+            state = "failure"
 
     res = {
         "cmd": cmd_str,
@@ -139,8 +280,32 @@ def logged_func(func, doc, **kwargs):
         "type": "logged_func",
         "user": os.environ.get("USER"),
         "hostname": os.environ.get("HOST"),
+        "resources": timer.resources,
     }
-    doc["history"].append(res)
+    append_history(doc, res)
+
+
+@contextmanager
+def buffered_doc(job: Job) -> Iterator:
+    """Collects all changes to the job document in memory and writes the
+    document once when leaving the context
+
+    signac rewrites the whole job document file for every assignment, hence
+    updates of several fields should be wrapped in this context. Nested
+    contexts are written by the outermost one. Documents which are not backed
+    by a file are yielded unchanged. History journals which exceeded the
+    compaction threshold while the document was buffered are compacted once
+    the document is written.
+    """
+    doc = job.doc
+    buffered = getattr(doc, "buffered", None)
+    if buffered is None:
+        yield doc
+        return
+    with buffered():
+        yield doc
+    if not is_buffered(doc):
+        compact_if_needed(doc)
 
 
 def get_mesh_stats(owner_path: str) -> dict:
@@ -170,37 +335,24 @@ def get_mesh_stats(owner_path: str) -> dict:
 
 
 def merge_job_documents(job: Job):
-    """Merge multiple job_document_hash.json files into job_document.json"""
-    root, _, files = next(os.walk(job.path))
+    """Merge multiple job_document_hash.json files into job_document.json
 
-    def is_job_sub_document(fn):
-        if fn == "signac_job_document.json":
-            return False
-        return fn.startswith("signac_job_document")
-
-    files = [f for f in files if is_job_sub_document(f)]
-    merged_data = []
-    merged_history = []
-    cache = None
-    for f in files:
-        with open(Path(root) / f) as fh:
-            job_doc = json.load(fh)
-            for record in job_doc["data"]:
-                merged_data.append(record)
-            for record in job_doc["history"]:
-                merged_history.append(record)
-            # TODO handle inconsistent cache
-            if not cache:
-                cache = job_doc["cache"]
-    job.doc = {"data": merged_data, "history": merged_history, "cache": cache}
+    Records are deduplicated and the history is ordered by timestamp, see
+    `obr.core.merge.merge_documents`. Pending records of the history journal
+    are merged as well.
+    """
+    merge_job_path(job.path, force=True)
 
 
 def get_latest_log(job: Job) -> str:
     """Find latest log in job.id/case/folder
 
+    The log indexed in job.doc["cache"]["latest_log"] is used if it exists,
+    otherwise the history is scanned backwards.
+
     Returns: path to latest solver log
     """
-    from ..OpenFOAM.case import OpenFOAMCase
+    from ..OpenFOAM.case import get_case
 
     case_path = Path(job.path + "/case")
     # in case obr status is called directly after initialization
@@ -208,16 +360,21 @@ def get_latest_log(job: Job) -> str:
     if not case_path.exists():
         return ""
 
-    case = OpenFOAMCase(case_path, job)
+    case = get_case(case_path, job)
     solver = case.controlDict.get("application")
 
-    history = job.doc["history"]
+    if log_path := indexed_latest_log(job.doc, solver):
+        return log_path.name
+
+    history = job_history(job)
+    clear_superseded_pending_log(job.doc, history)
     for entry in history[::-1]:
-        if solver in entry().get("cmd", ""):
-            log_path = case_path / entry["log"]
-            if not log_path.exists():
+        if solver in entry.get("cmd", ""):
+            log_path = existing_log(case_path / entry["log"])
+            if not log_path:
                 continue
-            return entry["log"]
+            index_latest_log(job.doc, solver, log_path)
+            return log_path.name
     return ""
 
 
@@ -260,12 +417,164 @@ def find_solver_logs(job: Job) -> Generator[tuple, None, None]:
         for path, tags in tag_mapping.items():
             root, _, files = next(os.walk(path))
             for file in files:
-                if "Foam" in file and file.endswith("log"):
+                if "Foam" in file and is_log_file(file):
                     yield f"{root}/{file}", campaign, tags
 
 
+def shell_session_enabled() -> bool:
+    """Whether the steps of a shell operation run in a single persistent bash
+    process, see OBR_SHELL_SESSION"""
+    return os.environ.get("OBR_SHELL_SESSION", "").lower() in ("1", "true", "yes")
+
+
+def shell_concurrency() -> int:
+    """Returns the maximum number of concurrent shell operations across all
+    OBR processes of a project, 0 means unbounded, see OBR_SHELL_CONCURRENCY"""
+    try:
+        return max(0, int(os.environ.get("OBR_SHELL_CONCURRENCY", 0)))
+    except ValueError:
+        logger.warning("OBR_SHELL_CONCURRENCY is not an integer, ignoring it")
+        return 0
+
+
+@contextmanager
+def concurrency_slot(slot_dir: Path, limit: int) -> Iterator[Optional[int]]:
+    """Blocks until one of limit slots is free and holds it while the context
+    is active
+
+    Slots are advisory file locks in slot_dir, such that the limit holds
+    across the worker processes of obr run and several obr invocations on the
+    same project. A limit of 0 does not restrict the concurrency.
+
+    Yields: the index of the acquired slot or None if unbounded
+    """
+    if limit <= 0:
+        yield None
+        return
+    slot_dir.mkdir(parents=True, exist_ok=True)
+    delay = 0.01
+    while True:
+        for slot in range(limit):
+            fh = open(slot_dir / f"slot_{slot}", "a")
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                fh.close()
+                continue
+            try:
+                yield slot
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+                fh.close()
+            return
+        time.sleep(delay)
+        delay = min(2 * delay, 1.0)
+
+
+class ShellSession:
+    """A long lived bash process executing shell steps one after another
+
+    Steps are evaluated in the same shell, hence environment variables,
+    functions and the working directory carry over between steps. After each
+    step a unique marker followed by the exit code of the step is printed,
+    which separates the output of the individual steps. If a step exits the
+    shell the session is dead and the exit code of bash is returned.
+    """
+
+    def __init__(self, cwd: Path):
+        self.marker = f"__obr_step_{uuid.uuid4().hex}__".encode()
+        self.proc = subprocess.Popen(
+            ["bash", "--noprofile", "--norc", "-s"],
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def run(self, step: str, sink: OutputSink) -> int:
+        """Executes step and writes its output to sink
+
+        Returns: the exit code of the step
+        """
+        # eval keeps the session alive on syntax errors and
+        # steps must not consume the remaining script from stdin
+        script = (
+            f"eval {shlex.quote(step)} </dev/null\n"
+            f"printf '%s%d\\n' {self.marker.decode()} $?\n"
+        )
+        try:
+            self.proc.stdin.write(script.encode())
+            self.proc.stdin.flush()
+        except BrokenPipeError:
+            return self.proc.wait()
+
+        buf = bytearray()
+        while True:
+            idx = buf.find(self.marker)
+            if idx >= 0:
+                end = buf.find(b"\n", idx)
+                if end >= 0:
+                    if idx:
+                        sink.write(bytes(buf[:idx]))
+                    return int(buf[idx + len(self.marker) : end])
+            elif len(buf) >= len(self.marker):
+                # keep a possibly incomplete marker at the end of the buffer
+                keep = len(self.marker) - 1
+                sink.write(bytes(buf[:-keep]))
+                del buf[:-keep]
+            chunk = self.proc.stdout.read1(65536)
+            if not chunk:
+                if buf:
+                    sink.write(bytes(buf))
+                return self.proc.wait()
+            buf += chunk
+
+    def close(self):
+        if self.alive:
+            self.proc.stdin.close()
+            self.proc.wait()
+        self.proc.stdout.close()
+
+
+def session_execute(session: ShellSession, step: str, path: Path, doc):
+    """Executes a step in a shell session and records it in the history like
+    `logged_execute`
+
+    Only the wall time is recorded, since the resource usage of a single step
+    can not be separated from the shell process.
+
+    Returns:
+        path to log file
+    """
+    cmd_str, flags = split_cmd(step.split())
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
+    fn = log_file_name(path, cmd_str, timestamp)
+    sink = OutputSink(path / fn)
+    start = time.perf_counter()
+    try:
+        returncode = session.run(step, sink)
+    except BaseException:
+        if sink.fh is not None:
+            sink.fh.close()
+        raise
+    resources = {"wall_time": round(time.perf_counter() - start, 6)}
+    output = sink.close(returncode, resources)
+    return record_execution(doc, path, cmd_str, flags, output, fn, timestamp)
+
+
 def execute_shell(steps: list[str], job) -> bool:
-    """execute a list of shell commands on a job"""
+    """execute a list of shell commands on a job
+
+    By default every step is split on whitespace and executed as a separate
+    process. If OBR_SHELL_SESSION is set, all steps are evaluated by a single
+    bash process, such that steps can use shell syntax and share
+    environment variables. The number of concurrently executing shell
+    operations is bounded by OBR_SHELL_CONCURRENCY.
+    """
     path = Path(job.path) / "case"
     if not steps:
         return False
@@ -280,15 +589,112 @@ def execute_shell(steps: list[str], job) -> bool:
             steps[i + 1] = cleaned + steps[i + 1]
             continue
         steps_filt.append(step)
+    steps_filt = [parse_variables(step) for step in steps_filt if step]
 
-    for step in steps_filt:
-        if not step:
-            continue
-        step = parse_variables(step)
-        logged_execute(step.split(), path, job.doc)
+    slot_dir = Path(job.path).parent.parent / ".obr" / "shell_slots"
+    with concurrency_slot(slot_dir, shell_concurrency()):
+        if not shell_session_enabled():
+            for step in steps_filt:
+                logged_execute(step.split(), path, job.doc)
+            return True
+
+        session = ShellSession(path)
+        try:
+            with record_touched_config_files(path):
+                for step in steps_filt:
+                    if not session.alive:
+                        # a previous step exited the shell
+                        session.close()
+                        session = ShellSession(path)
+                    session_execute(session, step, path, job.doc)
+        finally:
+            session.close()
     return True
 
 
+# folders of a case which hold config files, see `OpenFOAMCase.config_file_tree`
+CONFIG_FOLDERS = ("system", "system/include", "constant")
+
+# paths written by the operations currently executed by this process, keyed by
+# the absolute job path, see `track_touched_paths`
+_touched_paths: dict[str, set[str]] = {}
+
+
+def track_touched_paths(job_path: Union[str, Path]):
+    """Starts recording the paths which are written by an operation on the job
+    at job_path"""
+    _touched_paths[os.path.abspath(job_path)] = set()
+
+
+def record_touched(fns):
+    """Records that the files or folders fns are written by the current
+    operation, a folder means that any file below it might have changed"""
+    if not _touched_paths:
+        return
+    for fn in fns if isinstance(fns, list) else [fns]:
+        path = os.path.abspath(fn)
+        for job_path, touched in _touched_paths.items():
+            if path.startswith(job_path + os.sep):
+                touched.add(path)
+
+
+def take_touched_paths(job_path: Union[str, Path]) -> Optional[set[str]]:
+    """Stops recording for the job at job_path
+
+    Returns: the recorded paths or None if no paths were recorded for the job
+    """
+    return _touched_paths.pop(os.path.abspath(job_path), None)
+
+
+def config_file_signatures(path: Union[str, Path]) -> dict[str, tuple]:
+    """Returns the inode, size and change and modification times of all
+    files in the config folders of the case at path, symlinks are not
+    followed"""
+    signatures = {}
+    for folder in CONFIG_FOLDERS:
+        try:
+            with os.scandir(os.path.join(path, folder)) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    signatures[entry.path] = (
+                        st.st_ino,
+                        st.st_size,
+                        st.st_ctime_ns,
+                        st.st_mtime_ns,
+                    )
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return signatures
+
+
+@contextmanager
+def record_touched_config_files(path: Union[str, Path]):
+    """Records the config files of the case at path which are created,
+    changed or removed while the context is active
+
+    Used for commands which do not declare the files they write. Only the
+    config folders are compared, such that the config files of the case do
+    not need to be hashed again after every command.
+    """
+    if not _touched_paths:
+        yield
+        return
+    before = config_file_signatures(path)
+    try:
+        yield
+    finally:
+        after = config_file_signatures(path)
+        record_touched(
+            sorted(
+                fn
+                for fn in before.keys() | after.keys()
+                if before.get(fn) != after.get(fn)
+            )
+        )
+
+
 def modifies_file(fns):
     """check if this job modifies a file, thus it needs to unlink
     and copy the file if it is a symlink
@@ -305,6 +711,7 @@ def modifies_file(fns):
             unlink(fn)
     else:
         unlink(fns)
+    record_touched(fns)
 
 
 def writes_files(fns):
@@ -0,0 +1,113 @@
+import os
+import hashlib
+import logging
+import threading
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Union
+
+logger = logging.getLogger("OBR")
+
+# files are hashed in chunks of this size, hashlib releases the GIL for
+# chunks larger than 2 KiB such that threads hash concurrently
+HASH_CHUNK_SIZE = 1 << 20
+
+DEFAULT_HASH_WORKERS = 8
+
+# maps absolute paths to the stat signature and md5sum of the file when it was
+# hashed the last time
+_hash_cache: dict[str, tuple[tuple[int, int, int, int], str]] = {}
+_hash_cache_lock = threading.Lock()
+
+
+def hash_workers() -> int:
+    """Returns the number of threads used to hash many files
+
+    Can be set via the OBR_HASH_WORKERS environment variable, a value of 1
+    disables concurrent hashing.
+    """
+    try:
+        return max(1, int(os.environ.get("OBR_HASH_WORKERS", DEFAULT_HASH_WORKERS)))
+    except ValueError:
+        logger.warning("OBR_HASH_WORKERS is not an integer, using default")
+        return DEFAULT_HASH_WORKERS
+
+
+def stat_signature(st: os.stat_result) -> tuple[int, int, int, int]:
+    """Returns the device, inode, size and modification time of a file, if
+    none of them changed the content of the file is assumed to be unchanged"""
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def clear_hash_cache():
+    """Removes all cached md5sums"""
+    with _hash_cache_lock:
+        _hash_cache.clear()
+
+
+def invalidate_hash(path: Union[str, Path]):
+    """Removes the cached md5sum of the file at path, eg. after writing it"""
+    with _hash_cache_lock:
+        _hash_cache.pop(os.path.abspath(path), None)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.md5(usedforsecurity=False)
+    with open(path, "rb", buffering=0) as fh:
+        while chunk := fh.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def md5sum(path: Union[str, Path], refresh: bool = False) -> str:
+    """Returns the md5sum of a file as hex digest
+
+    The file is read in chunks, unchanged files are not read again but their
+    md5sum is returned from a cache keyed by `stat_signature`. A file that is
+    rewritten with the same size within one tick of the modification time
+    keeps its signature, hence writers call `invalidate_hash` or pass
+    refresh to bypass the cache.
+
+    Raises: FileNotFoundError if the file does not exist
+    """
+    path = os.path.abspath(path)
+    signature = stat_signature(os.stat(path))
+    cached = _hash_cache.get(path)
+    if cached and cached[0] == signature and not refresh:
+        return cached[1]
+
+    digest = _hash_file(path)
+    # only cache the md5sum if the file was not modified while hashing
+    if stat_signature(os.stat(path)) == signature:
+        with _hash_cache_lock:
+            _hash_cache[path] = (signature, digest)
+    return digest
+
+
+def md5sums(
+    paths: Iterable[Union[str, Path]], workers: Optional[int] = None
+) -> dict[Union[str, Path], str]:
+    """Returns the md5sums of many files, hashing them in a thread pool
+
+    Args:
+        workers: number of threads, defaults to `hash_workers`
+
+    Returns: a mapping from the given paths to their md5sum, missing files
+    are skipped
+    """
+    paths = list(paths)
+    workers = workers or hash_workers()
+
+    def hash_or_none(path: Union[str, Path]) -> Optional[str]:
+        try:
+            return md5sum(path)
+        except FileNotFoundError:
+            return None
+
+    if workers == 1 or len(paths) < 2:
+        digests = list(map(hash_or_none, paths))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            digests = list(executor.map(hash_or_none, paths))
+    return {path: digest for path, digest in zip(paths, digests) if digest is not None}
@@ -0,0 +1,185 @@
+import os
+import glob
+import json
+import logging
+
+from typing import Optional, Union
+from signac.job import Job
+
+logger = logging.getLogger("OBR")
+
+HISTORY_JOURNAL = "obr_history.ndjson"
+
+DEFAULT_COMPACT_THRESHOLD = 100
+
+
+def compact_threshold() -> int:
+    """Returns the number of journal records after which the journal is
+    compacted into the job document
+
+    Can be set via the OBR_HISTORY_COMPACT environment variable, a value of 0
+    writes every record directly to the job document.
+    """
+    try:
+        return max(
+            0, int(os.environ.get("OBR_HISTORY_COMPACT", DEFAULT_COMPACT_THRESHOLD))
+        )
+    except ValueError:
+        logger.warning("OBR_HISTORY_COMPACT is not an integer, using default")
+        return DEFAULT_COMPACT_THRESHOLD
+
+
+def journal_path(job_path: str) -> str:
+    """Returns the path of the history journal of a job"""
+    return os.path.join(job_path, HISTORY_JOURNAL)
+
+
+def journal_files(job_path: str) -> list[str]:
+    """Returns all journal files of a job in the order they need to be read,
+    ie. journals of interrupted compactions first"""
+    journal = journal_path(job_path)
+    return sorted(glob.glob(journal + ".*.compact")) + [journal]
+
+
+def document_job_path(doc) -> Optional[str]:
+    """Returns the job folder of a signac job document or None if the
+    document is not backed by a file"""
+    filename = getattr(doc, "filename", None)
+    if not filename:
+        return None
+    return os.path.dirname(filename)
+
+
+def _read_records(files: list[str]) -> list[dict]:
+    records = []
+    for fn in files:
+        try:
+            with open(fn) as fh:
+                lines = fh.readlines()
+        except FileNotFoundError:
+            continue
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed history record in {fn}")
+    return records
+
+
+def read_journal(job_path: str) -> list[dict]:
+    """Reads all history records from the journal files of a job
+
+    Incomplete lines, for example from an interrupted write, are skipped.
+    """
+    return _read_records(journal_files(job_path))
+
+
+def merge_journal(job_path: str, document: dict) -> dict:
+    """Appends the journal records of a job to the history of a job document
+    read from disk"""
+    records = read_journal(job_path)
+    if records:
+        document["history"] = list(document.get("history", [])) + records
+    return document
+
+
+def append_history(doc, record: dict):
+    """Appends a record to the history of a job
+
+    Instead of rewriting the whole job document the record is appended as a
+    single line to the job's history journal. Once the journal holds more
+    than `compact_threshold` records it is folded into doc["history"].
+    Documents which are not backed by a file are updated directly.
+    """
+    job_path = document_job_path(doc)
+    threshold = compact_threshold()
+    if job_path is None or threshold == 0:
+        history = doc.get("history", [])
+        history.append(record)
+        doc["history"] = history
+        return
+
+    line = (json.dumps(record) + "\n").encode("utf-8")
+    fd = os.open(journal_path(job_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+    try:
+        # a single write with O_APPEND keeps records of concurrent writers intact
+        os.write(fd, line)
+        size = os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+
+    # records are at least a few dozen bytes, avoid counting lines of
+    # journals which are obviously below the threshold
+    if size > threshold * 32 and not is_buffered(doc):
+        compact_if_needed(doc)
+
+
+def is_buffered(doc) -> bool:
+    """Checks whether changes to a signac job document are currently buffered
+
+    Compacting a buffered document would remove the journal before the
+    records are flushed to the job document, hence compaction is deferred
+    until the buffer is flushed, see `buffered_doc`.
+    """
+    return bool(getattr(doc, "_is_buffered", False))
+
+
+def compact_if_needed(doc) -> int:
+    """Compacts the journal of a job once it holds more than
+    `compact_threshold` records
+
+    Returns: the number of compacted records
+    """
+    job_path = document_job_path(doc)
+    threshold = compact_threshold()
+    if job_path is None or threshold == 0:
+        return 0
+    if len(read_journal(job_path)) <= threshold:
+        return 0
+    return compact_history(doc)
+
+
+def take_journal(job_path: str) -> tuple[list[dict], list[str]]:
+    """Moves the journal of a job aside and reads its records
+
+    The journal is renamed before it is read, such that records appended
+    concurrently go to a fresh journal and are not lost.
+
+    Returns: the records and the journal files which need to be removed once
+    the records are stored in the job document
+    """
+    journal = journal_path(job_path)
+    try:
+        os.replace(journal, f"{journal}.{os.getpid()}.compact")
+    except FileNotFoundError:
+        pass
+    pending = journal_files(job_path)[:-1]
+    return _read_records(pending), pending
+
+
+def compact_history(doc) -> int:
+    """Moves all journal records of a job into doc["history"]
+
+    Returns: the number of compacted records
+    """
+    job_path = document_job_path(doc)
+    if job_path is None:
+        return 0
+    records, pending = take_journal(job_path)
+    if records:
+        doc["history"] = list(doc.get("history", [])) + records
+    for fn in pending:
+        os.remove(fn)
+    return len(records)
+
+
+def job_history(job: Union[Job, dict]) -> list[dict]:
+    """Returns the complete history of a job, ie. the compacted records of the
+    job document followed by the records of the journal
+    """
+    doc = job.doc if isinstance(job, Job) else job
+    history = list(doc.get("history", []))
+    job_path = document_job_path(doc)
+    if job_path is None:
+        return history
+    return history + read_journal(job_path)
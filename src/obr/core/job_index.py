@@ -0,0 +1,469 @@
+import os
+import json
+import logging
+import sqlite3
+import threading
+
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    TypeVar,
+    Union,
+    TYPE_CHECKING,
+)
+from signac.job import Job
+from signac.project import Project
+
+from .history import journal_path, merge_journal
+
+if TYPE_CHECKING:
+    from obr.signac_wrapper.operations import OpenFOAMProject
+
+logger = logging.getLogger("OBR")
+
+INDEX_FILE = "job_index.sqlite"
+
+DEFAULT_LOAD_WORKERS = 8
+
+# number of jobs refreshed and committed per transaction
+REFRESH_CHUNK_SIZE = 512
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def load_workers() -> int:
+    """Returns the number of threads used to read job files concurrently
+
+    Can be set via the OBR_LOAD_WORKERS environment variable, a value of 1
+    disables concurrent reading.
+    """
+    try:
+        return max(1, int(os.environ.get("OBR_LOAD_WORKERS", DEFAULT_LOAD_WORKERS)))
+    except ValueError:
+        logger.warning("OBR_LOAD_WORKERS is not an integer, using default")
+        return DEFAULT_LOAD_WORKERS
+
+
+def parallel_map(
+    func: Callable[[T], R], items: Iterable[T], chunk_size: int = 64
+) -> Iterator[R]:
+    """Applies func to all items using a bounded thread pool
+
+    Reading many small files from a parallel file system is latency bound,
+    hence running the reads concurrently pays off despite the GIL. Items are
+    processed in chunks to keep the overhead per item low when the files are
+    cached. At most two chunks per worker are in flight, such that items are
+    consumed lazily and only a bounded number of results is held in memory.
+    Results are yielded in the order of items.
+    """
+    workers = load_workers()
+    if workers == 1:
+        yield from map(func, items)
+        return
+
+    def process(chunk: list[T]) -> list[R]:
+        return [func(item) for item in chunk]
+
+    # a plain generator, iter() on some iterators, eg. of a signac project,
+    # returns a new iterator starting from the first job
+    items = (item for item in items)
+    chunks = iter(lambda: list(islice(items, chunk_size)), [])
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque(
+            executor.submit(process, chunk) for chunk in islice(chunks, 2 * workers)
+        )
+        try:
+            while pending:
+                results = pending.popleft().result()
+                for chunk in islice(chunks, 1):
+                    pending.append(executor.submit(process, chunk))
+                yield from results
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _file_signature(path: str) -> str:
+    """Returns a cheap signature of a file based on its modification time and size"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return "-"
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def statepoint_signature(job_path: str) -> str:
+    """Returns the signature of the statepoint file of a job"""
+    return _file_signature(os.path.join(job_path, Job.FN_STATE_POINT))
+
+
+def job_signature(job_path: str) -> str:
+    """Combines the signatures of the statepoint, job document and history
+    journal of a job"""
+    return "|".join([
+        statepoint_signature(job_path),
+        _file_signature(os.path.join(job_path, Job.FN_DOCUMENT)),
+        _file_signature(journal_path(job_path)),
+    ])
+
+
+def workspace_job_paths(workspace: Union[str, Path]) -> Iterator[tuple[str, str]]:
+    """Yields job id and job path pairs of all job folders in a workspace folder"""
+    with os.scandir(workspace) as entries:
+        for entry in entries:
+            if entry.is_dir() and len(entry.name) == 32:
+                yield entry.name, entry.path
+
+
+def job_paths(
+    jobs: "Union[OpenFOAMProject, Iterable[Job]]",
+) -> Iterator[tuple[str, str]]:
+    """Yields job id and job path pairs
+
+    For a whole project the workspace folder is listed directly, which avoids
+    constructing a signac Job instance per job.
+    """
+    if not isinstance(jobs, Project):
+        for job in jobs:
+            yield job.id, job.path
+        return
+    yield from workspace_job_paths(jobs.workspace)
+
+
+def read_job_files(job_path: str) -> tuple[dict, dict]:
+    """Reads the statepoint and job document of a job directly from disk
+
+    Records of the history journal are appended to document["history"].
+
+    Returns: the statepoint and the job document
+    """
+    document: dict = {}
+    doc_path = os.path.join(job_path, Job.FN_DOCUMENT)
+    if os.path.exists(doc_path):
+        with open(doc_path) as fh:
+            document = json.load(fh)
+    with open(os.path.join(job_path, Job.FN_STATE_POINT)) as fh:
+        statepoint = json.load(fh)
+    return statepoint, merge_journal(job_path, document)
+
+
+def merge_job_files(statepoint: dict, document: dict) -> dict:
+    """Merges a statepoint and job document in the same way as `flatten_jobs`,
+    ie. statepoint keys take precedence over job document keys.
+    """
+    merged = dict(document)
+    merged.update(statepoint)
+    return merged
+
+
+def load_job_files(job_path: str) -> dict:
+    """Reads the statepoint and job document of a job directly from disk and
+    merges them"""
+    return merge_job_files(*read_job_files(job_path))
+
+
+def value_kind(value) -> str:
+    """Classifies a value into the kinds of values queries compare differently"""
+    if isinstance(value, (bool, int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, dict):
+        return "dict"
+    if isinstance(value, list):
+        return "list"
+    return "null"
+
+
+def document_key_paths(doc: dict, source: str = "doc") -> set[tuple[str, ...]]:
+    """Returns the key, dotted path, source and value kind of all entries of a
+    statepoint or job document
+
+    Lists are represented by their last entry, the same way queries traverse
+    them with latest_only. Entries below a list get the kind "listed".
+    """
+    found = set()
+
+    def visit(key: str, value, path: str, listed: bool):
+        found.add((key, path, source, "listed" if listed else value_kind(value)))
+        if isinstance(value, list) and value:
+            value = value[-1]
+            listed = True
+        if isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                visit(sub_key, sub_value, f"{path}.{sub_key}", listed)
+
+    for key, value in doc.items():
+        visit(key, value, key, False)
+    return found
+
+
+def job_key_paths(statepoint: dict, document: dict) -> set[tuple[str, ...]]:
+    """Returns the key paths of the merged statepoint and job document
+
+    Top level keys of the job document which are shadowed by the statepoint
+    are skipped, since they are not part of the merged document.
+    """
+    return document_key_paths(statepoint, "sp") | document_key_paths(
+        {key: value for key, value in document.items() if key not in statepoint}
+    )
+
+
+class JobIndex:
+    """A persistent index of the merged statepoints and job documents of a
+    workspace stored in .obr/job_index.sqlite
+
+    Every top level key of a merged document is stored as a separate row. An
+    index refresh only stats the signac files of a job and re-reads them if
+    their modification time or size has changed since the last refresh.
+
+    Additionally, the index keeps track of all paths at which a key occurs in
+    the workspace, whether the path belongs to the statepoint or the job
+    document, the kind of the values at that path, and the number of jobs
+    containing it.
+    """
+
+    schema_version = "3"
+
+    # open indices per database path and thread, sqlite connections must not
+    # be shared between threads
+    _instances: dict[tuple[str, int], "JobIndex"] = {}
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(str(self.path), timeout=60)
+        self._setup()
+
+    def _setup(self):
+        with self.con:
+            self.con.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            row = self.con.execute(
+                "SELECT value FROM meta WHERE key='schema_version'"
+            ).fetchone()
+            if row and row[0] != self.schema_version:
+                logger.debug(f"Rebuilding outdated job index {self.path}")
+                self.con.execute("DROP TABLE IF EXISTS jobs")
+                self.con.execute("DROP TABLE IF EXISTS fields")
+                self.con.execute("DROP TABLE IF EXISTS key_paths")
+                self.con.execute("DROP TABLE IF EXISTS statepoints")
+            self.con.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, signature TEXT,"
+                " paths TEXT)"
+            )
+            self.con.execute(
+                "CREATE TABLE IF NOT EXISTS fields (id TEXT, pos INTEGER, key TEXT,"
+                " value TEXT, PRIMARY KEY (id, pos))"
+            )
+            self.con.execute(
+                "CREATE TABLE IF NOT EXISTS key_paths (key TEXT, path TEXT, source"
+                " TEXT, kind TEXT, count INTEGER, PRIMARY KEY (key, path, source,"
+                " kind))"
+            )
+            self.con.execute(
+                "CREATE TABLE IF NOT EXISTS statepoints (id TEXT PRIMARY KEY,"
+                " signature TEXT, resolved TEXT)"
+            )
+            self.con.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)",
+                (self.schema_version,),
+            )
+
+    @classmethod
+    def for_jobs(
+        cls, jobs: "Union[OpenFOAMProject, list[Job]]"
+    ) -> Optional["JobIndex"]:
+        """Opens the index of the project the given jobs belong to
+
+        Returns None if the index is disabled via OBR_NO_JOB_INDEX, if the jobs
+        are not signac jobs or if the index cannot be opened.
+        """
+        if os.environ.get("OBR_NO_JOB_INDEX"):
+            return None
+        if isinstance(jobs, Project):
+            project_path = jobs.path
+        else:
+            job = next(iter(jobs), None)
+            if not isinstance(job, Job):
+                return None
+            project_path = job.project.path
+        path = Path(project_path) / ".obr" / INDEX_FILE
+        instance_key = (str(path), threading.get_ident())
+        if instance_key in cls._instances and path.exists():
+            return cls._instances[instance_key]
+        try:
+            cls._instances[instance_key] = cls(path)
+            return cls._instances[instance_key]
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not open job index, falling back to full scan {e}")
+            return None
+
+    def iter_refresh(
+        self, jobs: Iterable[Job], chunk_size: int = REFRESH_CHUNK_SIZE
+    ) -> Iterator[list[str]]:
+        """Updates the index entries of all jobs whose files changed in chunks
+
+        Every chunk of jobs is stored in its own transaction and its job ids
+        are yielded once it is committed, hence the first documents can be
+        served before all jobs are refreshed. If a whole project is passed,
+        index entries of jobs which no longer exist are removed after the
+        last chunk.
+        """
+        known = dict(self.con.execute("SELECT id, signature FROM jobs").fetchall())
+        seen: set[str] = set()
+        num_changed = 0
+        paths = job_paths(jobs)
+        while chunk := list(islice(paths, chunk_size)):
+            signatures = parallel_map(job_signature, [path for _, path in chunk])
+            changed = [
+                (job_id, path, signature)
+                for (job_id, path), signature in zip(chunk, signatures)
+                if known.get(job_id) != signature
+            ]
+            files = parallel_map(read_job_files, [path for _, path, _ in changed])
+            with self.con:
+                for (job_id, _, signature), (statepoint, document) in zip(
+                    changed, files
+                ):
+                    self._store(job_id, statepoint, document, signature)
+            num_changed += len(changed)
+            job_ids = [job_id for job_id, _ in chunk]
+            seen.update(job_ids)
+            yield job_ids
+
+        with self.con:
+            if isinstance(jobs, Project):
+                for job_id in known.keys() - seen:
+                    self._remove(job_id)
+                    self.con.execute("DELETE FROM statepoints WHERE id=?", (job_id,))
+            self.con.execute("DELETE FROM key_paths WHERE count <= 0")
+        if num_changed:
+            logger.debug(f"Updated {num_changed} of {len(seen)} job index entries")
+
+    def refresh(self, jobs: Iterable[Job]) -> list[str]:
+        """Updates the index entries of all jobs whose files changed, see
+        `iter_refresh`
+
+        Returns: the ids of the given jobs in iteration order
+        """
+        return [job_id for job_ids in self.iter_refresh(jobs) for job_id in job_ids]
+
+    def _remove(self, job_id: str):
+        row = self.con.execute(
+            "SELECT paths FROM jobs WHERE id=?", (job_id,)
+        ).fetchone()
+        if row:
+            self.con.executemany(
+                "UPDATE key_paths SET count = count - 1 WHERE key=? AND path=? AND"
+                " source=? AND kind=?",
+                json.loads(row[0]),
+            )
+        self.con.execute("DELETE FROM jobs WHERE id=?", (job_id,))
+        self.con.execute("DELETE FROM fields WHERE id=?", (job_id,))
+
+    def _store(self, job_id: str, statepoint: dict, document: dict, signature: str):
+        self._remove(job_id)
+        merged = merge_job_files(statepoint, document)
+        paths = sorted(job_key_paths(statepoint, document))
+        self.con.execute(
+            "INSERT INTO jobs VALUES (?, ?, ?)", (job_id, signature, json.dumps(paths))
+        )
+        self.con.executemany(
+            "INSERT INTO key_paths VALUES (?, ?, ?, ?, 1) ON CONFLICT (key, path,"
+            " source, kind) DO UPDATE SET count = count + 1",
+            paths,
+        )
+        self.con.executemany(
+            "INSERT INTO fields VALUES (?, ?, ?, ?)",
+            [
+                (job_id, pos, key, json.dumps(value))
+                for pos, (key, value) in enumerate(merged.items())
+            ],
+        )
+
+    def doc(self, job_id: str, columns: Optional[set[str]] = None) -> dict:
+        """Returns the merged statepoint and job document of a single job
+
+        If columns are given, only these top level keys are read and decoded.
+        """
+        if columns is None:
+            rows = self.con.execute(
+                "SELECT key, value FROM fields WHERE id=? ORDER BY pos", (job_id,)
+            )
+        elif not columns:
+            return {}
+        else:
+            rows = self.con.execute(
+                "SELECT key, value FROM fields WHERE id=? AND key IN"
+                f" ({','.join('?' * len(columns))}) ORDER BY pos",
+                (job_id, *columns),
+            )
+        return {key: json.loads(value) for key, value in rows}
+
+    def docs(
+        self, job_ids: Iterable[str], columns: Optional[set[str]] = None
+    ) -> Iterator[tuple[str, dict]]:
+        """Yields job id and merged document pairs in the order of job_ids"""
+        for job_id in job_ids:
+            yield job_id, self.doc(job_id, columns)
+
+    def key_paths(self, keys: Iterable[str]) -> dict[str, list[str]]:
+        """Returns all dotted paths at which the given keys occur in the index"""
+        ret: dict[str, list[str]] = {key: [] for key in keys}
+        for key in ret:
+            rows = self.con.execute(
+                "SELECT DISTINCT path FROM key_paths WHERE key=? AND count > 0 ORDER BY"
+                " path",
+                (key,),
+            )
+            ret[key] = [path for (path,) in rows]
+        return ret
+
+    def path_kinds(
+        self, keys: Iterable[str]
+    ) -> dict[str, dict[str, set[tuple[str, str]]]]:
+        """Returns the source, ie. sp or doc, and kind of the values of all paths
+        at which the given keys occur in the index"""
+        ret: dict[str, dict[str, set[tuple[str, str]]]] = {key: {} for key in keys}
+        for key in ret:
+            rows = self.con.execute(
+                "SELECT path, source, kind FROM key_paths WHERE key=? AND count > 0",
+                (key,),
+            )
+            for path, source, kind in rows:
+                ret[key].setdefault(path, set()).add((source, kind))
+        return ret
+
+    def resolved_statepoint(
+        self, job_id: str, job_path: str, resolve: Callable[[dict], dict]
+    ) -> dict:
+        """Returns the resolved statepoint view of a job
+
+        The view is computed by `resolve` from the statepoint file and stored
+        until the statepoint file changes.
+        """
+        sp_path = os.path.join(job_path, Job.FN_STATE_POINT)
+        signature = statepoint_signature(job_path)
+        row = self.con.execute(
+            "SELECT signature, resolved FROM statepoints WHERE id=?", (job_id,)
+        ).fetchone()
+        if row and row[0] == signature:
+            return json.loads(row[1])
+
+        with open(sp_path) as fh:
+            resolved = resolve(json.load(fh))
+        with self.con:
+            self.con.execute(
+                "INSERT OR REPLACE INTO statepoints VALUES (?, ?, ?)",
+                (job_id, signature, json.dumps(resolved)),
+            )
+        return resolved
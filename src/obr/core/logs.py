@@ -0,0 +1,233 @@
+import os
+import gzip
+import shutil
+import logging
+import tempfile
+
+from pathlib import Path
+from typing import IO, Iterable, Optional, Union
+
+logger = logging.getLogger("OBR")
+
+LOG_SUFFIX = ".log"
+
+# maps the supported compression codecs to their file suffix
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def log_compression() -> Optional[str]:
+    """Returns the codec used to compress logs of finished operations or None
+    if logs are stored as plain text
+
+    Can be set via the OBR_LOG_COMPRESSION environment variable to gzip or
+    zstd. zstd requires the zstandard package.
+    """
+    codec = os.environ.get("OBR_LOG_COMPRESSION", "").lower()
+    if not codec:
+        return None
+    if codec not in COMPRESSION_SUFFIXES:
+        logger.warning(f"Unknown OBR_LOG_COMPRESSION {codec}, logs stay plain text")
+        return None
+    return codec
+
+
+def log_codec(path: Union[str, Path]) -> Optional[str]:
+    """Returns the compression codec of a log file based on its suffix"""
+    for codec, suffix in COMPRESSION_SUFFIXES.items():
+        if str(path).endswith(LOG_SUFFIX + suffix):
+            return codec
+    return None
+
+
+def is_log_file(fn: Union[str, Path]) -> bool:
+    """Checks whether fn is a plain or compressed log file"""
+    return str(fn).endswith(LOG_SUFFIX) or log_codec(fn) is not None
+
+
+def plain_log_name(fn: Union[str, Path]) -> str:
+    """Strips the compression suffix from a log file name"""
+    codec = log_codec(fn)
+    if codec:
+        return str(fn)[: -len(COMPRESSION_SUFFIXES[codec])]
+    return str(fn)
+
+
+def existing_log(path: Union[str, Path]) -> Optional[Path]:
+    """Returns the path of a log file or of its compressed version if it
+    exists"""
+    plain = Path(plain_log_name(path))
+    for candidate in [plain] + [
+        Path(str(plain) + suffix) for suffix in COMPRESSION_SUFFIXES.values()
+    ]:
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "Reading or writing zstd compressed logs requires the zstandard package,"
+            " install it via pip install zstandard"
+        )
+    return zstandard
+
+
+def _open_codec(path: Union[str, Path], codec: Optional[str], mode: str) -> IO:
+    text = {} if "b" in mode else {"encoding": "utf-8", "errors": "replace"}
+    if codec == "gzip":
+        return gzip.open(path, mode, **text)
+    if codec == "zstd":
+        return _zstandard().open(path, mode, **text)
+    return open(path, mode, **text)
+
+
+def open_log(path: Union[str, Path], mode: str = "rt") -> IO:
+    """Opens a plain, gzip or zstd compressed log file
+
+    Text modes decode with errors replaced since solver logs are not
+    guaranteed to be valid utf-8.
+    """
+    return _open_codec(path, log_codec(path), mode)
+
+
+def compress_log(path: Union[str, Path], codec: Optional[str] = None) -> Path:
+    """Compresses a plain log file and removes the original
+
+    The compressed file is written to a temporary name first, such that
+    readers never see a partially written log.
+
+    Args:
+        codec: gzip or zstd, defaults to `log_compression()`
+
+    Returns: the path of the compressed log or path if nothing was compressed
+    """
+    path = Path(path)
+    codec = codec or log_compression()
+    if not codec or log_codec(path) or not path.exists():
+        return path
+    target = Path(str(path) + COMPRESSION_SUFFIXES[codec])
+    tmp = target.with_name(target.name + ".tmp")
+    with open(path, "rb") as src, _open_codec(tmp, codec, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    shutil.copystat(path, tmp)
+    os.replace(tmp, target)
+    path.unlink()
+    return target
+
+
+def plain_log(path: Union[str, Path]) -> Path:
+    """Returns a path to the uncompressed content of a log
+
+    Compressed logs are decompressed into a temporary file, which needs to be
+    removed by the caller, for parsers which only accept file paths.
+    """
+    path = Path(path)
+    if not log_codec(path):
+        return path
+    fd, tmp = tempfile.mkstemp(suffix=LOG_SUFFIX, prefix=path.stem + "_")
+    with open_log(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    return Path(tmp)
+
+
+def log_timestamp(solver: str, log: Union[str, Path]) -> Optional[str]:
+    """Returns the timestamp of a solver log named {solver}_{timestamp}.log
+    or None if the name does not follow this pattern
+
+    Timestamps are formatted as %Y-%m-%d_%H:%M:%S and hence sort
+    chronologically.
+    """
+    name = Path(plain_log_name(log)).name
+    prefix = f"{solver}_"
+    if not name.startswith(prefix) or not name.endswith(LOG_SUFFIX):
+        return None
+    return name[len(prefix) : -len(LOG_SUFFIX)]
+
+
+def index_latest_log(doc, solver: str, log: Union[str, Path]):
+    """Stores the latest solver log of a job in doc["cache"]["latest_log"]
+
+    The entry holds the solver application, the log path and the size and
+    modification time of the log at the time it was indexed. The log does not
+    need to exist yet, eg. if the solver run was just launched. An indexed log
+    of the same solver is never replaced by an older log, such that the log
+    of a pending run is not replaced by the log of a previous run. The keys
+    differ from the statepoint and history keys to not interfere with
+    queries.
+    """
+    entry = doc.get("cache", {}).get("latest_log")
+    if entry and entry.get("application") == solver:
+        indexed = log_timestamp(solver, entry.get("file", ""))
+        new = log_timestamp(solver, log)
+        if indexed and new and new < indexed:
+            return
+    try:
+        st = os.stat(log)
+        size, mtime = st.st_size, st.st_mtime
+    except FileNotFoundError:
+        size, mtime = 0, 0.0
+    entry = {"application": solver, "file": str(log), "size": size, "mtime": mtime}
+    if "cache" not in doc:
+        doc["cache"] = {}
+    if doc["cache"].get("latest_log") != entry:
+        doc["cache"]["latest_log"] = entry
+
+
+def indexed_latest_log(doc, solver: Optional[str] = None) -> Optional[Path]:
+    """Looks up the latest solver log of a job in doc["cache"]["latest_log"]
+
+    The indexed log is only trusted if it is not smaller or older than at the
+    time it was indexed, a log that was truncated or rewritten by an older run
+    requires a scan of the case folder. Compressed logs keep the modification
+    time of the plain log, hence only their modification time is compared.
+
+    Returns: the path of the log or of its compressed version, or None if no
+    log is indexed for solver or the indexed log does not exist anymore or
+    is stale
+    """
+    entry = doc.get("cache", {}).get("latest_log")
+    if not entry or (solver and entry.get("application") != solver):
+        return None
+    log = existing_log(entry["file"])
+    if not log:
+        return None
+    st = os.stat(log)
+    if st.st_mtime < entry.get("mtime", 0.0):
+        return None
+    if not log_codec(log) and st.st_size < entry.get("size", 0):
+        return None
+    return log
+
+
+def pending_log(doc) -> Optional[str]:
+    """Returns the file name of the indexed latest log if the log does not
+    exist yet, eg. since the solver run was just launched"""
+    entry = doc.get("cache", {}).get("latest_log")
+    if not entry or existing_log(entry["file"]):
+        return None
+    return Path(entry["file"]).name
+
+
+def clear_superseded_pending_log(doc, history: Iterable[dict]) -> bool:
+    """Removes a pending latest log entry if records were added to the
+    history after the record of the run which should have written the log
+
+    Such a run ended without creating its log, hence the entry would force
+    every lookup to scan for the log.
+
+    Returns: whether the entry was removed
+    """
+    name = pending_log(doc)
+    if not name:
+        return False
+    for newer, record in enumerate(reversed(list(history))):
+        if record.get("log") != name:
+            continue
+        if not newer:
+            return False
+        del doc["cache"]["latest_log"]
+        return True
+    return False
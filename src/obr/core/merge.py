@@ -0,0 +1,194 @@
+import os
+import json
+import hashlib
+import logging
+
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+
+from signac.job import Job
+
+from .history import take_journal
+
+logger = logging.getLogger("OBR")
+
+FRAGMENT_PREFIX = "signac_job_document_"
+
+# stores the signature of the fragments of the last merge in the job folder
+MERGE_SIGNATURE = ".obr_merge"
+
+
+def fragment_files(job_path: str) -> list[str]:
+    """Returns the sorted file names of all job document fragments of a job,
+    ie. signac_job_document_<hash>.json files created by obr archive"""
+    try:
+        files = os.listdir(job_path)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        fn for fn in files if fn.startswith(FRAGMENT_PREFIX) and fn.endswith(".json")
+    )
+
+
+def fragments_signature(job_path: str, fragments: list[str]) -> str:
+    """Returns a signature of the names, sizes and modification times of the
+    fragments of a job"""
+    sig = hashlib.sha1()
+    for fn in fragments:
+        st = os.stat(os.path.join(job_path, fn))
+        sig.update(f"{fn}:{st.st_mtime_ns}:{st.st_size};".encode())
+    return sig.hexdigest()
+
+
+def record_hash(record) -> str:
+    """Returns a hash of the content of a data or history record"""
+    content = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def unique_records(records: Iterable) -> list:
+    """Removes records with identical content, keeping the first occurrence"""
+    seen = set()
+    ret = []
+    for record in records:
+        key = record_hash(record)
+        if key in seen:
+            continue
+        seen.add(key)
+        ret.append(record)
+    return ret
+
+
+def history_timestamp(record) -> datetime:
+    """Parses the timestamp of a history record
+
+    Records store either %Y-%m-%d_%H:%M:%S or str(datetime.now()), records
+    without a valid timestamp are sorted first.
+    """
+    timestamp = record.get("timestamp") if isinstance(record, dict) else None
+    if not isinstance(timestamp, str):
+        return datetime.min
+    try:
+        return datetime.fromisoformat(timestamp.replace("_", " ", 1))
+    except ValueError:
+        return datetime.min
+
+
+def deep_update(target: dict, source: dict) -> dict:
+    """Recursively updates target with source, values of source win"""
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            deep_update(target[key], value)
+        else:
+            target[key] = value
+    return target
+
+
+def merge_documents(documents: list[tuple[str, dict]]) -> dict:
+    """Merges the data, history and cache of several job documents
+
+    Args:
+        documents: pairs of a name and a job document in the order their
+        records should be merged
+
+    Records are deduplicated by content and the history is ordered by
+    timestamp. Caches are merged key by key, for conflicting keys the value
+    of the document with the latest history record wins, ties are resolved
+    by the document name.
+    """
+    data = unique_records(
+        record for _, document in documents for record in document.get("data", [])
+    )
+    history = unique_records(
+        record for _, document in documents for record in document.get("history", [])
+    )
+    history.sort(key=history_timestamp)
+
+    def recency(item: tuple[str, dict]):
+        name, document = item
+        latest = max(map(history_timestamp, document.get("history", [])), default=None)
+        return latest or datetime.min, name
+
+    cache: dict = {}
+    for _, document in sorted(documents, key=recency):
+        deep_update(cache, document.get("cache") or {})
+    return {"data": data, "history": history, "cache": cache}
+
+
+def _write_json(path: str, content: dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(content, fh)
+    os.replace(tmp, path)
+
+
+def merge_job_path(job_path: str, force: bool = False) -> bool:
+    """Merges all job document fragments of a job into its job document
+
+    The current job document takes part in the merge, hence merging is
+    idempotent. Pending history journal records are merged as well.
+    Jobs whose fragments did not change since the last merge are skipped
+    unless force is set.
+
+    Returns: whether the job document was written
+    """
+    fragments = fragment_files(job_path)
+    if not fragments:
+        return False
+    signature = fragments_signature(job_path, fragments)
+    signature_path = os.path.join(job_path, MERGE_SIGNATURE)
+    doc_path = os.path.join(job_path, Job.FN_DOCUMENT)
+    if not force and os.path.exists(doc_path):
+        try:
+            with open(signature_path) as fh:
+                if fh.read() == signature:
+                    return False
+        except FileNotFoundError:
+            pass
+
+    document: dict = {}
+    if os.path.exists(doc_path):
+        with open(doc_path) as fh:
+            document = json.load(fh)
+    documents = [("", document)]
+    for fn in fragments:
+        with open(os.path.join(job_path, fn)) as fh:
+            documents.append((fn, json.load(fh)))
+
+    records, pending = take_journal(job_path)
+    documents.append(("~journal", {"history": records}))
+
+    document.update(merge_documents(documents))
+    _write_json(doc_path, document)
+    for fn in pending:
+        os.remove(fn)
+    with open(signature_path, "w") as fh:
+        fh.write(signature)
+    return True
+
+
+def _merge_job_path(args: tuple[str, bool]) -> bool:
+    return merge_job_path(*args)
+
+
+def merge_jobs(
+    job_paths: Iterable[str], force: bool = False, processes: Optional[int] = None
+) -> list[str]:
+    """Merges the job document fragments of many jobs using a process pool
+
+    Args:
+        processes: number of worker processes, defaults to the number of cpus
+
+    Returns: the paths of all jobs whose job document was written
+    """
+    job_paths = list(job_paths)
+    args = [(job_path, force) for job_path in job_paths]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(job_paths) < 2:
+        merged = list(map(_merge_job_path, args))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            chunk_size = max(1, len(args) // (4 * processes))
+            merged = list(executor.map(_merge_job_path, args, chunksize=chunk_size))
+    return [job_path for job_path, changed in zip(job_paths, merged) if changed]
@@ -1,19 +1,32 @@
 import re
 import logging
+import operator
+import sqlite3
+import numpy as np
 import pandas as pd
 
-from dataclasses import dataclass, field
-from typing import Any, Union, Callable, Iterable
+from dataclasses import dataclass, field, replace
+from typing import Any, Union, Callable, Iterable, Iterator, Optional
 from copy import deepcopy
 from signac.job import Job
+from signac.project import Project
 from typing import TYPE_CHECKING, Union
 from enum import Enum
 
+from .job_index import (
+    JobIndex,
+    load_job_files,
+    parallel_map,
+    statepoint_signature,
+)
+
 if TYPE_CHECKING:
     from obr.signac_wrapper.operations import OpenFOAMProject
 
 logger = logging.getLogger("OBR")
 
+PATH_SEPARATOR = "."
+
 
 @dataclass
 class query_result:
@@ -34,6 +47,14 @@ class Predicates(Enum):
     lt = "<"
 
 
+# predicates which are only supported by compiled queries, see CompiledQuery
+# in/nin: value is a collection of values
+# range: value is a list of a lower and an upper bound Query
+# or: value is a list of Queries of which any needs to match
+SET_PREDICATES = {"in": "in", "nin": "not in"}
+GROUP_PREDICATES = {"range", "or"}
+
+
 @dataclass
 class Query:
     key: str
@@ -99,8 +120,12 @@ class Query:
         return self.state
 
     def __repr__(self) -> str:
+        if self.predicate in GROUP_PREDICATES:
+            sep = " and " if self.predicate == "range" else " or "
+            return sep.join(repr(q) for q in self.value)
         val = self.value or "Any"
-        return "{} {} {}:".format(self.key, Predicates[self.predicate].value, val)
+        pred = SET_PREDICATES.get(self.predicate) or Predicates[self.predicate].value
+        return "{} {} {}:".format(self.key, pred, val)
 
 
 def input_to_query(inp: str) -> Query:
@@ -146,23 +171,580 @@ def execute_query(query: Query, key, value, latest_only=True, track_keys=list) -
     return query
 
 
+def is_dict(value) -> bool:
+    """statepoints and job documents might contain signac attr dicts"""
+    return isinstance(value, dict) or type(value).__name__ == "JSONAttrDict"
+
+
+def resolve_path(value, path: tuple, latest_only: bool = True) -> tuple[bool, Any]:
+    """Follows the keys of path through nested dictionaries of value. If
+    latest_only is set, lists are replaced by their last entry on the way.
+
+    Returns: whether the path exists and the value at the end of the path
+    """
+    for key in path:
+        if isinstance(value, list) and latest_only and value:
+            value = value[-1]
+        if not is_dict(value) or key not in value:
+            return False, None
+        value = value[key]
+    if isinstance(value, list) and latest_only and value:
+        value = value[-1]
+    return True, value
+
+
+def split_key_path(key) -> tuple:
+    """Splits dotted keys like parent.parent.solver into their components"""
+    if isinstance(key, str) and PATH_SEPARATOR in key:
+        return tuple(key.split(PATH_SEPARATOR))
+    return ()
+
+
+def leaf_key(key):
+    """Returns the last key of a dotted key path or the key itself"""
+    path = split_key_path(key)
+    return path[-1] if path else key
+
+
+PREDICATE_OPS: dict[str, Callable[[Any, Any], bool]] = {
+    "eq": operator.eq,
+    "neq": operator.ne,
+    "gt": operator.gt,
+    "lt": operator.lt,
+    "geq": operator.ge,
+    "leq": operator.le,
+}
+
+
+def to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class CompiledQuery:
+    """A Query with its predicate and the type conversions of its value resolved
+    ahead of time. The conversions mirror `Query.execute`: numbers are compared
+    as floats, strings as strings.
+
+    Dotted keys like state.latestTime are resolved as explicit paths. Plain
+    keys are searched recursively unless the paths at which the key occurs in
+    the workspace are known, in which case those are looked up directly.
+
+    Membership queries keep their values in hashed sets per type, range queries
+    keep their lower and upper bound as compiled queries on the same key and
+    OR groups keep a compiled query for each alternative.
+    """
+
+    key: Any
+    value: Any
+    op: Callable[[Any, Any], bool]
+    negate: bool
+    required: bool
+    str_value: Optional[str]
+    float_value: Optional[float]
+    path: tuple = ()
+    # maps top level keys to all paths below them at which key occurs
+    known_paths: Optional[dict[str, tuple[tuple, ...]]] = None
+    predicate: str = "eq"
+    float_set: frozenset = frozenset()
+    str_set: frozenset = frozenset()
+    bounds: tuple["CompiledQuery", ...] = ()
+    any_of: tuple["CompiledQuery", ...] = ()
+
+    @classmethod
+    def from_query(
+        cls, query: Query, key_paths: Optional[dict[str, list[str]]] = None
+    ) -> "CompiledQuery":
+        path = split_key_path(query.key)
+        known_paths = None
+        if key_paths is not None and not path:
+            grouped: dict[str, list[tuple]] = {}
+            for key_path in key_paths.get(query.key, []):
+                parts = tuple(key_path.split(PATH_SEPARATOR))
+                grouped.setdefault(parts[0], []).append(parts)
+            known_paths = {head: tuple(paths) for head, paths in grouped.items()}
+        compiled = dict(
+            key=query.key,
+            value=query.value,
+            op=PREDICATE_OPS.get(query.predicate, operator.eq),
+            negate=query.negate,
+            required=bool(query.value),
+            str_value=None,
+            float_value=None,
+            path=path,
+            known_paths=known_paths,
+            predicate=query.predicate,
+        )
+        if query.predicate in SET_PREDICATES:
+            floats = (to_float(v) for v in query.value)
+            compiled["float_set"] = frozenset(v for v in floats if v is not None)
+            compiled["str_set"] = frozenset(str(v) for v in query.value)
+        elif query.predicate == "range":
+            compiled["bounds"] = tuple(
+                cls.from_query(q, key_paths) for q in query.value
+            )
+        elif query.predicate == "or":
+            compiled["any_of"] = tuple(
+                cls.from_query(replace(q, negate=query.negate), key_paths)
+                for q in query.value
+            )
+            compiled["required"] = any(q.required for q in compiled["any_of"])
+        elif query.value is not None:
+            compiled["str_value"] = str(query.value)
+            compiled["float_value"] = to_float(query.value)
+        return cls(**compiled)
+
+    @property
+    def leaves(self) -> tuple["CompiledQuery", ...]:
+        """The queries of an OR group or the query itself"""
+        return self.any_of or (self,)
+
+    def compare(self, value) -> tuple[bool, Any]:
+        """Checks value against the predicate
+
+        Returns: whether the value matched and the value as it is reported
+        """
+        if self.value is None:
+            return True, value
+        if self.bounds:
+            matched = True
+            for bound in self.bounds:
+                in_bound, value = bound.compare(value)
+                matched = matched and in_bound
+            return matched, value
+        if self.predicate in SET_PREDICATES:
+            return self.contains(value)
+        if isinstance(value, (int, float)):
+            if self.float_value is None:
+                return False, value
+            value = float(value)
+            return self.op(value, self.float_value), value
+        if isinstance(value, str):
+            return self.op(value, self.str_value), value
+        try:
+            return self.op(value, type(value)(self.value)), value
+        except (TypeError, ValueError):
+            return False, value
+
+    def contains(self, value) -> tuple[bool, Any]:
+        """Checks whether value is in the set of a membership query"""
+        if isinstance(value, (int, float)):
+            value = float(value)
+            found = value in self.float_set
+        elif isinstance(value, str):
+            found = value in self.str_set
+        else:
+            found = False
+            for member in self.value:
+                try:
+                    found = value == type(value)(member)
+                except (TypeError, ValueError):
+                    continue
+                if found:
+                    break
+        return found != (self.predicate == "nin"), value
+
+    def match_array(self, values: np.ndarray, numeric: bool) -> np.ndarray:
+        """Vectorized version of compare for arrays of numbers or strings"""
+        if self.value is None:
+            return np.ones(len(values), dtype=bool)
+        if self.bounds:
+            return np.logical_and.reduce(
+                [bound.match_array(values, numeric) for bound in self.bounds]
+            )
+        if self.predicate in SET_PREDICATES:
+            members = list(self.float_set if numeric else self.str_set)
+            found = np.isin(values, members)
+            return ~found if self.predicate == "nin" else found
+        reference = self.float_value if numeric else self.str_value
+        if reference is None:
+            return np.zeros(len(values), dtype=bool)
+        return self.op(values, reference)
+
+    def search(
+        self, key, value, latest_only: bool, parents: tuple = ()
+    ) -> Optional[tuple[Any, list]]:
+        """Recursively searches key: value for a match, sub dictionaries are
+        searched before the value itself.
+
+        Returns: the matching value and the keys leading to it or None
+        """
+        if isinstance(value, list) and latest_only and value:
+            value = value[-1]
+        if is_dict(value):
+            parents = parents + (key,)
+            for sub_key, sub_value in value.items():
+                found = self.search(sub_key, sub_value, latest_only, parents)
+                if found:
+                    return found
+        if key != self.key:
+            return None
+        matched, value = self.compare(value)
+        if matched:
+            return value, list(parents)
+        return None
+
+    def match_path(self, value, path: tuple, latest_only: bool):
+        """Compares the value at the end of path against the predicate
+
+        Returns: the matching value and the keys leading to it or None
+        """
+        found, value = resolve_path(value, path[1:], latest_only)
+        if not found:
+            return None
+        matched, value = self.compare(value)
+        if not matched:
+            return None
+        return value, list(path[:-1]) + ([path[-1]] if is_dict(value) else [])
+
+    def lookup(self, key, value, latest_only: bool) -> Optional[tuple[Any, list]]:
+        """Matches the top level key: value pair of a merged job document
+
+        Returns: the matching value and the keys leading to it or None
+        """
+        if self.path:
+            if key != self.path[0]:
+                return None
+            return self.match_path(value, self.path, latest_only)
+        if self.known_paths is None:
+            return self.search(key, value, latest_only)
+        paths = self.known_paths.get(key)
+        if not paths:
+            return None
+        if len(paths) > 1:
+            # ambiguous below this key, the first match in the tree wins
+            return self.search(key, value, latest_only)
+        return self.match_path(value, paths[0], latest_only)
+
+    @property
+    def direct_paths(self) -> Optional[list[tuple]]:
+        """All paths at which this query looks for values, if known"""
+        if self.path:
+            return [self.path]
+        if self.known_paths is None:
+            return None
+        return [path for paths in self.known_paths.values() for path in paths]
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """An immutable list of compiled queries which evaluates a merged job
+    document in a single pass without copying the queries.
+    """
+
+    queries: tuple[CompiledQuery, ...]
+    latest_only: bool = True
+    strict: bool = False
+
+    def evaluate(self, job_id: str, doc: dict) -> Optional[query_result]:
+        """Runs all queries against a merged job document
+
+        Returns: a query_result if all required queries matched otherwise None
+        """
+        all_required = True
+        merged: dict = {}
+        sub_keys: list[list] = []
+        for query in self.queries:
+            found_any = False
+            # all alternatives of an OR group are checked in the same pass
+            for leaf in query.leaves:
+                for key, value in doc.items():
+                    found = leaf.lookup(key, value, self.latest_only)
+                    if found is None:
+                        continue
+                    # a filter query was hit
+                    if leaf.negate:
+                        all_required = False
+                        break
+                    found_any = True
+                    merged[leaf.key] = found[0]
+                    sub_keys.append(found[1])
+            if query.required and not found_any:
+                all_required = False
+
+        # in strict mode all queries need to have some result
+        if self.strict:
+            all_required = len(sub_keys) == len(self.queries)
+        if not all_required:
+            return None
+        return query_result(job_id, [merged], sub_keys)
+
+
+def compile_queries(
+    queries: list[Query],
+    latest_only: bool = True,
+    strict: bool = False,
+    key_paths: Optional[dict[str, list[str]]] = None,
+) -> QueryPlan:
+    """Converts a list of queries into a reusable QueryPlan
+
+    key_paths optionally maps keys to all dotted paths at which they occur in
+    the queried documents, see `JobIndex.key_paths`.
+    """
+    return QueryPlan(
+        tuple(CompiledQuery.from_query(q, key_paths) for q in queries),
+        latest_only,
+        strict,
+    )
+
+
+def collect_values(doc: dict, keys: set, latest_only: bool = True) -> dict[Any, list]:
+    """Collects all values of the given keys that a query could reach in a
+    merged job document in a single pass
+    """
+    found: dict[Any, list] = {}
+    if not keys:
+        return found
+
+    def visit(key, value):
+        if isinstance(value, list) and latest_only and value:
+            value = value[-1]
+        if is_dict(value):
+            for sub_key, sub_value in value.items():
+                visit(sub_key, sub_value)
+        if key in keys:
+            found.setdefault(key, []).append(value)
+
+    for key, value in doc.items():
+        visit(key, value)
+    return found
+
+
+@dataclass
+class FilterColumn:
+    """All values of a key found in the jobs of a FilterFrame, split by type.
+    Each *_rows array holds the row index of the job a value belongs to.
+    """
+
+    num_rows: np.ndarray
+    num_values: np.ndarray
+    str_rows: np.ndarray
+    str_values: np.ndarray
+    other_rows: list[int]
+    other_values: list
+
+
+class FilterFrame:
+    """A typed table of the values of the filtered keys of all jobs
+
+    Filters are evaluated as boolean masks over all jobs at once instead of
+    running the query engine job by job.
+    """
+
+    def __init__(self, docs: dict[str, dict], plan: "QueryPlan"):
+        self.ids = list(docs.keys())
+        latest_only = plan.latest_only
+        leaves = [leaf for q in plan.queries for leaf in q.leaves]
+        keys = {q.key for q in leaves}
+        direct = {q.key: q.direct_paths for q in leaves if q.direct_paths is not None}
+        search_keys = keys - direct.keys()
+        values: dict[Any, tuple[list, list, list, list, list, list]] = {
+            key: ([], [], [], [], [], []) for key in keys
+        }
+        for row, doc in enumerate(docs.values()):
+            collected = collect_values(doc, search_keys, latest_only)
+            for key, paths in direct.items():
+                collected[key] = [
+                    value
+                    for exists, value in (
+                        resolve_path(doc, path, latest_only) for path in paths
+                    )
+                    if exists
+                ]
+            for key, found in collected.items():
+                num_r, num_v, str_r, str_v, other_r, other_v = values[key]
+                for value in found:
+                    if isinstance(value, (int, float)):
+                        num_r.append(row)
+                        num_v.append(value)
+                    elif isinstance(value, str):
+                        str_r.append(row)
+                        str_v.append(value)
+                    else:
+                        other_r.append(row)
+                        other_v.append(value)
+        self.columns = {
+            key: FilterColumn(
+                np.array(num_r, dtype=np.int64),
+                np.array(num_v, dtype=np.float64),
+                np.array(str_r, dtype=np.int64),
+                np.array(str_v, dtype=str),
+                other_r,
+                other_v,
+            )
+            for key, (num_r, num_v, str_r, str_v, other_r, other_v) in values.items()
+        }
+
+    def mask(self, query: CompiledQuery) -> np.ndarray:
+        """Returns a boolean mask of all jobs with any value matching the query"""
+        if query.any_of:
+            return np.logical_or.reduce([self.mask(leaf) for leaf in query.any_of])
+        column = self.columns[query.key]
+        hits = np.zeros(len(self.ids), dtype=bool)
+        if column.num_values.size:
+            matched = query.match_array(column.num_values, numeric=True)
+            hits[column.num_rows[matched]] = True
+        if column.str_values.size:
+            matched = query.match_array(column.str_values, numeric=False)
+            hits[column.str_rows[matched]] = True
+        for row, value in zip(column.other_rows, column.other_values):
+            if not hits[row] and query.compare(value)[0]:
+                hits[row] = True
+        return hits
+
+    def select(self, plan: "QueryPlan") -> list[str]:
+        """Returns the ids of all jobs passing all queries of the plan"""
+        selected = np.ones(len(self.ids), dtype=bool)
+        for query in plan.queries:
+            if query.required:
+                selected &= self.mask(query)
+        return [job_id for job_id, keep in zip(self.ids, selected) if keep]
+
+
+def is_vectorizable(plan: "QueryPlan") -> bool:
+    """Plans which only consist of simple comparisons can be evaluated by a
+    FilterFrame"""
+    return not plan.strict and not any(q.negate for q in plan.queries)
+
+
+def query_columns(
+    queries: Iterable[Query], key_paths: dict[str, list[str]]
+) -> set[str]:
+    """Returns the top level keys of the merged job documents a list of queries
+    can match, ie. the heads of all paths at which the queried keys occur
+    """
+    columns = set()
+    for q in leaf_queries(queries):
+        path = split_key_path(q.key)
+        if path:
+            columns.add(path[0])
+            continue
+        for key_path in key_paths.get(q.key, []):
+            columns.add(key_path.split(PATH_SEPARATOR)[0])
+    return columns
+
+
+def iter_jobs(
+    jobs: "Union[OpenFOAMProject, list[Job]]",
+    queries: Optional[list[Query]] = None,
+) -> tuple[Iterator[tuple[str, dict]], Optional[dict[str, list[str]]]]:
+    """Lazily yields the merged statepoint and job document of every job
+
+    If possible the merged documents are served from the persistent `JobIndex`
+    of the project, which only re-reads jobs that changed since the last call.
+    Without queries the documents of a chunk of jobs are yielded as soon as
+    the chunk is refreshed. If queries are given only the top level keys the
+    queries can match are loaded from the index, eg. the history of a job is
+    skipped unless a queried key occurs in it.
+
+    Returns: an iterator of job id and merged document pairs and, if the index
+    was used, the paths at which the queried keys occur
+    """
+    if not isinstance(jobs, Project):
+        jobs = list(jobs)
+    index = JobIndex.for_jobs(jobs)
+    if not index:
+        return iter_scan_jobs(jobs), None
+    if queries is None:
+        return (
+            doc for job_ids in index.iter_refresh(jobs) for doc in index.docs(job_ids)
+        ), None
+    # the queried keys can occur at new paths in any changed job, hence the
+    # paths are only known once all jobs are refreshed
+    job_ids = index.refresh(jobs)
+    key_paths = index.key_paths(query_keys(queries))
+    return index.docs(job_ids, query_columns(queries, key_paths)), key_paths
+
+
+def load_jobs(
+    jobs: "Union[OpenFOAMProject, list[Job]]",
+    queries: Optional[list[Query]] = None,
+) -> tuple[dict, Optional[dict[str, list[str]]]]:
+    """convert a list of jobs to a dictionary
+
+    Returns: the merged documents by job id and, if the index was used, the
+    paths at which the queried keys occur
+    """
+    docs, key_paths = iter_jobs(jobs, queries)
+    return dict(docs), key_paths
+
+
 def flatten_jobs(
     jobs: "Union[OpenFOAMProject, list[Job]]",
 ) -> dict:
     """convert a list of jobs to a dictionary"""
-    docs: dict = {}
+    return load_jobs(jobs)[0]
 
-    # merge job docs and statepoints
-    for job in jobs:
-        docs[job.id] = {}
-        for key, value in job.doc.items():
-            docs[job.id].update({key: value})
-        docs[job.id].update(job.sp())
-    return docs
+
+def leaf_queries(queries: Iterable[Query]) -> Iterator[Query]:
+    """Yields all queries with the alternatives of OR groups in place of the
+    group"""
+    for q in queries:
+        if q.predicate == "or":
+            yield from leaf_queries(q.value)
+        else:
+            yield q
+
+
+def query_keys(queries: list[Query]) -> set:
+    """Returns the keys of all queries which are not dotted paths"""
+    return {q.key for q in leaf_queries(queries) if not split_key_path(q.key)}
+
+
+def scan_job(job: Job) -> tuple[str, dict]:
+    """Reads and merges the job document and statepoint of a single job"""
+    if isinstance(job, Job):
+        return job.id, load_job_files(job.path)
+    doc = {}
+    for key, value in job.doc.items():
+        doc.update({key: value})
+    doc.update(job.sp())
+    return job.id, doc
+
+
+def iter_scan_jobs(
+    jobs: "Union[OpenFOAMProject, list[Job]]",
+) -> Iterator[tuple[str, dict]]:
+    """Yields job id and merged document pairs by reading every job document
+
+    The documents are read concurrently, see `parallel_map`.
+    """
+    return parallel_map(scan_job, jobs)
+
+
+def scan_jobs(
+    jobs: "Union[OpenFOAMProject, list[Job]]",
+) -> dict:
+    """convert a list of jobs to a dictionary by reading every job document"""
+    return dict(iter_scan_jobs(jobs))
+
+
+def iter_flat_jobs(
+    jobs: Iterable[tuple[str, dict]],
+    queries: list[Query],
+    latest_only: bool = True,
+    strict: bool = False,
+    key_paths: Optional[dict[str, list[str]]] = None,
+) -> Iterator[query_result]:
+    """Lazily executes queries over job id and merged job document pairs and
+    yields a query_result as soon as a job matches"""
+    plan = compile_queries(queries, latest_only, strict, key_paths)
+    for job_id, doc in jobs:
+        res = plan.evaluate(job_id, doc)
+        if res is not None:
+            yield res
 
 
 def query_flat_jobs(
-    jobs: dict[str, dict], queries: list[Query], output, latest_only, strict
+    jobs: dict[str, dict],
+    queries: list[Query],
+    output,
+    latest_only,
+    strict,
+    key_paths: Optional[dict[str, list[str]]] = None,
 ) -> list[query_result]:
     """
     Execute queries over a dictionary where the job.id is the key and merged job.docs are the values
@@ -173,55 +755,24 @@ def query_flat_jobs(
     output -- Whether to print result to screen
     latest_only -- Take only latest value if resulting value is a list
     strict -- needs all queries to be successful to return a result
+    key_paths -- optional mapping of keys to the paths they occur at
     """
-    ret = []
-    for job_id, doc in jobs.items():
-        # scan through merged operations and statepoint values of a job
-        # look for keys and values
-        # and append if all queries have been matched
-        tmp_qs: list[Query] = []
-        all_required = True
-        for q in queries:
-            res_cache = {}
-            for key, value in doc.items():
-                q_tmp = deepcopy(q)
-                res = execute_query(q_tmp, key, value, latest_only, [])
-                if res.state:
-                    # a filter query was hit
-                    if res.negate:
-                        all_required = False
-                        break
-
-                    res_cache = res.state
-                    tmp_qs.append(res)
+    return list(iter_flat_jobs(jobs.items(), queries, latest_only, strict, key_paths))
 
-            # res.state could be from any key before
-            if q.value and not res_cache:
-                all_required = False
 
-        # append if all required results are present
-        res_tmp = query_result(job_id)
-        for q in tmp_qs:
-            # requests a value but not a state
-            # is currently considered to be failed
-            res_tmp.result.append(q.state)
-            res_tmp.sub_keys.append(q.sub_keys)
+def iter_query(
+    jobs: "Union[OpenFOAMProject, list[Job]]",
+    queries: list[Query],
+    latest_only=True,
+    strict=False,
+) -> Iterator[query_result]:
+    """Given a list jobs lazily yields the query result of every matching job
 
-        # in strict mode all queries need to have some result
-        if strict:
-            all_required = len(res_tmp.result) == len(queries)
-            # if not all_required:
-            #    raise Exception(res_tmp)
-
-        # merge all results to a single dictionary
-        res_tmp_dict = {}
-        for d in res_tmp.result:
-            res_tmp_dict.update(d)
-        res_tmp.result = [res_tmp_dict]
-
-        if all_required:
-            ret.append(deepcopy(res_tmp))
-    return ret
+    Jobs are loaded one at a time, hence results are available before all jobs
+    have been read.
+    """
+    docs, key_paths = iter_jobs(jobs, queries)
+    return iter_flat_jobs(docs, queries, latest_only, strict, key_paths)
 
 
 def query_to_dict(
@@ -235,7 +786,17 @@ def query_to_dict(
 
     Flattens list of jobs to a dictionary with merged statepoints and job document first
     """
-    return query_flat_jobs(flatten_jobs(jobs), queries, output, latest_only, strict)
+    return list(iter_query(jobs, queries, latest_only, strict))
+
+
+def iter_query_impl(
+    jobs: "Union[OpenFOAMProject, list[Job]]",
+    queries: list[Query],
+    latest_only=True,
+) -> Iterator[tuple[str, dict]]:
+    """Performs a query and yields the job id and query result of every job"""
+    for res in iter_query(jobs, queries, latest_only):
+        yield res.id, res.result[0]
 
 
 def query_impl(
@@ -245,11 +806,20 @@ def query_impl(
     latest_only=True,
 ) -> list[dict]:
     """Performs a query and returns a list of records ie for each job the query result"""
-    res = query_to_dict(jobs, queries, output, latest_only)
-    query_ids = {}
-    for id_ in res:
-        query_ids[id_.id] = id_.result[0]
-    return query_ids
+    return dict(iter_query_impl(jobs, queries, latest_only))
+
+
+def iter_query_records(
+    jobs: "OpenFOAMProject",
+    queries: list[Query],
+    latest_only=True,
+    strict=False,
+) -> Iterator[dict]:
+    """Given a list jobs yields a record for every query result of a job"""
+    for q in iter_query(jobs, queries, latest_only, strict):
+        for r in q.result:
+            r.update({"jobid": q.id})
+            yield r
 
 
 def query_to_records(
@@ -262,15 +832,7 @@ def query_to_records(
 
     Flattens list of jobs to a dictionary with merged statepoints and job document first
     """
-    query_results = query_flat_jobs(
-        flatten_jobs(jobs), queries, False, latest_only, strict
-    )
-    ret = []
-    for q in query_results:
-        for r in q.result:
-            r.update({"jobid": q.id})
-            ret.append(r)
-    return ret
+    return list(iter_query_records(jobs, queries, latest_only, strict))
 
 
 def query_to_dataframe(
@@ -298,14 +860,68 @@ def query_to_dataframe(
     return ret
 
 
+# <key> in <value>,<value> and <key> not in {<value>,<value>}
+MEMBERSHIP_FILTER = re.compile(
+    r"^\s*(?P<key>[^\s=<>!|]+)\s+(?P<op>not\s+in|in)\s+(?P<values>.+?)\s*$"
+)
+# <lower> < <key> <= <upper>
+RANGE_FILTER = re.compile(
+    r"^\s*(?P<lower>[^<>=!|]+?)\s*(?P<lower_op><=|<)\s*(?P<key>[^\s<>=!|]+)"
+    r"\s*(?P<upper_op><=|<)\s*(?P<upper>[^<>=!|]+?)\s*$"
+)
+
+
 def build_filter_query(filters: Iterable[str]) -> list[Query]:
-    """This function builds a list of filter queries, where filter queries are queries that request a specific value and has to conform a predicate"""
+    """This function builds a list of filter queries, where filter queries are queries that request a specific value and has to conform a predicate
+
+    Besides <key><predicate><value> filters, the following forms are supported
+    - membership: numberOfSubdomains in {4,8,16} or solver not in icoFoam,pisoFoam
+    - closed ranges: 1e5<nCells<=1e6
+    - OR groups of any of the above separated by |: solver==icoFoam|nCells>1e6
+    """
     q: list[Query] = []
 
     # avoid iterating over characters of one filter/query
     if not isinstance(filters, (list, tuple)):
         filters = [filters]
     for filter in filters:
+        if "|" in filter:
+            alternatives = build_filter_query(filter.split("|"))
+            q.append(
+                Query(
+                    key="|".join(alt.key for alt in alternatives),
+                    value=alternatives,
+                    predicate="or",
+                )
+            )
+            continue
+        if match := MEMBERSHIP_FILTER.match(filter):
+            logger.debug(f"Found membership predicate in {filter=}")
+            values = match["values"].strip("{}[]() ").split(",")
+            q.append(
+                Query(
+                    key=match["key"],
+                    value=[v.strip() for v in values if v.strip()],
+                    predicate="in" if match["op"] == "in" else "nin",
+                )
+            )
+            continue
+        if match := RANGE_FILTER.match(filter):
+            logger.debug(f"Found range in {filter=}")
+            key = match["key"]
+            lower_op = "geq" if match["lower_op"] == "<=" else "gt"
+            upper_op = "leq" if match["upper_op"] == "<=" else "lt"
+            q.append(
+                Query(
+                    key=key,
+                    value=[
+                        Query(key=key, value=match["lower"], predicate=lower_op),
+                        Query(key=key, value=match["upper"], predicate=upper_op),
+                    ],
+                    predicate="range",
+                )
+            )
+            continue
         for predicate in Predicates:
             # check if predicates like =, >, <=.. are in the filter
             if predicate.value in filter:
@@ -322,43 +938,244 @@ def build_filter_query(filters: Iterable[str]) -> list[Query]:
     return q
 
 
-def statepoint_get(statepoint: dict, key: str):
+class ResolvedStatepoint(dict):
+    """A flattened view of a statepoint and all its parent statepoints
+
+    Maps every key to a tuple of its value and the depth of the statepoint
+    defining it, where 0 is the statepoint itself, 1 its parent and so on.
+    Only the first truthy value of a key, starting from the statepoint itself,
+    is kept.
+    """
+
+    def value(self, key: str):
+        return self[key][0] if key in self else False
+
+
+def resolve_statepoint(
+    statepoint: dict, parent: Optional[ResolvedStatepoint] = None
+) -> ResolvedStatepoint:
+    """Resolves a statepoint by walking its parent statepoints once
+
+    If the resolved view of the parent statepoint is known already it can be
+    passed via parent, which avoids walking the parent statepoints again.
+    """
+    resolved = ResolvedStatepoint()
+    depth = 0
+    while statepoint:
+        for key, value in statepoint.items():
+            if value and key not in resolved:
+                resolved[key] = (value, depth)
+        statepoint = statepoint.get("parent")
+        depth += 1
+        if parent is not None and statepoint:
+            for key, (value, parent_depth) in parent.items():
+                if key not in resolved:
+                    resolved[key] = (value, parent_depth + depth)
+            break
+    return resolved
+
+
+# resolved statepoints of this process by job id and statepoint signature
+_resolved_statepoints: dict[str, tuple[str, ResolvedStatepoint]] = {}
+
+
+def resolved_statepoint(job: Job) -> ResolvedStatepoint:
+    """Returns the resolved statepoint of a job
+
+    The view is cached in memory and in the job index in .obr and recomputed
+    only if the statepoint file of the job changes.
+    """
+    signature = statepoint_signature(job.path)
+    cached = _resolved_statepoints.get(job.id)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    index = JobIndex.for_jobs([job])
+    try:
+        stored = (
+            index.resolved_statepoint(job.id, job.path, resolve_statepoint)
+            if index
+            else resolve_statepoint(job.sp())
+        )
+    except (sqlite3.Error, OSError) as e:
+        logger.debug(f"Could not use job index for resolved statepoint {e}")
+        stored = resolve_statepoint(job.sp())
+    resolved = ResolvedStatepoint(
+        (key, tuple(value_depth)) for key, value_depth in stored.items()
+    )
+    _resolved_statepoints[job.id] = (signature, resolved)
+    return resolved
+
+
+def statepoint_get(statepoint: Union[dict, ResolvedStatepoint], key: str):
     """This function performs a basic recursive query of the statepoint dictionary
     if the key: value pair is not found in statepoint it recurses into statepoint["parent"] if present
 
+    A ResolvedStatepoint can be passed instead of the statepoint dictionary, in
+    which case the lookup does not depend on the depth of the statepoint.
     """
-    val = statepoint.get(key)
-    if val:
-        return val
-    else:
-        if statepoint.get("parent"):
-            return statepoint_get(statepoint["parent"], key)
-    return False
+    if not isinstance(statepoint, ResolvedStatepoint):
+        statepoint = resolve_statepoint(statepoint)
+    return statepoint.value(key)
 
 
-def statepoint_query(statepoint: dict, key: str, value, predicate="=="):
+def statepoint_query(
+    statepoint: Union[dict, ResolvedStatepoint], key: str, value, predicate="=="
+):
     """This function performs a basic recursive query of the statepoint dictionary
     if the key: value pair is not found in statepoint it recurses into statepoint["parent"] if present
 
+    A ResolvedStatepoint can be passed instead of the statepoint dictionary, in
+    which case the lookup does not depend on the depth of the statepoint.
     """
-    if statepoint.get(key):
-        return statepoint[key] == value
-    else:
-        if statepoint.get("parent"):
-            return statepoint_query(statepoint["parent"], key, value, predicate)
+    if not isinstance(statepoint, ResolvedStatepoint):
+        statepoint = resolve_statepoint(statepoint)
+    if key in statepoint:
+        return statepoint[key][0] == value
     return False
 
 
+SIGNAC_OPERATORS = {
+    "eq": "$eq",
+    "neq": "$ne",
+    "gt": "$gt",
+    "geq": "$gte",
+    "lt": "$lt",
+    "leq": "$lte",
+}
+
+
+def signac_condition(query: CompiledQuery, numeric: bool) -> Optional[dict]:
+    """Translates a compiled query into signac operators for numeric or string
+    values
+
+    Returns: the operators or None if the query never matches such values
+    """
+    if query.bounds:
+        condition: dict = {}
+        for bound in query.bounds:
+            bound_condition = signac_condition(bound, numeric)
+            if bound_condition is None:
+                return None
+            condition.update(bound_condition)
+        return condition
+    if query.predicate in SET_PREDICATES:
+        members = sorted(query.float_set if numeric else query.str_set)
+        return {"$in" if query.predicate == "in" else "$nin": members}
+    reference = query.float_value if numeric else query.str_value
+    if reference is None:
+        return None
+    return {SIGNAC_OPERATORS[query.predicate]: reference}
+
+
+def statepoint_filter(
+    query: Query, path_kinds: dict[str, dict[str, set[tuple[str, str]]]]
+) -> Optional[dict]:
+    """Translates a filter query into an equivalent signac statepoint filter
+
+    A query is only translated if all paths at which its key occurs belong to
+    statepoints and hold either numbers or strings throughout the workspace,
+    since only then signac compares values in the same way as `Query`. OR
+    groups are translated if all their alternatives can be translated.
+
+    Returns: the signac filter or None if the query cannot be translated
+    """
+    if query.negate:
+        return None
+    if query.predicate == "or":
+        clauses = []
+        for alternative in query.value:
+            sp_filter = statepoint_filter(alternative, path_kinds)
+            if sp_filter is None:
+                return None
+            clauses.append(sp_filter)
+        return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+    compiled = CompiledQuery.from_query(query)
+    if query.value is None or not compiled.required:
+        return None
+    paths = path_kinds.get(leaf_key(query.key), {})
+    if compiled.path:
+        dotted = PATH_SEPARATOR.join(compiled.path)
+        paths = {dotted: paths.get(dotted, set())}
+    clauses = []
+    for path, sources_kinds in sorted(paths.items()):
+        sources = {source for source, _ in sources_kinds}
+        kinds = {kind for _, kind in sources_kinds}
+        if sources != {"sp"} or kinds not in ({"number"}, {"string"}):
+            return None
+        condition = signac_condition(compiled, numeric=kinds == {"number"})
+        if condition is not None:
+            clauses.append({path: condition})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def split_filter_queries(
+    queries: list[Query], path_kinds: dict[str, dict[str, set[tuple[str, str]]]]
+) -> tuple[Optional[dict], list[Query]]:
+    """Splits filter queries into a signac statepoint filter and the queries
+    which need to be evaluated on the merged job documents
+
+    path_kinds are the paths, sources and value kinds of the queried keys,
+    see `JobIndex.path_kinds`.
+    """
+    pushed = []
+    remaining = []
+    for q in queries:
+        sp_filter = statepoint_filter(q, path_kinds)
+        if sp_filter is None:
+            remaining.append(q)
+        else:
+            pushed.append(sp_filter)
+    if not pushed:
+        return None, queries
+    return (pushed[0] if len(pushed) == 1 else {"$and": pushed}), remaining
+
+
+def select_job_ids(docs: dict[str, dict], queries: list[Query], key_paths) -> list[str]:
+    """Returns the ids of all jobs for which all filter queries match"""
+    plan = compile_queries(queries, key_paths=key_paths)
+    if is_vectorizable(plan):
+        return FilterFrame(docs, plan).select(plan)
+    return [
+        job_id for job_id, doc in docs.items() if plan.evaluate(job_id, doc) is not None
+    ]
+
+
 def filter_jobs(project, filter: Iterable[str], output: bool = False) -> list[Job]:
-    """`filter` is expected to be a list, string or other iterable of strings in the form of <key><predicate><value>"""
-    jobs: list[Job]
-
-    if filter:
-        if isinstance(filter, str):
-            filter = [filter]
-        queries = build_filter_query(filter)
-        sel_jobs = query_impl(project, queries, output=output)
-        jobs = [j for j in project if j.id in sel_jobs]
-    else:
-        jobs = [j for j in project]
-    return jobs
+    """`filter` is expected to be a list, string or other iterable of strings in the form of <key><predicate><value>
+
+    Filters which only depend on statepoints are translated into a signac
+    filter and evaluated by `project.find_jobs`, the remaining filters are
+    evaluated on the merged job documents of the found jobs.
+    """
+    if not filter:
+        return [j for j in project]
+    if isinstance(filter, str):
+        filter = [filter]
+    queries = build_filter_query(filter)
+
+    index = JobIndex.for_jobs(project)
+    if not index:
+        docs = scan_jobs(project)
+        return [
+            project.open_job(id=job_id)
+            for job_id in select_job_ids(docs, queries, None)
+        ]
+
+    job_ids = index.refresh(project)
+    sp_filter, queries = split_filter_queries(
+        queries, index.path_kinds({leaf_key(q.key) for q in leaf_queries(queries)})
+    )
+    found: dict[str, Job] = {}
+    if sp_filter is not None:
+        logger.debug(f"Passing statepoint filter {sp_filter} to signac")
+        found = {job.id: job for job in project.find_jobs(sp_filter)}
+        job_ids = [job_id for job_id in job_ids if job_id in found]
+    if queries:
+        key_paths = index.key_paths(query_keys(queries))
+        docs = dict(index.docs(job_ids, query_columns(queries, key_paths)))
+        job_ids = select_job_ids(docs, queries, key_paths)
+    return [found.get(job_id) or project.open_job(id=job_id) for job_id in job_ids]
@@ -0,0 +1,135 @@
+import sys
+import time
+import resource
+
+from dataclasses import dataclass, field
+from typing import Iterable
+
+# ru_maxrss is reported in bytes on macOS and in KiB on Linux
+MAXRSS_TO_KIB = 1 / 1024 if sys.platform == "darwin" else 1
+
+
+def spawn_rss() -> int:
+    """Returns the peak resident memory of the OBR process in KiB
+
+    A child process shares the memory of OBR until it executes its command
+    and Linux accounts this memory to the peak memory of the child, hence the
+    max_rss of a child process is never below this value.
+    """
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_TO_KIB)
+
+
+def rusage_resources(
+    wall_time: float, usage: resource.struct_rusage, rss_floor: int = 0
+) -> dict:
+    """Converts a wall time and rusage of a process to the resources stored in
+    a history record
+
+    Args:
+        rss_floor: the `spawn_rss` when the process was started, stored as
+        max_rss_floor. If max_rss does not exceed it, the peak memory of the
+        command itself is unknown and at most max_rss.
+    """
+    resources = {
+        "wall_time": round(wall_time, 6),
+        "user_time": round(usage.ru_utime, 6),
+        "system_time": round(usage.ru_stime, 6),
+        "max_rss": int(usage.ru_maxrss * MAXRSS_TO_KIB),
+    }
+    if rss_floor:
+        resources["max_rss_floor"] = rss_floor
+    return resources
+
+
+class ResourceTimer:
+    """Measures wall time, cpu times and peak memory of in-process function
+    calls including their child processes
+
+    CPU times are the difference of getrusage before and after the call. The
+    peak memory can not be measured per call, hence max_rss is the high water
+    mark of the OBR process or its largest child, whichever is larger.
+    """
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.self_before = resource.getrusage(resource.RUSAGE_SELF)
+        self.children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return self
+
+    def __exit__(self, *args):
+        wall_time = time.perf_counter() - self.start
+        usage_self = resource.getrusage(resource.RUSAGE_SELF)
+        usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        def delta(attr: str) -> float:
+            return (
+                getattr(usage_self, attr)
+                - getattr(self.self_before, attr)
+                + getattr(usage_children, attr)
+                - getattr(self.children_before, attr)
+            )
+
+        self.resources = {
+            "wall_time": round(wall_time, 6),
+            "user_time": round(delta("ru_utime"), 6),
+            "system_time": round(delta("ru_stime"), 6),
+            "max_rss": int(
+                max(usage_self.ru_maxrss, usage_children.ru_maxrss) * MAXRSS_TO_KIB
+            ),
+        }
+
+
+@dataclass
+class OperationStats:
+    """Aggregated resources of all history records of one operation"""
+
+    cmd: str
+    calls: int = 0
+    wall_time: float = 0.0
+    max_wall_time: float = 0.0
+    cpu_time: float = 0.0
+    max_rss: int = 0
+    # whether max_rss is only an upper bound, see `rusage_resources`
+    max_rss_bounded: bool = False
+    jobs: set = field(default_factory=set)
+
+    def add(self, job_id: str, resources: dict):
+        wall_time = resources.get("wall_time", 0.0)
+        self.calls += 1
+        self.wall_time += wall_time
+        self.max_wall_time = max(self.max_wall_time, wall_time)
+        self.cpu_time += resources.get("user_time", 0.0) + resources.get(
+            "system_time", 0.0
+        )
+        max_rss = resources.get("max_rss", 0)
+        bounded = max_rss <= resources.get("max_rss_floor", 0)
+        if max_rss > self.max_rss or (max_rss == self.max_rss and not bounded):
+            self.max_rss, self.max_rss_bounded = max_rss, bounded
+        self.jobs.add(job_id)
+
+    @property
+    def mean_wall_time(self) -> float:
+        return self.wall_time / self.calls if self.calls else 0.0
+
+
+def aggregate_resources(
+    histories: Iterable[tuple[str, list[dict]]],
+) -> list[OperationStats]:
+    """Aggregates the resources of history records per operation
+
+    Args:
+        histories: pairs of job id and history records
+
+    Returns: the statistics per operation sorted by total wall time
+    """
+    from .core import key_to_path
+
+    stats: dict[str, OperationStats] = {}
+    for job_id, history in histories:
+        for record in history or []:
+            resources = record.get("resources")
+            if not resources:
+                continue
+            cmd = key_to_path(str(record.get("cmd", "")).split("/")[-1])
+            stats.setdefault(cmd, OperationStats(cmd)).add(job_id, resources)
+    return sorted(stats.values(), key=lambda s: s.wall_time, reverse=True)
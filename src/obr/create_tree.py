@@ -6,7 +6,12 @@ from pathlib import Path
 from subprocess import check_output
 from signac.job import Job
 from obr.signac_wrapper.operations import OpenFOAMProject
-from obr.core.queries import statepoint_query
+from obr.core.queries import (
+    resolve_statepoint,
+    resolved_statepoint,
+    statepoint_query,
+)
+from obr.core.core import buffered_doc
 from obr.core.parse_yaml import eval_generator_expressions
 from obr.core.logger_setup import logger
 from copy import deepcopy
@@ -190,6 +195,8 @@ def add_variations(
 
     Returns: A list of all operation names
     """
+    # the resolved parent statepoint is shared by all statepoint filters
+    parent_view = None
     for operation in variation:
         sub_variation = operation.get("variation", {})
 
@@ -238,6 +245,9 @@ def add_variations(
                 and value.get("if", False)
                 and isinstance(value["if"], list)
             ):
+                if parent_view is None:
+                    parent_view = resolved_statepoint(parent_job)
+                view = resolve_statepoint(statepoint, parent_view)
                 for filter_record in value["if"]:
                     predicate = filter_record.pop("predicate", "==")
                     if len(filter_record) != 1:
@@ -245,7 +255,7 @@ def add_variations(
                             "Exact one key-value pair is required for an if record"
                         )
                     key, value = list(filter_record.items())[0]
-                    skip = not statepoint_query(statepoint, key, value, predicate)
+                    skip = not statepoint_query(view, key, value, predicate)
                     if skip:
                         logger.debug(
                             f"skipping generating statepoint {statepoint} because of"
@@ -256,9 +266,10 @@ def add_variations(
                     continue
 
             job = project.open_job(statepoint)
-            setup_job_doc(job)
             job.init()
-            job.doc["state"]["global"] = ""
+            with buffered_doc(job):
+                setup_job_doc(job)
+                job.doc["state"]["global"] = ""
 
             id_path_mapping[job.id] = (
                 id_path_mapping.get(parent_job.id, "") + parse_res["path"]
@@ -3,7 +3,7 @@
 from pathlib import Path
 from flow import FlowProject
 
-from ..core.core import get_mesh_stats
+from ..core.core import buffered_doc, get_mesh_stats
 
 
 @FlowProject.label
@@ -66,8 +66,9 @@ def final(job):
             owner_path = f"{job.path}/case/constant/polyMesh/owner"
             if not job.doc["cache"].get("nCells"):
                 mesh_stats = get_mesh_stats(owner_path)
-                job.doc["cache"]["nCells"] = mesh_stats["nCells"]
-                job.doc["cache"]["nFaces"] = mesh_stats["nFaces"]
+                with buffered_doc(job):
+                    job.doc["cache"]["nCells"] = mesh_stats["nCells"]
+                    job.doc["cache"]["nFaces"] = mesh_stats["nFaces"]
             return True
     else:
         return False
@@ -11,17 +11,30 @@ import shutil
 from pathlib import Path
 from subprocess import check_output
 from signac.job import Job
-from typing import Union, Literal
+from typing import Iterator, Union, Literal
 from datetime import datetime
 
 from .labels import owns_mesh, final, finished
 from ..core.core import (
+    buffered_doc,
     execute_shell,
     GLOBAL_INIT_COUNT,
     map_view_folder_to_job_id,
+    record_touched,
+    take_touched_paths,
+    track_touched_paths,
 )  # noqa
-from obr.OpenFOAM.case import OpenFOAMCase
-from obr.core.queries import filter_jobs, query_impl, Query, statepoint_get
+from obr.OpenFOAM.case import get_case
+from obr.core.history import append_history
+from obr.core.logs import compress_log, index_latest_log, log_compression
+from obr.core.queries import (
+    filter_jobs,
+    iter_query_impl,
+    query_impl,
+    Query,
+    resolved_statepoint,
+    statepoint_get,
+)
 from obr.core.caseOrigins import instantiate_origin_class
 
 logger = logging.getLogger("OBR")
@@ -52,6 +65,10 @@ class OpenFOAMProject(flow.FlowProject):
         """return list of job ids as result of `Query`."""
         return query_impl(jobs, query, output=True)
 
+    def iter_query(self, jobs: list[Job], query: list[Query]) -> Iterator[tuple]:
+        """yield job id and result pairs of `Query` as soon as a job matches."""
+        return iter_query_impl(jobs, query)
+
     def set_entrypoint(self, entrypoint: dict):
         """Sets the entrypoint for a project, this is useful for submit so that
         submit writes scripts that call obr run -o <args> instead of the default signac run -o <args>
@@ -347,6 +364,7 @@ def end_job_state(_, job: Job) -> Literal[True]:
 
 def dispatch_pre_hooks(operation_name: str, job: Job):
     """just forwards to start_job_state and execute_pre_build"""
+    track_touched_paths(job.path)
     start_job_state(operation_name, job)
     execute_pre_build(operation_name, job)
 
@@ -354,13 +372,16 @@ def dispatch_pre_hooks(operation_name: str, job: Job):
 def dispatch_post_hooks(operation_name: str, job: Job):
     """Forwards to `execute_post_build`, performs md5sum calculation of case files and finishes with `end_job_state`"""
     execute_post_build(operation_name, job)
-    case = OpenFOAMCase(str(job.path) + "/case", job)
-    case.perform_post_md5sum_calculations()
-    end_job_state(operation_name, job)
+    touched = take_touched_paths(job.path)
+    case = get_case(str(job.path) + "/case", job)
+    with buffered_doc(job):
+        case.perform_post_md5sum_calculations(touched)
+        end_job_state(operation_name, job)
 
 
 def set_failure(operation_name: str, error, job: Job):
     """just forwards to start_job_state and execute_pre_build"""
+    take_touched_paths(job.path)
     job.doc["state"]["global"] = "failure"
 
 
@@ -370,11 +391,13 @@ def copy_on_uses(args: dict, job: Job, path: str, target: str):
         return
     if uses := args.pop("uses", False):
         if path:
+            trg_path = "{}/case/{}/{}".format(job.path, path, target)
             check_output([
                 "cp",
                 "{}/case/{}/{}".format(job.path, path, uses),
-                "{}/case/{}/{}".format(job.path, path, target),
+                trg_path,
             ])
+            record_touched(trg_path)
         else:
             src_path = "{}/case/{}".format(job.path, uses)
             trg_path = "{}/case/{}".format(job.path, target)
@@ -382,6 +405,7 @@ def copy_on_uses(args: dict, job: Job, path: str, target: str):
             # as long as the target path exists
             if not Path(trg_path).exists() and Path(src_path).exists():
                 check_output(["cp", "-r", src_path, trg_path])
+                record_touched(trg_path)
 
 
 @generate
@@ -398,7 +422,9 @@ def controlDict(job: Job, args={}):
     # if this was a variation. In any case this could be a decorator
     args = get_args(job, args)
     copy_on_uses(args, job, "system", "controlDict")
-    OpenFOAMCase(str(job.path) + "/case", job).controlDict.set(args)
+    case = get_case(str(job.path) + "/case", job)
+    with case.edit() as session:
+        session.set(case.controlDict, args)
 
 
 @generate
@@ -430,7 +456,7 @@ def MultiCase(job: Job, args={}):
 @OpenFOAMProject.operation
 def blockMesh(job: Job, args={}):
     args = get_args(job, args)
-    OpenFOAMCase(str(job.path) + "/case", job).blockMesh(args)
+    get_case(str(job.path) + "/case", job).blockMesh(args)
 
 
 @generate
@@ -474,7 +500,9 @@ def fvSolution(job: Job, args={}):
     args = get_args(job, args)
     copy_on_uses(args, job, "system", "fvSolution")
     if args:
-        OpenFOAMCase(str(job.path) + "/case", job).fvSolution.set(args)
+        case = get_case(str(job.path) + "/case", job)
+        with case.edit() as session:
+            session.set(case.fvSolution, args)
 
 
 @generate
@@ -488,7 +516,9 @@ def fvSchemes(job: Job, args={}):
     args = get_args(job, args)
     copy_on_uses(args, job, "system", "fvSchemes")
     if args:
-        OpenFOAMCase(str(job.path) + "/case", job).fvSchemes.set(args)
+        case = get_case(str(job.path) + "/case", job)
+        with case.edit() as session:
+            session.set(case.fvSchemes, args)
 
 
 @generate
@@ -502,7 +532,9 @@ def transportProperties(job: Job, args={}):
     args = get_args(job, args)
     copy_on_uses(args, job, "constant", "transportProperties")
     if args:
-        OpenFOAMCase(str(job.path) + "/case", job).transportProperties.set(args)
+        case = get_case(str(job.path) + "/case", job)
+        with case.edit() as session:
+            session.set(case.transportProperties, args)
 
 
 @generate
@@ -516,7 +548,9 @@ def turbulenceProperties(job: Job, args={}):
     args = get_args(job, args)
     copy_on_uses(args, job, "constant", "turbulenceProperties")
     if args:
-        OpenFOAMCase(str(job.path) + "/case", job).turbulenceProperties.set(args)
+        case = get_case(str(job.path) + "/case", job)
+        with case.edit() as session:
+            session.set(case.turbulenceProperties, args)
 
 
 @generate
@@ -528,7 +562,7 @@ def turbulenceProperties(job: Job, args={}):
 @OpenFOAMProject.operation
 def setKeyValuePair(job: Job, args={}):
     args = get_args(job, args)
-    OpenFOAMCase(str(job.path) + "/case", job).setKeyValuePair(args)
+    get_case(str(job.path) + "/case", job).setKeyValuePair(args)
 
 
 def has_mesh(job: Job) -> bool:
@@ -561,7 +595,7 @@ def decomposePar(job: Job, args={}):
     workspace_folder = Path(job.path) / "../"
     root, job_paths, _ = next(os.walk(workspace_folder))
 
-    target_case = OpenFOAMCase(str(job.path) + "/case", job)
+    target_case = get_case(str(job.path) + "/case", job)
     target_case.decomposePar(args)
 
 
@@ -611,7 +645,7 @@ def is_locked(job: Job) -> bool:
 def refineMesh(job: Job, args={}):
     args = get_args(job, args)
     for _ in range(args.get("value")):
-        OpenFOAMCase(str(job.path) + "/case", job).refineMesh(args)
+        get_case(str(job.path) + "/case", job).refineMesh(args)
 
 
 @OpenFOAMProject.pre(parent_job_is_ready)
@@ -629,7 +663,7 @@ def allClean(job: Job, args={}):
 @OpenFOAMProject.operation
 def checkMesh(job: Job, args={}):
     args = get_args(job, args)
-    log = OpenFOAMCase(str(job.path) + "/case", job).checkMesh(args)
+    log = get_case(str(job.path) + "/case", job).checkMesh(args)
 
     cells = (
         check_output(["grep", "cells:", Path(job.path) / "case" / log])
@@ -643,7 +677,7 @@ def get_number_of_procs(job: Job) -> int:
     """Deduces the number of processors
     For performance reasons the cache is used to store the number of subdomains
     """
-    np = statepoint_get(job.sp(), "numberOfSubdomains")
+    np = statepoint_get(resolved_statepoint(job), "numberOfSubdomains")
     if np:
         return int(np)
     np = job.doc["cache"].get("numberOfSubdomains", False)
@@ -652,7 +686,7 @@ def get_number_of_procs(job: Job) -> int:
     # Reading from numberOfSubdomains from the decomposeParDict should
     # be the last resort since it is very expensive
     np = int(
-        OpenFOAMCase(str(job.path) + "/case", job).decomposeParDict.get(
+        get_case(str(job.path) + "/case", job).decomposeParDict.get(
             "numberOfSubdomains"
         )
     )
@@ -675,7 +709,7 @@ def run_cmd_builder(job: Job, cmd_format: str, args: dict) -> str:
         logger.info(f"Skipping Job {job.id} since it is completed.")
         return "true"
 
-    case = OpenFOAMCase(str(job.path) + "/case", job)
+    case = get_case(str(job.path) + "/case", job)
 
     # if the case folder contains any modified files skip execution
     # if case.is_tree_modified():
@@ -686,40 +720,46 @@ def run_cmd_builder(job: Job, cmd_format: str, args: dict) -> str:
     solver = case.controlDict.get("application")
     timestamp = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
 
-    res = job.doc["history"]
-
-    cli_args = {
-        "solver": solver,
-        "path": job.path,
-        "timestamp": timestamp,
-        "np": get_number_of_procs(job),
-    }
-    cmd_str = cmd_format.format(**cli_args)
-    res.append({
-        "cmd": cmd_str,
-        "type": "shell",
-        "log": f"{solver}_{timestamp}.log",
-        "state": "started",
-        "timestamp": timestamp,
-        "user": os.environ.get("USER"),
-        "hostname": os.environ.get("HOST"),
-    })
-    job.doc["history"] = res
-
-    cli_args = {
-        "solver": solver,
-        "path": job.path,
-        "timestamp": timestamp,
-        "np": get_number_of_procs(job),
-    }
-    preflight = os.environ.get("OBR_PREFLIGHT")
-    if preflight:
-        preflight_cmd = f"{preflight} > {job.path}/case/preflight_{timestamp}.log && "
-        cmd_format = preflight_cmd + cmd_format
-
-    postflight_cmd = f" && echo $? > {job.path}/case/solverExitCode.log "
-
-    job.doc["state"]["global"] = "started"
+    # the history record, cached number of subdomains and job state are
+    # written to the job document at once
+    with buffered_doc(job):
+        cli_args = {
+            "solver": solver,
+            "path": job.path,
+            "timestamp": timestamp,
+            "np": get_number_of_procs(job),
+        }
+        cmd_str = cmd_format.format(**cli_args)
+        index_latest_log(job.doc, solver, f"{job.path}/case/{solver}_{timestamp}.log")
+        append_history(
+            job.doc,
+            {
+                "cmd": cmd_str,
+                "type": "shell",
+                "log": f"{solver}_{timestamp}.log",
+                "state": "started",
+                "timestamp": timestamp,
+                "user": os.environ.get("USER"),
+                "hostname": os.environ.get("HOST"),
+            },
+        )
+
+        cli_args = {
+            "solver": solver,
+            "path": job.path,
+            "timestamp": timestamp,
+            "np": get_number_of_procs(job),
+        }
+        preflight = os.environ.get("OBR_PREFLIGHT")
+        if preflight:
+            preflight_cmd = (
+                f"{preflight} > {job.path}/case/preflight_{timestamp}.log && "
+            )
+            cmd_format = preflight_cmd + cmd_format
+
+        postflight_cmd = f" && echo $? > {job.path}/case/solverExitCode.log "
+
+        job.doc["state"]["global"] = "started"
 
     # NOTE we add || true such that the command never fails
     # otherwise if one execution would fail OBR exits and
@@ -727,10 +767,22 @@ def run_cmd_builder(job: Job, cmd_format: str, args: dict) -> str:
     return cmd_format.format(**cli_args) + "|| true" + postflight_cmd
 
 
+FINISHED_STATES = ("completed", "failure")
+
+
 def validate_state_impl(_: str, job: Job) -> None:
     """Perform a detailed update of the job state"""
-    case = OpenFOAMCase(Path(job.path) / "case", job)
+    case = get_case(Path(job.path) / "case", job)
     case.detailed_update()
+    # compressing removes the plain log, a solver which is still running would
+    # keep writing to the removed file, hence only logs of finished runs are
+    # compressed
+    if (
+        log_compression()
+        and job.doc["state"].get("global") in FINISHED_STATES
+        and case.latest_solver_log_path
+    ):
+        compress_log(case.latest_solver_log_path)
 
 
 @OpenFOAMProject.pre(parent_job_is_ready)
@@ -739,7 +791,7 @@ def validate_state_impl(_: str, job: Job) -> None:
 @OpenFOAMProject.operation
 def resetCase(job: Job, args={}) -> None:
     """Dummy operation that calls resetCase"""
-    case = OpenFOAMCase(Path(job.path) / "case", job)
+    case = get_case(Path(job.path) / "case", job)
     case.reset_case()
 
 
@@ -750,7 +802,7 @@ def resetCase(job: Job, args={}) -> None:
 def validateState(job: Job, args={}) -> None:
     """Dummy operation which forwards to validate_state_impl. The reason for keeping this function
     is that it can be called from the cli to force a detailed update"""
-    validate_state_impl(job)
+    validate_state_impl("validateState", job)
 
 
 @simulate
@@ -1,4 +1,5 @@
 from obr.OpenFOAM.case import OpenFOAMCase
+from Owls.parser.FoamDict import FileParser
 from subprocess import check_output
 
 import os
@@ -162,3 +163,390 @@ def test_detailed_update(set_up_of_case):
     )
     assert of_case.finished == False
     assert of_case.job.doc["state"]["global"] == "failure"
+
+
+OF_HEADER = r"""/*--------------------------------*- C++ -*----------------------------------*\
+| =========                 |                                                 |
+| \\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox           |
+|  \\    /   O peration     | Version:  2306                                  |
+|   \\  /    A nd           | Website:  www.openfoam.com                      |
+|    \\/     M anipulation  |                                                 |
+\*---------------------------------------------------------------------------*/
+"""
+
+
+def foam_file(name: str) -> str:
+    """Returns the header and FoamFile dictionary of a dictionary file"""
+    return (
+        OF_HEADER
+        + "FoamFile\n{\n    version 2.0;\n    format ascii;\n    class"
+        f" dictionary;\n    object {name};\n}}\n"
+    )
+
+
+@pytest.fixture
+def minimal_case_job(tmpdir):
+    import signac
+
+    project = signac.init_project(path=str(tmpdir))
+    job = project.open_job({"solver": "icoFoam"}).init()
+    job.doc["cache"] = {}
+    case = Path(job.path) / "case"
+    for fn in [
+        "system/controlDict",
+        "system/fvSolution",
+        "system/fvSchemes",
+        "constant/transportProperties",
+    ]:
+        (case / fn).parent.mkdir(parents=True, exist_ok=True)
+        (case / fn).write_text(OF_HEADER + f"// {fn}\n")
+    return job
+
+
+def test_post_md5sum_only_hashes_touched_files(minimal_case_job, monkeypatch):
+    from obr.core import hashing
+    from obr.core.core import (
+        logged_execute,
+        record_touched,
+        take_touched_paths,
+        track_touched_paths,
+    )
+
+    job = minimal_case_job
+    case = OpenFOAMCase(str(job.path) + "/case", job)
+    case.perform_post_md5sum_calculations(set())
+    md5sums = job.doc["cache"]["md5sum"]()
+    assert set(md5sums) == {
+        "system/controlDict",
+        "system/fvSolution",
+        "system/fvSchemes",
+        "constant/transportProperties",
+    }
+
+    hashed = []
+    hash_file = hashing._hash_file
+
+    def count_hashes(path):
+        hashed.append(Path(path).name)
+        return hash_file(path)
+
+    monkeypatch.setattr(hashing, "_hash_file", count_hashes)
+    hashing.clear_hash_cache()
+
+    track_touched_paths(job.path)
+    controlDict = case.path / "system/controlDict"
+    controlDict.write_text(OF_HEADER + "application icoFoam;\n")
+    record_touched(controlDict)
+    (case.path / "system/fvSchemes").unlink()
+    record_touched(case.path / "system/fvSchemes")
+    case.perform_post_md5sum_calculations(take_touched_paths(job.path))
+    assert hashed == ["controlDict"]
+    assert (
+        job.doc["cache"]["md5sum"]["system/fvSolution"] == md5sums["system/fvSolution"]
+    )
+    assert job.doc["cache"]["md5sum"]["system/controlDict"][0] == hashing.md5sum(
+        controlDict
+    )
+    assert "system/fvSchemes" not in job.doc["cache"]["md5sum"]
+
+    # executed commands only touch the config files they changed
+    hashing.clear_hash_cache()
+    track_touched_paths(job.path)
+    logged_execute(["true"], case.path, job.doc)
+    case.perform_post_md5sum_calculations(take_touched_paths(job.path))
+    assert hashed == ["controlDict"]
+
+    fvSolution = case.path / "system/fvSolution"
+    track_touched_paths(job.path)
+    logged_execute(
+        ["python3", "-c", f"open('{fvSolution}', 'a').write('// PISO')"],
+        case.path,
+        job.doc,
+    )
+    case.perform_post_md5sum_calculations(take_touched_paths(job.path))
+    assert hashed == ["controlDict", "fvSolution"]
+    assert job.doc["cache"]["md5sum"]["system/fvSolution"][0] == hashing.md5sum(
+        fvSolution
+    )
+
+
+def test_case_registry(minimal_case_job, monkeypatch):
+    from obr.OpenFOAM.case import clear_case_registry, get_case
+
+    headers = []
+    has_header = OpenFOAMCase.has_openfoam_header
+
+    def count_headers(self, path):
+        headers.append(path)
+        return has_header(self, path)
+
+    monkeypatch.setattr(OpenFOAMCase, "has_openfoam_header", count_headers)
+    clear_case_registry()
+    job = minimal_case_job
+    path = Path(job.path) / "case"
+
+    # file handles and the file tree are only created on first access
+    case = get_case(path, job)
+    assert not headers
+    assert "controlDict" not in case.__dict__
+    assert not case.decomposeParDict
+    assert case.controlDict.path == path / "system/controlDict"
+    assert case.get("system/fvSolution")
+    assert len(headers) == 4
+
+    assert get_case(str(path), job) is case
+    (path / "system/decomposeParDict").write_text(OF_HEADER)
+    new_case = get_case(path, job)
+    assert new_case is not case
+    assert new_case.decomposeParDict
+
+
+def test_has_openfoam_header(tmpdir, monkeypatch):
+    import builtins
+    from obr.OpenFOAM.case import has_openfoam_header
+
+    path = Path(tmpdir) / "fvSolution"
+    path.write_text(OF_HEADER + "solvers {}\n" * 10000)
+    crlf = Path(tmpdir) / "fvSchemes"
+    crlf.write_bytes(OF_HEADER.replace("\n", "\r\n").encode())
+    binary = Path(tmpdir) / "points"
+    binary.write_bytes(b"\x00\xff" * 100000)
+    assert has_openfoam_header(path)
+    assert has_openfoam_header(crlf)
+    assert not has_openfoam_header(binary)
+    assert not has_openfoam_header(Path(tmpdir) / "missing")
+
+    # unchanged files are not read again
+    opened = []
+    builtin_open = builtins.open
+
+    def count_open(file, *args, **kwargs):
+        opened.append(file)
+        return builtin_open(file, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", count_open)
+    assert has_openfoam_header(path)
+    assert not has_openfoam_header(binary)
+    assert not opened
+
+    path.write_text("FoamFile {}\n")
+    assert not has_openfoam_header(path)
+    assert opened == [str(path)]
+
+
+@pytest.fixture
+def key_value_parser(monkeypatch):
+    """Replaces the OpenFOAM parser by a parser of `key value;` lines"""
+    from Owls.parser.FoamDict import FileParser
+
+    parsed = []
+
+    def update(self):
+        parsed.append(self.path)
+        self.content = dict(
+            line.rstrip(";").split()
+            for line in self.path.read_text().splitlines()
+            if line.endswith(";")
+        )
+
+    def get(self, name):
+        return self.content.get(name)
+
+    def set_key_value_pairs(self, dictionary):
+        self.content.update(dictionary)
+        self.path.write_text("".join(f"{k} {v};\n" for k, v in self.content.items()))
+
+    monkeypatch.setattr(FileParser, "update", update, raising=False)
+    monkeypatch.setattr(FileParser, "get", get, raising=False)
+    monkeypatch.setattr(
+        FileParser, "set_key_value_pairs", set_key_value_pairs, raising=False
+    )
+    return parsed
+
+
+def test_parse_cache(minimal_case_job, key_value_parser):
+    from obr.OpenFOAM.case import File, clear_parse_cache
+
+    parsed = key_value_parser
+    clear_parse_cache()
+
+    job = minimal_case_job
+    system = Path(job.path) / "case/system"
+    (system / "controlDict").write_text("application icoFoam;\nendTime 10;\n")
+    child = Path(job.path) / "child"
+    child.mkdir()
+    (child / "controlDict").symlink_to(system / "controlDict")
+
+    parent_file = File(folder=system, file="controlDict", job=None)
+    child_file = File(folder=child, file="controlDict", job=None)
+    assert parent_file.get("application") == "icoFoam"
+    assert parent_file.get("endTime") == 10
+    # decoded values are memoized per file version
+    parent_file.content["endTime"] = "5"
+    assert parent_file.get("endTime") == 10
+    # the symlinked file is not parsed again
+    assert child_file.get("endTime") == 10
+    assert len(parsed) == 1
+
+    # writes through one handle are visible to all handles
+    parent_file.set({"endTime": 20})
+    assert child_file.get("endTime") == 20
+    assert len(parsed) == 2
+
+
+def test_parse_cache_derives_parsed_state(minimal_case_job, monkeypatch):
+    from obr.OpenFOAM.case import File, clear_parse_cache
+
+    clear_parse_cache()
+    parsed = []
+
+    def init(self, **kwargs):
+        self.__dict__.update(kwargs)
+        self.entries = {}
+
+    def update(self):
+        # a parser which fills a container created in __init__ in place and
+        # stores further state under an attribute unknown to OBR
+        parsed.append(self.path)
+        text = self.path.read_text()
+        self.entries.update(line.rstrip(";").split() for line in text.splitlines())
+        self.renamed_tokens = text.split()
+
+    monkeypatch.setattr(FileParser, "__init__", init)
+    monkeypatch.setattr(FileParser, "update", update, raising=False)
+    system = Path(minimal_case_job.path) / "case/system"
+    (system / "controlDict").write_text("endTime 10;\n")
+    (system / "fvSolution").write_text("nNonOrthCorr 2;\n")
+    child = Path(minimal_case_job.path) / "child"
+    child.mkdir()
+    (child / "controlDict").symlink_to(system / "controlDict")
+
+    control_dict = File(folder=system, file="controlDict", job=None)
+    fv_solution = File(folder=system, file="fvSolution", job=None)
+    child_dict = File(folder=child, file="controlDict", job=None)
+    control_dict.update()
+    fv_solution.update()
+    child_dict.update()
+    assert len(parsed) == 2
+
+    assert fv_solution.entries == {"nNonOrthCorr": "2"}
+    assert child_dict.entries == {"endTime": "10"}
+    assert child_dict.renamed_tokens == ["endTime", "10;"]
+    # handles do not share mutable state or their own attributes
+    assert child_dict.entries is not control_dict.entries
+    assert child_dict.path == child / "controlDict"
+
+
+@pytest.mark.skipif(
+    not hasattr(FileParser, "set_key_value_pairs"),
+    reason="requires the Owls dictionary parser",
+)
+def test_parse_cache_with_owls_parser(minimal_case_job):
+    from obr.OpenFOAM.case import File, clear_parse_cache
+
+    clear_parse_cache()
+    system = Path(minimal_case_job.path) / "case/system"
+    (system / "controlDict").write_text(
+        foam_file("controlDict")
+        + "application icoFoam;\nstartTime 0;\nendTime 10;\ndeltaT 0.005;\n"
+    )
+    (system / "fvSolution").write_text(
+        foam_file("fvSolution")
+        + "PISO\n{\n    nCorrectors 2;\n    nNonOrthogonalCorrectors 0;\n}\n"
+    )
+    child = Path(minimal_case_job.path) / "child"
+    child.mkdir()
+    (child / "controlDict").symlink_to(system / "controlDict")
+
+    control_dict = File(folder=system, file="controlDict", job=None)
+    fv_solution = File(folder=system, file="fvSolution", job=None)
+    assert control_dict.get("endTime") == 10
+    assert fv_solution.get("PISO")["nCorrectors"] == 2
+
+    control_dict.set({"endTime": 20})
+    assert control_dict.get("endTime") == 20
+    assert control_dict.get("deltaT") == 0.005
+
+    # new handles are served from the cache and see the edited file
+    child_dict = File(folder=child, file="controlDict", job=None)
+    assert child_dict.get("endTime") == 20
+    assert child_dict.get("application") == "icoFoam"
+    assert (
+        File(folder=system, file="fvSolution", job=None).get("PISO")[
+            "nNonOrthogonalCorrectors"
+        ]
+        == 0
+    )
+
+
+def test_edit_session(minimal_case_job, key_value_parser):
+    from obr.core.history import job_history
+    from obr.core.hashing import md5sum
+    from obr.OpenFOAM.case import clear_parse_cache
+
+    clear_parse_cache()
+    job = minimal_case_job
+    job.doc["history"] = []
+    parent = Path(job.path) / "parent"
+    parent.mkdir()
+    (parent / "fvSolution").write_text("nNonOrthCorr 0;\n")
+    case = OpenFOAMCase(str(job.path) + "/case", job)
+    case.controlDict.path.write_text("application icoFoam;\nendTime 10;\n")
+    case.fvSolution.path.unlink()
+    case.fvSolution.path.symlink_to(parent / "fvSolution")
+
+    with case.edit() as session:
+        session.set(case.controlDict, {"endTime": 20})
+        session.set("system/fvSolution", {"nNonOrthCorr": 2})
+        session.set(case.controlDict, {"deltaT": 0.1})
+        assert case.controlDict.get("endTime") == 10
+    assert len(key_value_parser) == 3
+
+    assert case.controlDict.get("endTime") == 20
+    assert case.controlDict.get("deltaT") == 0.1
+    assert case.fvSolution.get("nNonOrthCorr") == 2
+    # the symlink is replaced and the parent file stays untouched
+    assert not case.fvSolution.path.is_symlink()
+    assert (parent / "fvSolution").read_text() == "nNonOrthCorr 0;\n"
+    assert not list(case.system_folder.glob(".*.tmp"))
+    assert case.controlDict.md5sum() == md5sum(case.controlDict.path)
+
+    history = job_history(job)
+    assert [r["cmd"] for r in history] == ["edit_dictionaries"]
+    assert "system/fvSolution" in history[0]["args"]
+
+    with pytest.raises(ValueError):
+        with case.edit() as session:
+            session.set(case.controlDict, {"endTime": 30})
+            raise ValueError
+    assert case.controlDict.get("endTime") == 20
+
+
+def test_operations_edit_through_session(minimal_case_job, key_value_parser):
+    from obr.core.history import job_history
+    from obr.OpenFOAM.case import clear_parse_cache
+
+    clear_parse_cache()
+    job = minimal_case_job
+    job.doc["history"] = []
+    parent = Path(job.path) / "parent"
+    parent.mkdir()
+    (parent / "controlDict").write_text("application icoFoam;\ndeltaT 0.2;\n")
+    case = OpenFOAMCase(str(job.path) + "/case", job)
+    case.controlDict.path.unlink()
+    case.controlDict.path.symlink_to(parent / "controlDict")
+
+    case.setKeyValuePair(
+        {"file": "system/controlDict", "endTime": 10, "writeInterval": 5}
+    )
+    assert case.controlDict.get("endTime") == 10
+    assert case.controlDict.get("writeInterval") == 5
+    assert not case.controlDict.path.is_symlink()
+    assert (parent / "controlDict").read_text() == "application icoFoam;\ndeltaT 0.2;\n"
+
+    executed = []
+    case._exec_operation = lambda args: executed.append(args)
+    case.refineMesh({})
+    assert case.controlDict.get("deltaT") == 0.1
+    assert executed == [["refineMesh", "-overwrite"]]
+    assert [r["cmd"] for r in job_history(job)] == ["edit_dictionaries"] * 2
@@ -7,6 +7,10 @@ from obr.core.core import (
     TemporaryFolder,
     link_folder_to_copy,
     DelinkFolder,
+    logged_execute,
+    buffered_doc,
+    concurrency_slot,
+    execute_shell,
 )
 from pathlib import Path
 from subprocess import check_output
@@ -152,3 +156,117 @@ def test_DelinkFolder(tmpdir):
 
     # outside the create_unlink_dir the bck folder should not exist anymore
     assert not (tmpdir / "test.bck").exists()
+
+
+def test_logged_execute_streams_output(tmpdir):
+    path = Path(tmpdir)
+    doc = {"history": []}
+    assert logged_execute(["echo", "short"], path, doc) is None
+    assert doc["history"][-1]["log"] == "short\n"
+    assert doc["history"][-1]["state"] == "success"
+
+    cmd = ["python3", "-c", "for i in range(10000): print(i)"]
+    log_path = logged_execute(cmd, path, doc)
+    record = doc["history"][-1]
+    assert log_path == path / record["log"]
+    assert log_path.read_text().splitlines() == [str(i) for i in range(10000)]
+    assert record["tail"].splitlines() == [str(i) for i in range(9990, 10000)]
+
+    logged_execute(["python3", "-c", "import sys; sys.exit(3)"], path, doc)
+    assert doc["history"][-1]["state"] == "failure"
+    logged_execute(["not_a_command_obr"], path, doc)
+    assert doc["history"][-1]["state"] == "failure"
+
+
+def test_buffered_doc_writes_once(tmpdir, monkeypatch):
+    import signac
+
+    project = signac.init_project(path=str(tmpdir))
+    job = project.open_job({"solver": "pisoFoam"}).init()
+    job.doc["state"] = {}
+
+    doc_type = type(job.doc)
+    save = doc_type._save_to_resource
+    writes = []
+
+    def count_writes(self):
+        writes.append(1)
+        save(self)
+
+    monkeypatch.setattr(doc_type, "_save_to_resource", count_writes)
+    with buffered_doc(job) as doc:
+        doc["state"]["global"] = "completed"
+        doc["state"]["latestTime"] = 1.0
+        with buffered_doc(job):
+            doc["cache"] = {"nCells": 10}
+        assert not writes
+    assert len(writes) == 1
+    assert job.doc() == {
+        "state": {"global": "completed", "latestTime": 1.0},
+        "cache": {"nCells": 10},
+    }
+
+    plain = {}
+    with buffered_doc(type("MockJob", (), {"doc": plain})) as doc:
+        doc["state"] = "ready"
+    assert plain == {"state": "ready"}
+
+
+@pytest.fixture
+def shell_job(tmpdir):
+    import signac
+
+    project = signac.init_project(path=str(tmpdir))
+    job = project.open_job({"solver": "pisoFoam"}).init()
+    job.doc["history"] = []
+    os.makedirs(Path(job.path) / "case")
+    return job
+
+
+def test_execute_shell_session(shell_job, monkeypatch):
+    from obr.core.history import job_history
+
+    monkeypatch.setenv("OBR_SHELL_SESSION", "1")
+    steps = [
+        "export OBR_TEST=session",
+        "cd system 2>/dev/null || mkdir system",
+        "echo $OBR_TEST \\",
+        "> out.txt",
+        "python3 -c 'for i in range(2000): print(i)'",
+        "false",
+        "if then",
+        "exit 4",
+        "pwd",
+    ]
+    assert execute_shell(steps, shell_job)
+    case = Path(shell_job.path) / "case"
+    assert (case / "out.txt").read_text() == "session\n"
+
+    history = job_history(shell_job)
+    assert [r["cmd"] for r in history] == [
+        "export",
+        "cd",
+        "echo",
+        "python3",
+        "false",
+        "if",
+        "exit",
+        "pwd",
+    ]
+    assert [r["state"] for r in history] == ["success"] * 4 + ["failure"] * 3 + [
+        "success"
+    ]
+    assert (case / history[3]["log"]).read_text().splitlines()[-1] == "1999"
+    # the step after exit runs in a fresh session
+    assert history[-1]["log"] == f"{case}\n"
+
+
+def test_concurrency_slot(tmpdir):
+    slot_dir = Path(tmpdir) / "slots"
+    with concurrency_slot(slot_dir, 0) as slot:
+        assert slot is None
+    with concurrency_slot(slot_dir, 2) as first:
+        with concurrency_slot(slot_dir, 2) as second:
+            assert {first, second} == {0, 1}
+    with concurrency_slot(slot_dir, 1) as slot:
+        assert slot == 0
@@ -0,0 +1,65 @@
+import os
+import hashlib
+
+from pathlib import Path
+
+from obr.core import hashing
+from obr.core.hashing import clear_hash_cache, invalidate_hash, md5sum, md5sums
+
+
+def test_md5sum_is_cached(tmpdir, monkeypatch):
+    clear_hash_cache()
+    path = Path(tmpdir) / "controlDict"
+    path.write_bytes(b"application pisoFoam;\n" * 100000)
+    expected = hashlib.md5(path.read_bytes()).hexdigest()
+
+    reads = []
+    hash_file = hashing._hash_file
+
+    def count_reads(path):
+        reads.append(path)
+        return hash_file(path)
+
+    monkeypatch.setattr(hashing, "_hash_file", count_reads)
+    assert md5sum(path) == expected
+    assert md5sum(str(path)) == expected
+    assert len(reads) == 1
+
+    path.write_bytes(b"application icoFoam;\n")
+    os.utime(path, ns=(0, 0))
+    assert md5sum(path) == hashlib.md5(b"application icoFoam;\n").hexdigest()
+    assert len(reads) == 2
+
+
+def test_same_size_rewrite_within_mtime_tick(tmpdir):
+    clear_hash_cache()
+    path = Path(tmpdir) / "controlDict"
+    path.write_bytes(b"endTime 10;\n")
+    st = path.stat()
+    assert md5sum(path) == hashlib.md5(b"endTime 10;\n").hexdigest()
+
+    # a rewrite with the same size and modification time keeps the signature
+    path.write_bytes(b"endTime 20;\n")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    expected = hashlib.md5(b"endTime 20;\n").hexdigest()
+    assert md5sum(path, refresh=True) == expected
+
+    path.write_bytes(b"endTime 30;\n")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    invalidate_hash(path)
+    assert md5sum(path) == hashlib.md5(b"endTime 30;\n").hexdigest()
+
+
+def test_md5sums(tmpdir):
+    clear_hash_cache()
+    paths = []
+    for i in range(20):
+        path = Path(tmpdir) / f"file{i}"
+        path.write_text(f"content {i}\n")
+        paths.append(path)
+    missing = Path(tmpdir) / "missing"
+
+    digests = md5sums(paths + [missing], workers=4)
+    assert missing not in digests
+    assert digests == {path: md5sum(path) for path in paths}
+    assert digests == md5sums(paths, workers=1)
@@ -0,0 +1,100 @@
+import os
+import signac
+import pytest
+
+from pathlib import Path
+
+from obr.core.core import buffered_doc, logged_func, merge_job_documents
+from obr.core.history import (
+    HISTORY_JOURNAL,
+    append_history,
+    compact_history,
+    job_history,
+)
+from obr.core.queries import flatten_jobs, scan_jobs
+
+
+@pytest.fixture
+def job(tmpdir):
+    project = signac.init_project(path=str(tmpdir))
+    job = project.open_job({"solver": "pisoFoam"})
+    job.init()
+    job.doc["history"] = [{"cmd": "blockMesh", "state": "success"}]
+    return job
+
+
+def test_records_are_appended_to_journal(job):
+    append_history(job.doc, {"cmd": "decomposePar", "state": "success"})
+    assert job.doc["history"] == [{"cmd": "blockMesh", "state": "success"}]
+    assert (Path(job.path) / HISTORY_JOURNAL).exists()
+    assert [r["cmd"] for r in job_history(job)] == ["blockMesh", "decomposePar"]
+
+    def dummy():
+        pass
+
+    logged_func(dummy, job.doc)
+    assert [r["cmd"] for r in job_history(job)][-1] == "dummy"
+
+
+def test_journal_is_compacted(job, monkeypatch):
+    monkeypatch.setenv("OBR_HISTORY_COMPACT", "2")
+    for i in range(3):
+        append_history(job.doc, {"cmd": f"cmd{i}", "padding": "x" * 64})
+    assert len(job.doc["history"]) == 4
+    assert not (Path(job.path) / HISTORY_JOURNAL).exists()
+
+    append_history(job.doc, {"cmd": "cmd3"})
+    assert compact_history(job.doc) == 1
+    assert [r["cmd"] for r in job.doc["history"]] == [
+        "blockMesh",
+        "cmd0",
+        "cmd1",
+        "cmd2",
+        "cmd3",
+    ]
+
+    monkeypatch.setenv("OBR_HISTORY_COMPACT", "0")
+    append_history(job.doc, {"cmd": "cmd4"})
+    assert job.doc["history"][-1] == {"cmd": "cmd4"}
+
+
+def test_journal_is_visible_to_queries(job):
+    append_history(job.doc, {"cmd": "decomposePar", "state": "success"})
+    # skip incomplete records of interrupted writes
+    with open(Path(job.path) / HISTORY_JOURNAL, "a") as fh:
+        fh.write('{"cmd": "simpleF')
+    docs = flatten_jobs([job])
+    assert [r["cmd"] for r in docs[job.id]["history"]] == ["blockMesh", "decomposePar"]
+    assert docs == scan_jobs([job])
+
+
+def test_merge_job_documents_keeps_journal(job):
+    sub_doc = Path(job.path) / "signac_job_document_abc.json"
+    sub_doc.write_text(
+        '{"data": [], "history": [{"cmd": "icoFoam"}], "cache": {"np": 1}}'
+    )
+    append_history(job.doc, {"cmd": "decomposePar"})
+    merge_job_documents(job)
+    assert [r["cmd"] for r in job_history(job)] == [
+        "blockMesh",
+        "icoFoam",
+        "decomposePar",
+    ]
+    assert not os.path.exists(Path(job.path) / HISTORY_JOURNAL)
+
+
+def test_compaction_is_deferred_while_buffered(job, monkeypatch):
+    monkeypatch.setenv("OBR_HISTORY_COMPACT", "2")
+    with buffered_doc(job):
+        for i in range(3):
+            append_history(job.doc, {"cmd": f"cmd{i}", "padding": "x" * 64})
+        # the journal must outlive the unflushed buffer
+        assert (Path(job.path) / HISTORY_JOURNAL).exists()
+        assert len(job.doc["history"]) == 1
+    assert not (Path(job.path) / HISTORY_JOURNAL).exists()
+    assert [r["cmd"] for r in job.doc["history"]] == [
+        "blockMesh",
+        "cmd0",
+        "cmd1",
+        "cmd2",
+    ]
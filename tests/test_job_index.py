@@ -0,0 +1,213 @@
+import os
+import signac
+import pytest
+
+from pathlib import Path
+
+from obr.core.job_index import JobIndex, parallel_map
+from obr.core.queries import (
+    flatten_jobs,
+    scan_jobs,
+    filter_jobs,
+    iter_query,
+    load_jobs,
+    build_filter_query,
+    split_filter_queries,
+    Query,
+    resolve_statepoint,
+    resolved_statepoint,
+)
+
+
+@pytest.fixture
+def project(tmpdir):
+    project = signac.init_project(path=str(tmpdir))
+    for i in range(3):
+        job = project.open_job({
+            "solver": "pisoFoam",
+            "nCells": i * 1000,
+            "parent": {"solver": "icoFoam"},
+        })
+        job.init()
+        job.doc["state"] = {"global": "ready"}
+        job.doc["history"] = [{"cmd": "blockMesh", "state": "success"}]
+    return project
+
+
+def test_index_matches_scan(project):
+    assert flatten_jobs(project) == scan_jobs(project)
+    assert (Path(project.path) / ".obr/job_index.sqlite").exists()
+
+
+def test_index_refreshes_changed_jobs(project):
+    index = JobIndex(Path(project.path) / ".obr/job_index.sqlite")
+    index.refresh(project)
+
+    job = project.open_job({
+        "solver": "pisoFoam",
+        "nCells": 1000,
+        "parent": {"solver": "icoFoam"},
+    })
+    job.doc["state"] = {"global": "completed"}
+    index.refresh(project)
+    assert index.doc(job.id)["state"] == {"global": "completed"}
+
+    new_job = project.open_job({"solver": "icoFoam", "nCells": 0})
+    new_job.init()
+    assert new_job.id in index.refresh(project)
+    assert index.doc(new_job.id)["solver"] == "icoFoam"
+
+    job.remove()
+    index.refresh(project)
+    assert index.doc(job.id) == {}
+
+
+def test_index_can_be_disabled(project, monkeypatch):
+    monkeypatch.setenv("OBR_NO_JOB_INDEX", "1")
+    assert JobIndex.for_jobs(project) is None
+    assert flatten_jobs(project) == scan_jobs(project)
+
+
+def test_index_key_paths(project):
+    index = JobIndex(Path(project.path) / ".obr/job_index.sqlite")
+    index.refresh(project)
+    assert index.key_paths(["solver", "cmd", "missing"]) == {
+        "solver": ["parent.solver", "solver"],
+        "cmd": ["history.cmd"],
+        "missing": [],
+    }
+
+    for job in project:
+        job.remove()
+    index.refresh(project)
+    assert index.key_paths(["solver"]) == {"solver": []}
+
+
+def test_filter_by_key_path(project):
+    assert len(filter_jobs(project, ["parent.solver==icoFoam"])) == 3
+    assert len(filter_jobs(project, ["solver==icoFoam"])) == 3
+    assert len(filter_jobs(project, ["solver==icoFoam", "nCells>=1000"])) == 2
+    assert len(filter_jobs(project, ["parent.solver==pisoFoam"])) == 0
+
+
+def test_resolved_statepoint_is_cached(project):
+    job = next(iter(project))
+    assert resolved_statepoint(job)["solver"] == ("pisoFoam", 0)
+
+    index = JobIndex(Path(project.path) / ".obr/job_index.sqlite")
+    stored = index.resolved_statepoint(job.id, job.path, resolve_statepoint)
+    assert stored["solver"] == ["pisoFoam", 0]
+
+    # a changed statepoint invalidates the stored view
+    job.update_statepoint({"nCells": 42}, overwrite=True)
+    assert resolved_statepoint(job)["nCells"] == (42, 0)
+
+
+def test_iter_query_is_lazy(project):
+    results = iter_query(project, [Query(key="nCells")])
+    first = next(results)
+    assert first.result[0]["nCells"] in (0, 1000, 2000)
+    assert len(list(results)) == 2
+
+
+def test_index_loads_queried_columns(project):
+    docs, key_paths = load_jobs(project, [Query(key="global")])
+    assert key_paths == {"global": ["state.global"]}
+    assert all(doc == {"state": {"global": "ready"}} for doc in docs.values())
+
+    docs, _ = load_jobs(project, [Query(key="parent.solver"), Query(key="missing")])
+    assert all(list(doc) == ["parent"] for doc in docs.values())
+
+
+def test_statepoint_filters_are_pushed_down(project, monkeypatch):
+    index = JobIndex(Path(project.path) / ".obr/job_index.sqlite")
+    index.refresh(project)
+    queries = build_filter_query(["nCells>=1000", "parent.solver==icoFoam", "global"])
+    sp_filter, remaining = split_filter_queries(
+        queries, index.path_kinds(["nCells", "solver", "global"])
+    )
+    assert sp_filter == {
+        "$and": [{"nCells": {"$gte": 1000.0}}, {"parent.solver": {"$eq": "icoFoam"}}]
+    }
+    assert [q.key for q in remaining] == ["global"]
+
+    # keys of the job document are not pushed down
+    sp_filter, remaining = split_filter_queries(
+        build_filter_query(["global==ready"]), index.path_kinds(["global"])
+    )
+    assert sp_filter is None and len(remaining) == 1
+
+    find_jobs = project.find_jobs
+    filters = []
+
+    def record_find_jobs(filter=None):
+        filters.append(filter)
+        return find_jobs(filter)
+
+    monkeypatch.setattr(project, "find_jobs", record_find_jobs)
+    jobs = filter_jobs(project, ["nCells>=1000", "global==ready"])
+    assert sorted(job.sp.nCells for job in jobs) == [1000, 2000]
+    assert filters == [{"nCells": {"$gte": 1000.0}}]
+
+
+def test_set_and_range_filters_are_pushed_down(project):
+    index = JobIndex(Path(project.path) / ".obr/job_index.sqlite")
+    index.refresh(project)
+    queries = build_filter_query(["nCells in {0,2000}|solver==foo", "0<nCells<=1000"])
+    sp_filter, remaining = split_filter_queries(
+        queries, index.path_kinds(["nCells", "solver"])
+    )
+    assert sp_filter == {
+        "$and": [
+            {
+                "$or": [
+                    {"nCells": {"$in": [0.0, 2000.0]}},
+                    {
+                        "$or": [
+                            {"parent.solver": {"$eq": "foo"}},
+                            {"solver": {"$eq": "foo"}},
+                        ]
+                    },
+                ]
+            },
+            {"nCells": {"$gt": 0.0, "$lte": 1000.0}},
+        ]
+    }
+    assert remaining == []
+    assert len(filter_jobs(project, ["nCells in {0,2000}", "0<=nCells<=1000"])) == 1
+
+
+def test_parallel_map_bounds_in_flight_chunks(monkeypatch):
+    monkeypatch.setenv("OBR_LOAD_WORKERS", "2")
+    consumed = []
+
+    def items():
+        for i in range(1000):
+            consumed.append(i)
+            yield i
+
+    results = parallel_map(lambda i: 2 * i, items(), chunk_size=10)
+    assert next(results) == 0
+    # two chunks per worker plus the chunk submitted after the first result
+    assert len(consumed) <= 5 * 10
+    assert list(results) == [2 * i for i in range(1, 1000)]
+
+
+def test_refresh_commits_chunks(project):
+    path = Path(project.path) / ".obr/job_index.sqlite"
+    index = JobIndex(path)
+    chunks = index.iter_refresh(project, chunk_size=2)
+    first = next(chunks)
+    assert len(first) == 2
+
+    # the first chunk is visible to other connections before the refresh ends
+    other = JobIndex(path)
+    assert all(other.doc(job_id)["solver"] == "pisoFoam" for job_id in first)
+    assert len(next(chunks)) == 1
+    assert next(chunks, None) is None
+
+
+def test_parallel_map_over_project(project, monkeypatch):
+    monkeypatch.setenv("OBR_LOAD_WORKERS", "2")
+    ids = list(parallel_map(lambda job: job.id, project, chunk_size=1))
+    assert sorted(ids) == sorted(job.id for job in project)
@@ -0,0 +1,38 @@
+import pytest
+
+from obr.OpenFOAM.literals import decode_literal, decode_value
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("10", 10),
+        ("-3", -3),
+        ("0.1", 0.1),
+        ("1e-05", 1e-05),
+        ("2.", 2.0),
+        ("-.5E+3", -500.0),
+        ("pisoFoam", "pisoFoam"),
+        ("true", "true"),
+        ("(1 0 0)", (1, 0, 0)),
+        ("( 1e-3 -2 word )", (1e-3, -2, "word")),
+        ("((0 1) (2 3))", ((0, 1), (2, 3))),
+        ("()", ()),
+        ("uniform (0 0 0)", "uniform (0 0 0)"),
+        ("(1 2", "(1 2"),
+        ("(1 2) 3", "(1 2) 3"),
+        ("1) 2", "1) 2"),
+        ("__import__('os').getcwd()", "__import__('os').getcwd()"),
+        ("", ""),
+    ],
+)
+def test_decode_literal(value, expected):
+    decoded = decode_literal(value)
+    assert decoded == expected
+    assert type(decoded) is type(expected)
+
+
+def test_decode_value_keeps_non_strings():
+    value = {"solver": "PCG"}
+    assert decode_value(value) is value
+    assert decode_value(None) is None
@@ -0,0 +1,131 @@
+import os
+import pytest
+
+from pathlib import Path
+
+from obr.core.core import logged_execute
+from obr.core.logs import (
+    clear_superseded_pending_log,
+    compress_log,
+    existing_log,
+    index_latest_log,
+    indexed_latest_log,
+    is_log_file,
+    open_log,
+    plain_log,
+    plain_log_name,
+)
+
+
+@pytest.fixture
+def log(tmpdir):
+    path = Path(tmpdir) / "pisoFoam_2024-01-01_00:00:00.log"
+    path.write_text("Time = 1\nExecutionTime = 0.1 s\nEnd\n")
+    return path
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_compressed_logs_are_read_transparently(log, codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    content = log.read_text()
+    compressed = compress_log(log, codec)
+    assert not log.exists()
+    assert is_log_file(compressed)
+    assert plain_log_name(compressed) == str(log)
+    assert existing_log(log) == compressed
+    with open_log(compressed) as fh:
+        assert fh.read() == content
+
+    plain = plain_log(compressed)
+    assert plain.read_text() == content
+    plain.unlink()
+
+
+def test_logs_stay_plain_by_default(log):
+    assert compress_log(log) == log
+    assert existing_log(log) == log
+    assert existing_log(log.with_name("missing.log")) is None
+
+
+def test_logged_execute_compresses_logs(tmpdir, monkeypatch):
+    monkeypatch.setenv("OBR_LOG_COMPRESSION", "gzip")
+    doc = {"history": []}
+    cmd = ["python3", "-c", "for i in range(1000): print(i)"]
+    log_path = logged_execute(cmd, Path(tmpdir), doc)
+    assert log_path.name.endswith(".log.gz")
+    assert doc["history"][-1]["log"] == log_path.name
+    with open_log(log_path) as fh:
+        assert len(fh.readlines()) == 1000
+
+
+def test_latest_log_index(log):
+    doc = {}
+    assert indexed_latest_log(doc) is None
+    index_latest_log(doc, "pisoFoam", log)
+    entry = doc["cache"]["latest_log"]
+    assert entry["size"] == log.stat().st_size
+    assert indexed_latest_log(doc, "pisoFoam") == log
+    assert indexed_latest_log(doc, "icoFoam") is None
+
+    compressed = compress_log(log, "gzip")
+    assert indexed_latest_log(doc, "pisoFoam") == compressed
+    compressed.unlink()
+    # a missing log requires a scan of the case folder
+    assert indexed_latest_log(doc, "pisoFoam") is None
+
+
+def test_pending_log_is_not_replaced_by_older_log(log):
+    doc = {}
+    pending = log.with_name("pisoFoam_2024-01-02_00:00:00.log")
+    index_latest_log(doc, "pisoFoam", pending)
+    # the solver did not create the log yet, callers fall back to scanning
+    assert indexed_latest_log(doc, "pisoFoam") is None
+    index_latest_log(doc, "pisoFoam", log)
+    assert doc["cache"]["latest_log"]["file"] == str(pending)
+
+    pending.write_text("Time = 1\n")
+    assert indexed_latest_log(doc, "pisoFoam") == pending
+    # other solvers and newer logs replace the entry
+    index_latest_log(doc, "icoFoam", log)
+    assert indexed_latest_log(doc, "icoFoam") == log
+
+
+def test_stale_indexed_log_is_not_trusted(log):
+    doc = {}
+    index_latest_log(doc, "pisoFoam", log)
+    assert indexed_latest_log(doc, "pisoFoam") == log
+
+    # a growing log of a running solver stays valid
+    with open(log, "a") as fh:
+        fh.write("Time = 2\n")
+    assert indexed_latest_log(doc, "pisoFoam") == log
+
+    index_latest_log(doc, "pisoFoam", log)
+    log.write_text("Time = 1\n")
+    assert indexed_latest_log(doc, "pisoFoam") is None
+
+    index_latest_log(doc, "pisoFoam", log)
+    st = log.stat()
+    os.utime(log, ns=(st.st_atime_ns, st.st_mtime_ns - 10**9))
+    assert indexed_latest_log(doc, "pisoFoam") is None
+
+
+def test_superseded_pending_log_is_cleared(log):
+    doc = {}
+    pending = log.with_name("pisoFoam_2024-01-02_00:00:00.log")
+    index_latest_log(doc, "pisoFoam", pending)
+    history = [
+        {"cmd": "pisoFoam", "log": log.name},
+        {"cmd": "pisoFoam", "log": pending.name},
+    ]
+    # the run was just launched
+    assert not clear_superseded_pending_log(doc, history)
+    assert doc["cache"]["latest_log"]["file"] == str(pending)
+
+    # the run ended without writing its log
+    history.append({"cmd": "validateState"})
+    assert clear_superseded_pending_log(doc, history)
+    index_latest_log(doc, "pisoFoam", log)
+    assert indexed_latest_log(doc, "pisoFoam") == log
+    assert not clear_superseded_pending_log(doc, history)
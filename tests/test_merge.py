@@ -0,0 +1,98 @@
+import json
+import signac
+import pytest
+
+from pathlib import Path
+from click.testing import CliRunner
+
+from obr.cli import cli
+from obr.core.history import append_history, job_history
+from obr.core.merge import merge_documents, merge_jobs, merge_job_path
+
+
+def write_fragment(job, name, document):
+    with open(Path(job.path) / f"signac_job_document_{name}.json", "w") as fh:
+        json.dump(document, fh)
+
+
+@pytest.fixture
+def project(tmpdir):
+    project = signac.init_project(path=str(tmpdir))
+    for i in range(3):
+        job = project.open_job({"nCells": i}).init()
+        job.doc["state"] = {"global": "completed"}
+        write_fragment(
+            job,
+            "b",
+            {
+                "data": [{"nCells": i}],
+                "history": [
+                    {"cmd": "icoFoam", "timestamp": "2024-01-02_10:00:00"},
+                    {"cmd": "blockMesh", "timestamp": "2024-01-01 10:00:00.000001"},
+                ],
+                "cache": {"np": 2, "md5sum": {"controlDict": ["b", 1]}},
+            },
+        )
+        write_fragment(
+            job,
+            "a",
+            {
+                "data": [{"nCells": i}],
+                "history": [{"cmd": "blockMesh", "timestamp": "2024-01-01_10:00:00"}],
+                "cache": {"np": 1, "nCells": i, "md5sum": {"fvSolution": ["a", 1]}},
+            },
+        )
+    return project
+
+
+def test_merge_documents():
+    merged = merge_documents([
+        ("b", {"history": [{"t": 2, "timestamp": "2024-01-02_00:00:00"}]}),
+        ("a", {"history": [{"t": 1, "timestamp": "2024-01-01_00:00:00"}]}),
+        ("c", {"history": [{"t": 1, "timestamp": "2024-01-01_00:00:00"}]}),
+    ])
+    assert merged["history"] == [
+        {"t": 1, "timestamp": "2024-01-01_00:00:00"},
+        {"t": 2, "timestamp": "2024-01-02_00:00:00"},
+    ]
+
+
+def test_merge_jobs(project):
+    job = next(iter(project))
+    append_history(
+        job.doc, {"cmd": "validateState", "timestamp": "2024-01-03_00:00:00"}
+    )
+    paths = sorted(job.path for job in project)
+    assert sorted(merge_jobs(paths, processes=2)) == paths
+
+    assert job.doc["state"] == {"global": "completed"}
+    assert job.doc["data"] == [{"nCells": job.sp.nCells}]
+    assert [r["cmd"] for r in job_history(job)] == [
+        "blockMesh",
+        "blockMesh",
+        "icoFoam",
+        "validateState",
+    ]
+    # the fragment with the latest history record wins
+    assert job.doc["cache"]() == {
+        "np": 2,
+        "nCells": job.sp.nCells,
+        "md5sum": {"controlDict": ["b", 1], "fvSolution": ["a", 1]},
+    }
+
+    # merging is idempotent and unchanged jobs are skipped
+    merged = job.doc()
+    assert merge_jobs(paths, processes=1) == []
+    assert merge_job_path(job.path, force=True)
+    assert job.doc() == merged
+
+    write_fragment(job, "c", {"data": [{"nCells": -1}], "history": [], "cache": {}})
+    assert merge_jobs(paths) == [job.path]
+    assert job.doc["data"][-1] == {"nCells": -1}
+
+
+def test_merge_cli(project):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["merge", "--workspace", project.workspace, "-j", "1"])
+    assert result.exit_code == 0
+    assert all(len(job.doc["history"]) == 3 for job in project)
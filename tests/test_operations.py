@@ -23,3 +23,37 @@ def test_link_path(tmpdir):
 
     dst_fold = dst / "fold1"
     assert dst_fold.exists() == True
+
+
+def test_validate_state_keeps_running_logs_plain(tmpdir, monkeypatch):
+    import signac
+
+    from obr.signac_wrapper import operations
+
+    monkeypatch.setenv("OBR_LOG_COMPRESSION", "gzip")
+    project = signac.init_project(path=str(tmpdir))
+    job = project.open_job({"solver": "icoFoam"}).init()
+    job.doc["state"] = {"global": "started"}
+    log = Path(job.path) / "icoFoam_2024-01-01_00:00:00.log"
+
+    class RunningCase:
+        latest_solver_log_path = log
+
+        def detailed_update(self):
+            job.doc["state"]["global"] = "incomplete"
+
+    monkeypatch.setattr(operations, "get_case", lambda path, job: RunningCase())
+    with open(log, "w") as solver:
+        solver.write("Time = 1\n")
+        solver.flush()
+        operations.validate_state_impl("runParallelSolver", job)
+        assert log.exists()
+        solver.write("Time = 2\nEnd\n")
+    assert log.read_text() == "Time = 1\nTime = 2\nEnd\n"
+
+    RunningCase.detailed_update = lambda self: job.doc["state"].update(
+        {"global": "completed"}
+    )
+    operations.validate_state_impl("runParallelSolver", job)
+    assert not log.exists()
+    assert Path(str(log) + ".gz").exists()
@@ -5,7 +5,13 @@ from obr.core.queries import (
     query_flat_jobs,
     query_to_dataframe,
     filter_jobs,
+    compile_queries,
+    build_filter_query,
+    FilterFrame,
     Query,
+    resolve_statepoint,
+    statepoint_get,
+    statepoint_query,
 )
 from obr.signac_wrapper.operations import OpenFOAMProject
 from obr.create_tree import create_tree
@@ -107,6 +113,118 @@ def test_nested_results_with_lists(mock_job_dict):
     assert executed_query.sub_keys == [34567, "obr", "postProcessing", "machine_name"]
 
 
+def test_compiled_plan(mock_job_dict):
+    queries = input_to_queries("{key:'preconditioner', value:'IC'}, {key:'time'}")
+    plan = compile_queries(queries)
+
+    assert plan.evaluate(12345, mock_job_dict[12345]).result == [
+        {"preconditioner": "IC"}
+    ]
+    # time is not required since no value is requested
+    assert plan.evaluate(23456, mock_job_dict[23456]).sub_keys == [["obr"]]
+    # preconditioner is required
+    assert plan.evaluate(34567, mock_job_dict[34567]) is None
+
+    # numeric values are compared as floats
+    plan = compile_queries([Query(key="time", value="2", predicate="gt")])
+    assert plan.evaluate(34567, mock_job_dict[34567]).result == [{"time": 3.0}]
+    plan = compile_queries([Query(key="time", value="2", predicate="gt")], False)
+    assert plan.evaluate(34567, mock_job_dict[34567]) is None
+
+
+def test_filter_frame():
+    docs = {
+        "a": {"solver": "pisoFoam", "parent": {"nCells": 1000}},
+        "b": {"solver": "icoFoam", "parent": {"nCells": 4000}},
+        "c": {"solver": "pisoFoam", "nCells": [8000, 2000]},
+    }
+    for filters, expected in [
+        (["solver==pisoFoam"], ["a", "c"]),
+        (["nCells>1500"], ["b", "c"]),
+        (["solver==pisoFoam", "nCells>=1000", "nCells<2500"], ["a", "c"]),
+        (["solver!=pisoFoam"], ["b"]),
+    ]:
+        queries = build_filter_query(filters)
+        plan = compile_queries(queries)
+        frame = FilterFrame(docs, plan)
+        assert frame.select(plan) == expected
+        row_wise = query_flat_jobs(docs, queries, False, True, False)
+        assert [r.id for r in row_wise] == expected
+
+
+def test_dotted_key_paths():
+    docs = {
+        "a": {"solver": "icoFoam", "parent": {"solver": "pisoFoam"}},
+        "b": {"solver": "pisoFoam", "state": {"latestTime": 0.5}},
+    }
+    res = query_flat_jobs(docs, [Query(key="parent.solver")], False, True, True)
+    assert [(r.id, r.result) for r in res] == [("a", [{"parent.solver": "pisoFoam"}])]
+
+    queries = build_filter_query(["state.latestTime>=0.5"])
+    res = query_flat_jobs(docs, queries, False, True, False)
+    assert [(r.id, r.result) for r in res] == [("b", [{"state.latestTime": 0.5}])]
+
+    # known paths of the key resolve it without searching the tree
+    key_paths = {"solver": ["parent.solver", "solver"]}
+    plan = compile_queries(
+        build_filter_query(["solver==pisoFoam"]), True, False, key_paths
+    )
+    assert [job_id for job_id, doc in docs.items() if plan.evaluate(job_id, doc)] == [
+        "a",
+        "b",
+    ]
+    assert FilterFrame(docs, plan).select(plan) == ["a", "b"]
+
+
+def test_set_range_and_or_filters():
+    docs = {
+        str(np): {"numberOfSubdomains": np, "solver": solver, "nCells": 10**np}
+        for np, solver in [(1, "icoFoam"), (2, "pisoFoam"), (4, "pisoFoam"), (8, "x")]
+    }
+
+    def select(filters):
+        plan = compile_queries(build_filter_query(filters))
+        evaluated = [
+            job_id for job_id, doc in docs.items() if plan.evaluate(job_id, doc)
+        ]
+        assert FilterFrame(docs, plan).select(plan) == evaluated
+        return evaluated
+
+    assert select(["numberOfSubdomains in {4,8,16,32}"]) == ["4", "8"]
+    assert select(["solver not in icoFoam, pisoFoam"]) == ["8"]
+    assert select(["1e2<=nCells<1e8"]) == ["2", "4"]
+    assert select(["1e2<nCells<=1e8"]) == ["4", "8"]
+    assert select(["solver==icoFoam|nCells>1e5"]) == ["1", "8"]
+    assert select(["solver in pisoFoam,x", "numberOfSubdomains<4|nCells>1e5"]) == [
+        "2",
+        "8",
+    ]
+
+    query = build_filter_query(["1<numberOfSubdomains<4"])[0]
+    assert (query.key, query.predicate) == ("numberOfSubdomains", "range")
+    assert [(q.predicate, q.value) for q in query.value] == [("gt", "1"), ("lt", "4")]
+
+
+def test_resolve_statepoint():
+    statepoint = {
+        "solver": "pisoFoam",
+        "numberOfSubdomains": 0,
+        "parent": {"numberOfSubdomains": 4, "parent": {"solver": "icoFoam"}},
+    }
+    resolved = resolve_statepoint(statepoint)
+    assert resolved["solver"] == ("pisoFoam", 0)
+    assert resolved["numberOfSubdomains"] == (4, 1)
+    assert statepoint_get(resolved, "numberOfSubdomains") == 4
+    assert statepoint_get(statepoint, "numberOfSubdomains") == 4
+    assert statepoint_get(resolved, "nCells") is False
+    assert statepoint_query(resolved, "solver", "pisoFoam")
+    assert not statepoint_query(statepoint, "solver", "icoFoam")
+
+    # a known parent view is reused instead of walking the parents again
+    parent = resolve_statepoint(statepoint["parent"])
+    assert resolve_statepoint(statepoint, parent) == resolved
+
+
 @pytest.fixture()
 def get_project(tmpdir):
     config = {
@@ -0,0 +1,63 @@
+import signac
+
+from pathlib import Path
+from click.testing import CliRunner
+
+from obr.cli import cli
+from obr.core.core import logged_execute, logged_func
+from obr.core.resources import aggregate_resources
+
+
+def test_history_records_resources(tmpdir):
+    doc = {"history": []}
+    cmd = ["python3", "-c", "import time; x = bytearray(50 * 2**20); time.sleep(0.1)"]
+    logged_execute(cmd, Path(tmpdir), doc)
+    resources = doc["history"][-1]["resources"]
+    assert resources["wall_time"] >= 0.1
+    assert resources["user_time"] + resources["system_time"] > 0
+    # max rss in KiB
+    assert resources["max_rss"] > 50 * 1024
+    assert resources["max_rss"] >= resources["max_rss_floor"] > 0
+
+    def busy():
+        sum(range(10**5))
+
+    logged_func(busy, doc)
+    resources = doc["history"][-1]["resources"]
+    assert set(resources) == {"wall_time", "user_time", "system_time", "max_rss"}
+
+
+def test_aggregate_resources():
+    record = {"resources": {"wall_time": 2.0, "user_time": 1.0, "max_rss": 10}}
+    stats = aggregate_resources([
+        ("a", [{"cmd": "blockMesh", **record}, {"cmd": "./All_dot_run", **record}]),
+        ("b", [{"cmd": "blockMesh", **record}, {"cmd": "icoFoam"}]),
+    ])
+    assert [s.cmd for s in stats] == ["blockMesh", "All.run"]
+    assert stats[0].calls == 2 and stats[0].jobs == {"a", "b"}
+    assert stats[0].wall_time == 4.0 and stats[0].cpu_time == 2.0
+    assert not stats[0].max_rss_bounded
+
+    # the peak memory of short commands is hidden by the memory shared with OBR
+    echo = {"cmd": "echo", "resources": {"max_rss": 40000, "max_rss_floor": 40000}}
+    solver = {"cmd": "echo", "resources": {"max_rss": 30000, "max_rss_floor": 20000}}
+    (stats,) = aggregate_resources([("a", [solver, echo])])
+    assert stats.max_rss == 40000 and stats.max_rss_bounded
+    (stats,) = aggregate_resources(
+        [("a", [echo, {**echo, "resources": {"max_rss": 40000}}])]
+    )
+    assert not stats.max_rss_bounded
+
+
+def test_stats_cli(tmpdir, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    project = signac.init_project(path=str(tmpdir))
+    job = project.open_job({"solver": "pisoFoam"}).init()
+    job.doc["state"] = {}
+    job.doc["history"] = []
+    logged_execute(["echo", "blockMesh"], Path(job.path), job.doc)
+
+    result = CliRunner().invoke(cli, ["stats", "-f", str(tmpdir)])
+    assert result.exit_code == 0
+    assert "echo" in result.output
+    assert "<=" in result.output